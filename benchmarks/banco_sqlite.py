@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Substituto do MySQL em SQLite para os benchmarks e testes de carga.
+
+Implementa apenas a parte da API do mysql.connector usada pelo servidor
+(cursor, execute/executemany com %s, commit, is_connected), permitindo rodar
+src/server.py sem um MySQL local.
+"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+ESQUEMA = os.path.join(os.path.dirname(__file__), "..", "src", "criar_tables.sql")
+
+
+def _converter_data_hora(valor):
+    texto = valor.decode()
+    for formato in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+    return texto
+
+
+# Colunas "datetime" voltam como datetime, como no mysql.connector
+sqlite3.register_converter("datetime", _converter_data_hora)
+sqlite3.register_adapter(datetime, lambda valor: valor.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+def _traduzir(sql):
+    sql = sql.replace("%s", "?")
+    sql = re.sub(r"\bINSERT IGNORE\b", "INSERT OR IGNORE", sql, flags=re.IGNORECASE)
+    return sql
+
+
+class CursorSQLite:
+    def __init__(self, conexao, dictionary=False):
+        self._cursor = conexao.cursor()
+        self._dicionario = dictionary
+
+    def execute(self, sql, parametros=()):
+        self._cursor.execute(_traduzir(sql), tuple(parametros or ()))
+
+    def executemany(self, sql, lista_parametros):
+        self._cursor.executemany(_traduzir(sql), [tuple(p) for p in lista_parametros])
+
+    def _converter(self, linha):
+        if linha is None or not self._dicionario:
+            return linha
+        colunas = [c[0] for c in self._cursor.description]
+        return dict(zip(colunas, linha))
+
+    def fetchone(self):
+        return self._converter(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._converter(linha) for linha in self._cursor.fetchall()]
+
+    def fetchmany(self, tamanho):
+        return [self._converter(linha) for linha in self._cursor.fetchmany(tamanho)]
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexaoSQLite:
+    dialeto = "sqlite"  # usado por src/migracoes.py
+
+    def __init__(self, caminho):
+        self._conexao = sqlite3.connect(caminho, timeout=30, check_same_thread=False,
+                                        detect_types=sqlite3.PARSE_DECLTYPES)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+
+    def cursor(self, dictionary=False, **kwargs):
+        return CursorSQLite(self._conexao, dictionary=dictionary)
+
+    def commit(self):
+        self._conexao.commit()
+
+    def rollback(self):
+        self._conexao.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._conexao.close()
+
+
+def criar_banco(caminho):
+    """Cria as tabelas de src/criar_tables.sql num arquivo SQLite"""
+    with open(ESQUEMA, encoding="utf-8") as arquivo:
+        esquema = arquivo.read()
+    esquema = re.sub(r"int auto_increment primary key", "integer primary key autoincrement",
+                     esquema, flags=re.IGNORECASE)
+    esquema = re.sub(r"create table (\w+)", r"create table if not exists \1", esquema, flags=re.IGNORECASE)
+    conexao = sqlite3.connect(caminho)
+    conexao.executescript(esquema)
+    conexao.commit()
+    conexao.close()
+
+
+def fabrica_sqlite(caminho):
+    """Função de conexão no formato esperado por PoolConexoes"""
+    def conectar():
+        return ConexaoSQLite(caminho)
+
+    return conectar
+
+
+def contar_linhas(caminho, tabela):
+    conexao = sqlite3.connect(caminho)
+    try:
+        return conexao.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0]
+    finally:
+        conexao.close()
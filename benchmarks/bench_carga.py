@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga e latência de ponta a ponta.
+
+Sobe N receptores simulados que implementam o contrato de
+/alerta5656/enviar (com latência, taxa de falha e "buracos negros"
+configuráveis), executa src/server.py num processo separado contra o SQLite
+de teste ou um MySQL local e dispara M acionamentos simultâneos com o mesmo
+payload do "botao de enviar.py".
+
+Mede o tempo até a entrega em cada receptor (p50/p95/p99), o tempo até o
+alerta chegar a todos, CPU e memória do processo do servidor e as linhas
+gravadas no banco. O resultado sai em JSON para comparar execuções.
+
+Uso:
+    python benchmarks/bench_carga.py --receptores 300 --acionamentos 20
+    python benchmarks/bench_carga.py --receptores 300 --latencia-ms 80 --taxa-falha 0.05 --buracos-negros 0.02
+    python benchmarks/bench_carga.py --banco mysql   # usa DATABASE_HOST, DATABASE_USER e PASSWORD do .env; use um banco de teste
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from banco_sqlite import ConexaoSQLite, criar_banco, fabrica_sqlite  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Receptores simulados --------------------------------------------------------
+
+class ReceptorSimulado(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _responder(self, status, corpo=b""):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        if self.server.buraco_negro:
+            time.sleep(3600)
+        self._responder(200, b'{"status": "ok"}')
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        config = self.server.config
+        if self.server.buraco_negro:
+            # Aceita a conexão e nunca responde
+            time.sleep(3600)
+        atraso = config["latencia_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+        if atraso > 0:
+            time.sleep(atraso / 1000)
+        if random.random() < config["taxa_falha"]:
+            self._responder(500, b'{"message": "falha simulada"}')
+            return
+        dados = json.loads(corpo)
+        self.server.registrar(dados.get("id_evento"), self.server.server_address[0], time.time())
+        self._responder(200, b"true")
+
+    def log_message(self, *args):
+        pass
+
+
+def ip_receptor(indice):
+    return f"127.10.{indice // 250}.{indice % 250 + 1}"
+
+
+def iniciar_receptores(quantidade, porta, config, registrar):
+    buracos = int(round(quantidade * config["buracos_negros"]))
+    servidores = []
+    for i in range(quantidade):
+        servidor = ThreadingHTTPServer((ip_receptor(i), porta), ReceptorSimulado)
+        servidor.daemon_threads = True
+        servidor.config = config
+        servidor.buraco_negro = i >= quantidade - buracos
+        servidor.registrar = registrar
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+    return servidores, buracos
+
+
+def processo_receptores(quantidade, porta, config, pronto, pedidos):
+    """Hospeda os receptores simulados num subprocesso e devolve as entregas ao final"""
+    entregas = []
+    lock = threading.Lock()
+
+    def registrar(id_evento, ip, instante):
+        with lock:
+            entregas.append((id_evento, ip, instante))
+
+    iniciar_receptores(quantidade, porta, config, registrar)
+    pronto.set()
+    while True:
+        pedido = pedidos.recv()
+        if pedido == "entregas":
+            with lock:
+                pedidos.send(list(entregas))
+        elif pedido == "sair":
+            return
+
+
+# Servidor --------------------------------------------------------------------
+
+def consumo_processo():
+    """CPU acumulada (s) e pico de memória (MB) do processo atual"""
+    if psutil is not None:
+        processo = psutil.Process()
+        tempos = processo.cpu_times()
+        memoria = processo.memory_info()
+        pico = getattr(memoria, "peak_wset", None) or memoria.rss
+        return {"cpu_s": tempos.user + tempos.system, "rss_max_mb": pico / 1024 / 1024}
+    if resource is not None:
+        uso = resource.getrusage(resource.RUSAGE_SELF)
+        fator = 1024 * 1024 if platform.system() == "Darwin" else 1024
+        return {"cpu_s": uso.ru_utime + uso.ru_stime, "rss_max_mb": uso.ru_maxrss / fator}
+    tempos = os.times()
+    return {"cpu_s": tempos.user + tempos.system, "rss_max_mb": None}
+
+
+def servir(caminho_banco, porta, pronto, pedidos):
+    """Executa src/server.py num servidor WSGI multi-thread e responde aos pedidos de medição"""
+    from werkzeug.serving import make_server
+    import server
+
+    if caminho_banco:
+        server.pool_banco.fabrica = fabrica_sqlite(caminho_banco)
+    servidor = make_server("127.0.0.1", porta, server.app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    pronto.set()
+    while True:
+        pedido = pedidos.recv()
+        if pedido == "consumo":
+            pedidos.send(consumo_processo())
+        elif pedido == "sair":
+            return
+
+
+# Banco -----------------------------------------------------------------------
+
+def abrir_banco(args, caminho_banco):
+    if args.banco == "sqlite":
+        return ConexaoSQLite(caminho_banco)
+    import dotenv
+    import mysql.connector
+
+    dotenv.load_dotenv()
+    return mysql.connector.connect(host=os.getenv("DATABASE_HOST"), user=os.getenv("DATABASE_USER"),
+                                   password=os.getenv("PASSWORD"), database="botao_panico")
+
+
+def popular_banco(conexao, acionamentos, receptores, prefixo):
+    cursor = conexao.cursor()
+    cursor.executemany("INSERT INTO usuarios (nome_usuario, USERNAME) VALUES (%s, %s)",
+                       [(f"Usuario {i}", f"{prefixo}usuario{i}") for i in range(acionamentos)])
+    cursor.executemany("INSERT INTO salas (nome_sala, hostname, setor) VALUES (%s, %s, %s)",
+                       [(f"Sala {i}", f"{prefixo}HOST{i}", "") for i in range(acionamentos)])
+    cursor.executemany("INSERT INTO receptores (ip_receptor, nome_receptor, setor) VALUES (%s, %s, %s)",
+                       [(ip_receptor(i), f"{prefixo}receptor{i}", "") for i in range(receptores)])
+    conexao.commit()
+    cursor.close()
+
+
+def contar_desde(conexao, tabela, inicio):
+    cursor = conexao.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {tabela} WHERE data_hora >= %s", (inicio,))
+    total = cursor.fetchone()[0]
+    cursor.close()
+    conexao.commit()  # encerra a transação para enxergar as próximas linhas no MySQL
+    return total
+
+
+# Medição ---------------------------------------------------------------------
+
+def percentis(valores):
+    if not valores:
+        return {"n": 0, "p50": None, "p95": None, "p99": None, "max": None}
+    ordenados = sorted(valores)
+
+    def p(q):
+        return round(ordenados[min(len(ordenados) - 1, int(round(q * (len(ordenados) - 1))))], 2)
+
+    return {"n": len(ordenados), "p50": p(0.50), "p95": p(0.95), "p99": p(0.99), "max": round(ordenados[-1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga e latência de ponta a ponta")
+    parser.add_argument("--receptores", type=int, default=300)
+    parser.add_argument("--acionamentos", type=int, default=20)
+    parser.add_argument("--concorrencia", type=int, default=20, help="acionamentos simultâneos")
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--taxa-falha", type=float, default=0.0, help="fração de respostas 500")
+    parser.add_argument("--buracos-negros", type=float, default=0.0,
+                        help="fração de receptores que aceitam a conexão e nunca respondem")
+    parser.add_argument("--receptores-subprocesso", action="store_true",
+                        help="hospeda os receptores simulados num processo separado")
+    parser.add_argument("--banco", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--porta-receptor", type=int, default=19290)
+    parser.add_argument("--porta-servidor", type=int, default=19690)
+    parser.add_argument("--prazo-retentativas", type=float, default=15)
+    parser.add_argument("--tempo-limite", type=float, default=None,
+                        help="espera máxima pelas entregas (padrão: prazo das retentativas + 15 s)")
+    parser.add_argument("--saida", help="grava o resultado JSON também neste arquivo")
+    args = parser.parse_args()
+
+    os.environ["RECEPTOR_PORTA"] = str(args.porta_receptor)
+    os.environ["RETENTATIVA_PRAZO"] = str(args.prazo_retentativas)
+    os.environ.setdefault("WEBSOCKET_ATIVO", "0")  # mede o caminho HTTP
+    os.environ.setdefault("DESPACHO_TRABALHADORES", str(max(100, args.receptores)))
+    tempo_limite = args.tempo_limite or args.prazo_retentativas + 15
+
+    config = {"latencia_ms": args.latencia_ms, "jitter_ms": args.jitter_ms,
+              "taxa_falha": args.taxa_falha, "buracos_negros": args.buracos_negros}
+    contexto = multiprocessing.get_context("spawn")
+
+    # Receptores simulados
+    entregas_locais = []
+    lock = threading.Lock()
+    processo_stub = None
+    if args.receptores_subprocesso:
+        pronto = contexto.Event()
+        pedidos_stub, canal_stub = contexto.Pipe()
+        processo_stub = contexto.Process(target=processo_receptores, daemon=True,
+                                         args=(args.receptores, args.porta_receptor, config, pronto, canal_stub))
+        processo_stub.start()
+        pronto.wait(60)
+        buracos = int(round(args.receptores * args.buracos_negros))
+    else:
+        def registrar(id_evento, ip, instante):
+            with lock:
+                entregas_locais.append((id_evento, ip, instante))
+
+        _, buracos = iniciar_receptores(args.receptores, args.porta_receptor, config, registrar)
+
+    # Banco
+    caminho_banco = None
+    prefixo = f"b{int(time.time())}_"
+    if args.banco == "sqlite":
+        caminho_banco = os.path.join(tempfile.mkdtemp(prefix="bench_carga_"), "botao_panico.db")
+        criar_banco(caminho_banco)
+    conexao = abrir_banco(args, caminho_banco)
+    popular_banco(conexao, args.acionamentos, args.receptores, prefixo)
+
+    # Servidor
+    pronto = contexto.Event()
+    pedidos_servidor, canal_servidor = contexto.Pipe()
+    processo_servidor = contexto.Process(target=servir, daemon=True,
+                                         args=(caminho_banco, args.porta_servidor, pronto, canal_servidor))
+    processo_servidor.start()
+    pronto.wait(60)
+    url = f"http://127.0.0.1:{args.porta_servidor}/alerta5656/enviar"
+    # Aquece o cache do diretório antes de medir
+    requests.get(f"http://127.0.0.1:{args.porta_servidor}/diretorio/estado", timeout=10)
+    pedidos_servidor.send("consumo")
+    consumo_inicial = pedidos_servidor.recv()
+
+    inicio_data_hora = datetime.now().replace(microsecond=0)
+    acionado_em = {}
+    latencias_resposta = []
+
+    def acionar(i):
+        mensagem = {"hostname": f"{prefixo}HOST{i}", "usuario": f"{prefixo}usuario{i}", "codigo": "alerta5656"}
+        instante = time.time()
+        resposta = requests.post(url, json=mensagem, timeout=30)
+        latencias_resposta.append((time.time() - instante) * 1000)
+        acionado_em[resposta.json()["id_evento"]] = instante
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(args.concorrencia, args.acionamentos))) as executor:
+        list(executor.map(acionar, range(args.acionamentos)))
+    duracao_acionamentos = time.perf_counter() - inicio
+
+    # Espera todas as linhas de logs_alertas (entregas, falhas definitivas e timeouts)
+    linhas_esperadas = args.acionamentos * args.receptores
+    limite = time.monotonic() + tempo_limite
+    while contar_desde(conexao, "logs_alertas", inicio_data_hora) < linhas_esperadas and time.monotonic() < limite:
+        time.sleep(0.5)
+    duracao_total = time.perf_counter() - inicio
+
+    pedidos_servidor.send("consumo")
+    consumo_final = pedidos_servidor.recv()
+    if processo_stub is not None:
+        pedidos_stub.send("entregas")
+        entregas = pedidos_stub.recv()
+        pedidos_stub.send("sair")
+    else:
+        with lock:
+            entregas = list(entregas_locais)
+
+    linhas_alertas = contar_desde(conexao, "logs_alertas", inicio_data_hora)
+    linhas_sistema = contar_desde(conexao, "logs_sitema", inicio_data_hora)
+    conexao.close()
+    pedidos_servidor.send("sair")
+    processo_servidor.join(5)
+
+    # Tempo até a entrega: do acionamento até o receptor simulado responder 200
+    por_receptor = []
+    ultima_entrega = {}
+    receptores_por_evento = {}
+    for id_evento, ip, instante in entregas:
+        if id_evento not in acionado_em:
+            continue
+        atraso = (instante - acionado_em[id_evento]) * 1000
+        por_receptor.append(atraso)
+        ultima_entrega[id_evento] = max(ultima_entrega.get(id_evento, 0), atraso)
+        receptores_por_evento.setdefault(id_evento, set()).add(ip)
+    alcancaveis = args.receptores - buracos
+    completos = [ultima_entrega[e] for e, ips in receptores_por_evento.items() if len(ips) >= alcancaveis]
+
+    cpu = consumo_final["cpu_s"] - consumo_inicial["cpu_s"]
+    resultado = {
+        "parametros": {
+            "receptores": args.receptores,
+            "acionamentos": args.acionamentos,
+            "concorrencia": args.concorrencia,
+            "latencia_ms": args.latencia_ms,
+            "jitter_ms": args.jitter_ms,
+            "taxa_falha": args.taxa_falha,
+            "buracos_negros": buracos,
+            "banco": args.banco,
+            "receptores_subprocesso": args.receptores_subprocesso,
+        },
+        "duracao_acionamentos_s": round(duracao_acionamentos, 3),
+        "duracao_total_s": round(duracao_total, 3),
+        "resposta_botao_ms": percentis(latencias_resposta),
+        "entrega_por_receptor_ms": percentis(por_receptor),
+        "entrega_todos_receptores_ms": percentis(completos),
+        "entregas": len(por_receptor),
+        "entregas_esperadas": args.acionamentos * alcancaveis,
+        "servidor": {
+            "cpu_s": round(cpu, 3),
+            "cpu_percentual": round(100 * cpu / duracao_total, 1) if duracao_total else None,
+            "rss_max_mb": round(consumo_final["rss_max_mb"], 1) if consumo_final["rss_max_mb"] else None,
+        },
+        "banco": {
+            "logs_alertas": linhas_alertas,
+            "logs_alertas_esperadas": linhas_esperadas,
+            "logs_sitema": linhas_sistema,
+        },
+    }
+    saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(saida)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(saida)
+
+
+if __name__ == "__main__":
+    main()
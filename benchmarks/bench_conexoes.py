@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark de handshakes com o MySQL por alerta.
+
+Executa a mesma sequência de chamadas ao banco que um acionamento do botão
+gera em src/server.py (buscas de usuário/sala/receptores e gravação dos
+logs) e conta quantas conexões novas foram abertas, antes (uma conexão por
+chamada) e depois (pool de conexões).
+
+Uso:
+    python benchmarks/bench_conexoes.py --receptores 20 --alertas 10
+    python benchmarks/bench_conexoes.py --simulado   # sem MySQL real
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import server  # noqa: E402
+from pool_conexoes import PoolConexoes  # noqa: E402
+
+
+class CursorSimulado:
+    def execute(self, sql, params=None):
+        time.sleep(0.0005)
+
+    def fetchone(self):
+        return ("Simulado",)
+
+    def fetchall(self):
+        return [("127.0.0.1",)]
+
+    def close(self):
+        pass
+
+
+class ConexaoSimulada:
+    def cursor(self, *args, **kwargs):
+        return CursorSimulado()
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class SemPool:
+    """Reproduz o comportamento antigo: uma conexão nova a cada chamada"""
+
+    def __init__(self, fabrica):
+        self.fabrica = fabrica
+
+    @contextmanager
+    def conexao(self):
+        conn = self.fabrica()
+        try:
+            yield conn
+        finally:
+            if conn is not None:
+                conn.close()
+
+
+def simular_alerta(receptores):
+    server.localizar_usuario("usuario.teste")
+    server.localizar_sala("HOST-TESTE")
+    server.salvar_logs_sitema("bench: enviando alerta")
+    server.localizar_receptores()
+
+    def entrega(ip):
+        server.salvar_logs_sitema(f"bench: alerta enviado para {ip}")
+        server.salvar_log_alertas(ip, "HOST-TESTE", "Simulado", "Sala", time.strftime("%Y-%m-%d %H:%M:%S"),
+                                  "Enviado", "BENCH0")
+
+    threads = []
+    for i in range(receptores):
+        ip = f"10.0.0.{i + 1}"
+        server.salvar_logs_sitema(f"bench: thread iniciada para {ip}")
+        thread = threading.Thread(target=entrega, args=(ip,))
+        threads.append(thread)
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    server.salvar_logs_sitema("bench: envio massivo concluído")
+    server.salvar_logs_sitema("bench: ação recebida")
+
+
+def medir(nome, pool, alertas, receptores, contador):
+    server.pool_banco = pool
+    contador["handshakes"] = 0
+    inicio = time.perf_counter()
+    for _ in range(alertas):
+        simular_alerta(receptores)
+    duracao = time.perf_counter() - inicio
+    handshakes = contador["handshakes"]
+    print(f"{nome:>6}: {handshakes} handshakes em {alertas} alertas "
+          f"({handshakes / alertas:.1f} por alerta) - {duracao * 1000 / alertas:.1f} ms/alerta")
+    return handshakes / alertas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--alertas", type=int, default=10)
+    parser.add_argument("--receptores", type=int, default=20)
+    parser.add_argument("--simulado", action="store_true",
+                        help="usa conexões simuladas em vez de um MySQL real")
+    args = parser.parse_args()
+
+    contador = {"handshakes": 0}
+    conectar_real = server.conectar_banco_de_dados
+
+    def fabrica():
+        contador["handshakes"] += 1
+        if args.simulado:
+            time.sleep(0.003)  # custo aproximado de um handshake na LAN
+            return ConexaoSimulada()
+        return conectar_real()
+
+    antes = medir("antes", SemPool(fabrica), args.alertas, args.receptores, contador)
+    pool = PoolConexoes(fabrica, tamanho_maximo=server.tamanho_pool)
+    depois = medir("depois", pool, args.alertas, args.receptores, contador)
+    print(f"redução: {antes / max(depois, 1e-9):.1f}x menos handshakes por alerta")
+    print(f"pool: {pool.estatisticas()}")
+    pool.fechar_todas()
+
+
+if __name__ == "__main__":
+    main()
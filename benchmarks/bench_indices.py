@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Benchmark das consultas do servidor e da dashboard antes e depois das
+migrações (índices) de src/migracoes.py.
+
+Popula logs_alertas e logs_sitema com milhões de linhas espalhadas por um
+ano, mede cada consulta, aplica as migrações e mede de novo. Usa o SQLite
+substituto por padrão; com --banco mysql usa o MySQL do .env (use um banco de
+teste, as tabelas são populadas).
+
+Uso:
+    python benchmarks/bench_indices.py --linhas 10000000
+    python benchmarks/bench_indices.py --linhas 1000000 --repeticoes 5
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from banco_sqlite import ConexaoSQLite, criar_banco  # noqa: E402
+from migracoes import aplicar_migracoes  # noqa: E402
+
+RECEPTORES_POR_EVENTO = 300
+STATUS = ["Enviado"] * 18 + ["Timeout", "Erro_Conexao"]
+
+
+def abrir_banco(args):
+    if args.banco == "sqlite":
+        caminho = args.arquivo or os.path.join(tempfile.mkdtemp(prefix="bench_indices_"), "botao_panico.db")
+        if not os.path.exists(caminho):
+            criar_banco(caminho)
+        return ConexaoSQLite(caminho), caminho
+    import dotenv
+    import mysql.connector
+
+    dotenv.load_dotenv()
+    conexao = mysql.connector.connect(host=os.getenv("DATABASE_HOST"), user=os.getenv("DATABASE_USER"),
+                                      password=os.getenv("PASSWORD"), database="botao_panico")
+    return conexao, None
+
+
+def popular(conexao, linhas, usuarios, lote=50000):
+    agora = datetime.now()
+    cursor = conexao.cursor()
+    cursor.executemany("INSERT INTO usuarios (nome_usuario, USERNAME) VALUES (%s, %s)",
+                       [(f"Usuario {i}", f"usuario{i}") for i in range(usuarios)])
+    cursor.executemany("INSERT INTO salas (nome_sala, hostname, setor) VALUES (%s, %s, %s)",
+                       [(f"Sala {i}", f"HOST{i}", "") for i in range(usuarios)])
+    cursor.executemany("INSERT INTO receptores (ip_receptor, nome_receptor, setor) VALUES (%s, %s, %s)",
+                       [(f"10.0.{i // 250}.{i % 250 + 1}", f"receptor{i}", "") for i in range(RECEPTORES_POR_EVENTO)])
+    conexao.commit()
+
+    eventos = max(1, linhas // RECEPTORES_POR_EVENTO)
+    segundos_por_evento = 365 * 24 * 3600 / eventos
+    inicio = time.perf_counter()
+    alertas, sistema = [], []
+    for e in range(eventos):
+        data_hora = (agora - timedelta(seconds=(eventos - e) * segundos_por_evento)).strftime("%Y-%m-%d %H:%M:%S")
+        id_evento = f"E{e:09d}"
+        indice = random.randrange(usuarios)
+        for r in range(RECEPTORES_POR_EVENTO):
+            alertas.append((f"10.0.{r // 250}.{r % 250 + 1}", f"HOST{indice}", f"Usuario {indice}",
+                            f"Sala {indice}", data_hora, random.choice(STATUS), id_evento))
+            sistema.append((f"Alerta enviado com sucesso para o receptor 10.0.{r // 250}.{r % 250 + 1}", data_hora))
+        if len(alertas) >= lote:
+            gravar(cursor, alertas, sistema)
+            conexao.commit()
+            alertas, sistema = [], []
+    gravar(cursor, alertas, sistema)
+    conexao.commit()
+    cursor.close()
+    return eventos, time.perf_counter() - inicio
+
+
+def gravar(cursor, alertas, sistema):
+    if alertas:
+        cursor.executemany("INSERT INTO logs_alertas (ip_receptor, hostname_chamador, nome_usuario, nome_sala, "
+                           "data_hora, status, id_evento) VALUES (%s, %s, %s, %s, %s, %s, %s)", alertas)
+        cursor.executemany("INSERT INTO logs_sitema (log, data_hora) VALUES (%s, %s)", sistema)
+
+
+def consultas(eventos, usuarios):
+    """Consultas feitas pelo servidor e pela dashboard, com os mesmos SQL"""
+    um_dia = datetime.now() - timedelta(days=1)
+    sete_dias = datetime.now() - timedelta(days=7)
+
+    def ultimos_acionamentos(cursor):
+        cursor.execute("SELECT id_evento FROM logs_alertas ORDER BY data_hora DESC LIMIT 5000")
+        ids = list(dict.fromkeys(linha[0] for linha in cursor.fetchall()))[:5]
+        marcadores = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"""
+            SELECT nome_sala, nome_usuario, data_hora, id_evento, COUNT(*),
+                   SUM(CASE WHEN status = 'Enviado' THEN 1 ELSE 0 END)
+            FROM logs_alertas WHERE id_evento IN ({marcadores})
+            GROUP BY id_evento, nome_sala, nome_usuario, data_hora
+            ORDER BY data_hora DESC LIMIT 5""", ids)
+        return cursor.fetchall()
+
+    def sql(texto, parametros=None):
+        def executar(cursor):
+            cursor.execute(texto, parametros() if parametros else ())
+            return cursor.fetchall()
+        return executar
+
+    return {
+        "usuario_por_username": sql("SELECT nome_usuario FROM usuarios WHERE USERNAME = %s",
+                                    lambda: (f"usuario{random.randrange(usuarios)}",)),
+        "sala_por_hostname": sql("SELECT nome_sala FROM salas WHERE hostname = %s",
+                                 lambda: (f"HOST{random.randrange(usuarios)}",)),
+        "logs_alertas_1_dia": sql("SELECT ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, "
+                                  "status, id_evento FROM logs_alertas WHERE data_hora >= %s "
+                                  "ORDER BY data_hora DESC", lambda: (um_dia,)),
+        "logs_alertas_7_dias": sql("SELECT ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, "
+                                   "status, id_evento FROM logs_alertas WHERE data_hora >= %s "
+                                   "ORDER BY data_hora DESC", lambda: (sete_dias,)),
+        "logs_sitema_1_dia": sql("SELECT log, data_hora FROM logs_sitema WHERE data_hora >= %s "
+                                 "ORDER BY data_hora DESC", lambda: (um_dia,)),
+        "logs_sitema_ultimos_10": sql("SELECT log, data_hora FROM logs_sitema ORDER BY data_hora DESC LIMIT 10"),
+        "evento_por_id": sql("SELECT ip_receptor, status FROM logs_alertas WHERE id_evento = %s",
+                             lambda: (f"E{random.randrange(eventos):09d}",)),
+        "ultimos_acionamentos": ultimos_acionamentos,
+        # Consulta anterior da página inicial, que agrupa a tabela inteira
+        "ultimos_acionamentos_tabela_inteira": sql(
+            "SELECT nome_sala, nome_usuario, data_hora, id_evento, COUNT(*), "
+            "SUM(CASE WHEN status = 'Enviado' THEN 1 ELSE 0 END) FROM logs_alertas "
+            "GROUP BY id_evento, nome_sala, nome_usuario, data_hora ORDER BY data_hora DESC LIMIT 5"),
+    }
+
+
+def medir(conexao, lista, repeticoes):
+    resultado = {}
+    cursor = conexao.cursor()
+    for nome, consulta in lista.items():
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            consulta(cursor)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        resultado[nome] = round(statistics.median(tempos), 2)
+    cursor.close()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das consultas antes e depois dos índices")
+    parser.add_argument("--linhas", type=int, default=10_000_000, help="linhas em logs_alertas e em logs_sitema")
+    parser.add_argument("--usuarios", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--banco", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--arquivo", help="arquivo SQLite (mantido entre execuções)")
+    args = parser.parse_args()
+
+    conexao, caminho = abrir_banco(args)
+    eventos, tempo_populacao = popular(conexao, args.linhas, args.usuarios)
+    lista = consultas(eventos, args.usuarios)
+
+    antes = medir(conexao, lista, args.repeticoes)
+    inicio = time.perf_counter()
+    versoes = aplicar_migracoes(conexao)
+    tempo_migracoes = time.perf_counter() - inicio
+    depois = medir(conexao, lista, args.repeticoes)
+    conexao.close()
+
+    resultado = {
+        "banco": args.banco,
+        "arquivo": caminho,
+        "linhas_por_tabela_de_log": eventos * RECEPTORES_POR_EVENTO,
+        "eventos": eventos,
+        "usuarios": args.usuarios,
+        "tempo_populacao_s": round(tempo_populacao, 1),
+        "migracoes_aplicadas": versoes,
+        "tempo_migracoes_s": round(tempo_migracoes, 1),
+        "consultas_ms": {
+            nome: {"sem_indices": antes[nome], "com_indices": depois[nome],
+                   "ganho": round(antes[nome] / depois[nome], 1) if depois[nome] else None}
+            for nome in lista
+        },
+    }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
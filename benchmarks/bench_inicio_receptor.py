@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Tempo de subida dos receptores: importação dos módulos (-X importtime) e
+tempo até a porta HTTP 9090 responder /check-health.
+
+Cenários:
+  - receptor.py e receptor_app.py: python -X importtime -c "import <módulo>"
+    em src/, mediana do tempo acumulado do módulo e as importações de
+    primeiro nível mais pesadas;
+  - pronto: processo novo do receptor até o primeiro 200 em /check-health
+    (receptor_app.py só com tela disponível);
+  - executavel: o mesmo para o executável gerado por receptor_app.spec
+    (--executavel, ou --compilar para rodar o PyInstaller antes).
+
+Com --comparar-com <ref> os mesmos cenários rodam também no src/ daquele
+commit (git archive), para comparar antes e depois. O WebSocket aponta para
+uma porta local fechada, então a medição não depende do servidor.
+
+Uso:
+    python benchmarks/bench_inicio_receptor.py --repeticoes 10
+    python benchmarks/bench_inicio_receptor.py --comparar-com HEAD~1
+    python benchmarks/bench_inicio_receptor.py --compilar   # pyinstaller receptor_app.spec
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import urllib.request
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PORTA = 9090
+VARIANTES = {"receptor": "receptor.py", "receptor_app": "receptor_app.py"}
+
+
+def ambiente():
+    return dict(os.environ, SERVIDOR_WEBSOCKET="ws://127.0.0.1:9", SERVIDOR_URL="http://127.0.0.1:9",
+                PYTHONDONTWRITEBYTECODE="1")
+
+
+def tem_tela():
+    try:
+        import tkinter as tk
+        tk.Tk().destroy()
+        return True
+    except Exception:
+        return False
+
+
+def porta_livre():
+    with socket.socket() as sock:
+        return sock.connect_ex(("127.0.0.1", PORTA)) != 0
+
+
+def medir_importacao(diretorio_src, modulo, repeticoes):
+    """Tempo acumulado de 'import <modulo>' e as importações de primeiro nível mais caras"""
+    totais = []
+    primeiro_nivel = {}
+    for _ in range(repeticoes):
+        resultado = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                                   cwd=diretorio_src, env=ambiente(), capture_output=True, text=True)
+        if resultado.returncode != 0:
+            return {"erro": resultado.stderr.strip().splitlines()[-1]}
+        filhos = []
+        for linha in resultado.stderr.splitlines():
+            if not linha.startswith("import time:") or "cumulative" in linha:
+                continue
+            _, acumulado, nome = linha[len("import time:"):].split("|")
+            if nome.startswith("   ") and not nome.startswith("    "):
+                # Primeiro nível: o -X importtime lista os filhos antes do pai
+                filhos.append((nome.strip(), int(acumulado) / 1000))
+            elif not nome.startswith("  "):
+                if nome.strip() == modulo:
+                    totais.append(int(acumulado) / 1000)
+                    for filho, valor in filhos:
+                        primeiro_nivel.setdefault(filho, []).append(valor)
+                filhos = []
+    mais_pesados = sorted(((nome, statistics.median(valores)) for nome, valores in primeiro_nivel.items()),
+                          key=lambda item: item[1], reverse=True)[:6]
+    return {
+        "importacao_ms": round(statistics.median(totais), 1),
+        "mais_pesados_ms": {nome: round(valor, 1) for nome, valor in mais_pesados},
+    }
+
+
+def medir_pronto(comando, diretorio, repeticoes, tempo_limite=30):
+    """Do início do processo até o primeiro 200 em /check-health"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(comando, cwd=diretorio, env=ambiente(),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tempo = None
+        try:
+            while time.perf_counter() - inicio < tempo_limite and processo.poll() is None:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{PORTA}/check-health", timeout=1) as resposta:
+                        if resposta.status == 200:
+                            tempo = (time.perf_counter() - inicio) * 1000
+                            break
+                except OSError:
+                    time.sleep(0.005)
+        finally:
+            processo.kill()
+            processo.wait()
+        tempos.append(tempo)
+        time.sleep(0.2)  # libera a porta antes do próximo processo
+    validos = sorted(tempo for tempo in tempos if tempo is not None)
+    if not validos:
+        return {"falhas": len(tempos)}
+    return {"pronto_p50_ms": round(statistics.median(validos), 1), "pronto_max_ms": round(validos[-1], 1),
+            "falhas": len(tempos) - len(validos)}
+
+
+def extrair_src(ref):
+    destino = tempfile.mkdtemp(prefix="bench_inicio_")
+    arquivo = os.path.join(destino, "src.tar")
+    subprocess.run(["git", "-C", RAIZ, "archive", "-o", arquivo, ref, "src"], check=True)
+    with tarfile.open(arquivo) as tar:
+        tar.extractall(destino)
+    return os.path.join(destino, "src")
+
+
+def medir_src(diretorio_src, repeticoes, com_tela):
+    resultado = {}
+    for modulo, script in VARIANTES.items():
+        if not os.path.exists(os.path.join(diretorio_src, script)):
+            continue
+        medicao = medir_importacao(diretorio_src, modulo, repeticoes)
+        if modulo == "receptor" or com_tela:
+            medicao.update(medir_pronto([sys.executable, script], diretorio_src, repeticoes))
+        resultado[modulo] = medicao
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de subida dos receptores")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--comparar-com", metavar="REF", help="commit a comparar (ex.: HEAD~1)")
+    parser.add_argument("--executavel", help="executável gerado por receptor_app.spec")
+    parser.add_argument("--compilar", action="store_true", help="roda pyinstaller receptor_app.spec antes de medir")
+    args = parser.parse_args()
+
+    if not porta_livre():
+        print(f"A porta {PORTA} já está em uso; feche o receptor antes de medir")
+        sys.exit(2)
+    com_tela = tem_tela()
+
+    resultado = {"tela": com_tela, "atual": medir_src(os.path.join(RAIZ, "src"), args.repeticoes, com_tela)}
+    if args.comparar_com:
+        resultado[args.comparar_com] = medir_src(extrair_src(args.comparar_com), args.repeticoes, com_tela)
+
+    executavel = args.executavel
+    if args.compilar:
+        subprocess.run([sys.executable, "-m", "PyInstaller", "--noconfirm", "receptor_app.spec"], cwd=RAIZ, check=True)
+        nome = "BotaoPanico_Receptor.exe" if os.name == "nt" else "BotaoPanico_Receptor"
+        executavel = executavel or next(
+            (caminho for caminho in (os.path.join(RAIZ, "dist", nome), os.path.join(RAIZ, "dist", "BotaoPanico_Receptor", nome))
+             if os.path.exists(caminho)), None)
+    if executavel:
+        # O executável não aceita -X importtime; mede só o tempo até ficar pronto
+        resultado["executavel"] = medir_pronto([os.path.abspath(executavel)], RAIZ, args.repeticoes)
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da resolução do contexto de um alerta (usuário, sala e
+receptores) sob concorrência.
+
+Cenários:
+  - antes: três consultas, cada uma numa conexão nova (código original de
+    localizar_usuario/localizar_sala/localizar_receptores; cadastro ausente
+    gera erro em result[0]);
+  - tres_consultas: as mesmas três consultas numa conexão do pool;
+  - resolvedor: ResolvedorContexto, um único SELECT com UNION ALL numa conexão
+    do pool (cursor preparado quando o banco é MySQL).
+
+Sem --mysql usa o banco SQLite substituto, com atraso simulado de rede por
+consulta (--rtt-ms) e por conexão nova (--handshake-ms); nesse modo o ganho
+do prepared statement em si não aparece, só o das idas ao banco.
+
+Uso:
+    python benchmarks/bench_resolucao.py --concorrencia 1,8,32 --consultas 2000
+    python benchmarks/bench_resolucao.py --mysql   # usa DATABASE_HOST, DATABASE_USER e PASSWORD
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from banco_sqlite import ConexaoSQLite, criar_banco  # noqa: E402
+from pool_conexoes import PoolConexoes  # noqa: E402
+from resolvedor import ResolvedorContexto  # noqa: E402
+
+
+class CursorComLatencia:
+    def __init__(self, cursor, rtt):
+        self._cursor = cursor
+        self._rtt = rtt
+
+    def execute(self, sql, parametros=()):
+        time.sleep(self._rtt)
+        self._cursor.execute(sql, parametros)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class ConexaoComLatencia(ConexaoSQLite):
+    """Conexão SQLite que simula a ida e volta de rede do MySQL"""
+
+    def __init__(self, caminho, rtt, handshake):
+        time.sleep(handshake)
+        super().__init__(caminho)
+        self.rtt = rtt
+
+    def cursor(self, dictionary=False, **kwargs):
+        return CursorComLatencia(super().cursor(dictionary=dictionary), self.rtt)
+
+
+def popular(caminho, usuarios, salas, receptores):
+    conexao = sqlite3.connect(caminho)
+    conexao.executemany("INSERT INTO usuarios (nome_usuario, USERNAME) VALUES (?, ?)",
+                        [(f"Usuario {i}", f"usuario{i}") for i in range(usuarios)])
+    conexao.executemany("INSERT INTO salas (nome_sala, hostname, setor) VALUES (?, ?, ?)",
+                        [(f"Sala {i}", f"HOST{i}", f"bloco {i % 10}") for i in range(salas)])
+    conexao.executemany("INSERT INTO receptores (ip_receptor, nome_receptor, setor) VALUES (?, ?, ?)",
+                        [(f"10.0.{i // 250}.{i % 250 + 1}", f"receptor{i}", f"bloco {i % 10}")
+                         for i in range(receptores)])
+    conexao.execute("CREATE INDEX IF NOT EXISTS idx_usuarios_username ON usuarios (USERNAME)")
+    conexao.execute("CREATE INDEX IF NOT EXISTS idx_salas_hostname ON salas (hostname)")
+    conexao.commit()
+    conexao.close()
+
+
+def resolver_antes(fabrica, usuario, hostname):
+    """Reprodução do código original do servidor"""
+    def consultar(sql, parametros, todas=False):
+        conn = fabrica()
+        cursor = conn.cursor()
+        cursor.execute(sql, parametros)
+        resultado = cursor.fetchall() if todas else cursor.fetchone()
+        cursor.close()
+        conn.close()
+        return resultado if todas else resultado[0]
+
+    return (consultar("SELECT nome_usuario FROM usuarios WHERE USERNAME = %s", (usuario,)),
+            consultar("SELECT nome_sala FROM salas WHERE hostname = %s", (hostname,)),
+            consultar("SELECT ip_receptor FROM receptores", (), todas=True))
+
+
+def resolver_tres_consultas(pool, usuario, hostname, incluir_receptores):
+    receptores = []
+    with pool.conexao() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT nome_usuario FROM usuarios WHERE USERNAME = %s", (usuario,))
+        usuarios = cursor.fetchall()
+        cursor.execute("SELECT nome_sala, setor FROM salas WHERE hostname = %s", (hostname,))
+        salas = cursor.fetchall()
+        if incluir_receptores:
+            cursor.execute("SELECT ip_receptor, setor FROM receptores")
+            receptores = cursor.fetchall()
+        cursor.close()
+    return (usuarios[0][0] if usuarios else None, salas[0][0] if salas else None, receptores)
+
+
+def medir(nome, funcao, alvos, concorrencia):
+    duracoes = []
+    erros = 0
+    lock = threading.Lock()
+
+    def executar(alvo):
+        nonlocal erros
+        inicio = time.perf_counter()
+        try:
+            funcao(*alvo)
+        except Exception:
+            with lock:
+                erros += 1
+        with lock:
+            duracoes.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(concorrencia) as executor:
+        list(executor.map(executar, alvos))
+    total = time.perf_counter() - inicio
+    duracoes.sort()
+    return {
+        "cenario": nome,
+        "concorrencia": concorrencia,
+        "resolucoes_por_s": round(len(alvos) / total),
+        "p50_ms": round(statistics.median(duracoes) * 1000, 2),
+        "p95_ms": round(duracoes[int(len(duracoes) * 0.95) - 1] * 1000, 2),
+        "p99_ms": round(duracoes[int(len(duracoes) * 0.99) - 1] * 1000, 2),
+        "erros": erros,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência da resolução do contexto do alerta")
+    parser.add_argument("--concorrencia", default="1,8,32", help="threads simultâneas, separadas por vírgula")
+    parser.add_argument("--consultas", type=int, default=2000, help="resoluções por cenário")
+    parser.add_argument("--usuarios", type=int, default=5000)
+    parser.add_argument("--salas", type=int, default=2000)
+    parser.add_argument("--receptores", type=int, default=300)
+    parser.add_argument("--ausentes", type=float, default=0.1, help="fração de alertas com usuário não cadastrado")
+    parser.add_argument("--rtt-ms", type=float, default=0.3, help="atraso simulado por consulta")
+    parser.add_argument("--handshake-ms", type=float, default=3, help="atraso simulado por conexão nova")
+    parser.add_argument("--pool", type=int, default=10, help="tamanho do pool de conexões")
+    parser.add_argument("--sem-receptores", action="store_true",
+                        help="resolve só usuário e sala, como no servidor com os receptores em cache")
+    parser.add_argument("--mysql", action="store_true", help="usa o MySQL configurado no ambiente (já populado)")
+    args = parser.parse_args()
+
+    if args.mysql:
+        import dotenv
+        import mysql.connector
+
+        dotenv.load_dotenv()
+
+        def fabrica():
+            return mysql.connector.connect(host=os.getenv("DATABASE_HOST"), user=os.getenv("DATABASE_USER"),
+                                           password=os.getenv("PASSWORD"), database="botao_panico")
+    else:
+        caminho = os.path.join(tempfile.mkdtemp(prefix="bench_resolucao_"), "botao_panico.db")
+        criar_banco(caminho)
+        popular(caminho, args.usuarios, args.salas, args.receptores)
+
+        def fabrica():
+            return ConexaoComLatencia(caminho, args.rtt_ms / 1000, args.handshake_ms / 1000)
+
+    gerador = random.Random(42)
+    alvos = [(f"usuario{gerador.randrange(args.usuarios)}" if gerador.random() >= args.ausentes else "desconhecido",
+              f"HOST{gerador.randrange(args.salas)}") for _ in range(args.consultas)]
+
+    resultados = []
+    for concorrencia in [int(valor) for valor in args.concorrencia.split(",")]:
+        pool = PoolConexoes(fabrica, tamanho_maximo=args.pool)
+        resolvedor = ResolvedorContexto(pool)
+        receptores = not args.sem_receptores
+        cenarios = [
+            ("antes", lambda usuario, hostname: resolver_antes(fabrica, usuario, hostname)),
+            ("tres_consultas", lambda usuario, hostname: resolver_tres_consultas(pool, usuario, hostname, receptores)),
+            ("resolvedor", lambda usuario, hostname: resolvedor.resolver(usuario, hostname, incluir_receptores=receptores)),
+        ]
+        for nome, funcao in cenarios:
+            funcao(*alvos[0])  # aquece o pool e os cursores preparados
+            resultados.append(medir(nome, funcao, alvos, concorrencia))
+        pool.fechar_todas()
+
+    print(json.dumps({"receptores": not args.sem_receptores, "rtt_ms": None if args.mysql else args.rtt_ms,
+                      "handshake_ms": None if args.mysql else args.handshake_ms,
+                      "resultados": resultados}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Comparação de vazão: servidor de desenvolvimento do Flask x servir.py.
+
+Mede alertas por segundo em POST /alerta5656/enviar (src/server.py) e
+páginas por segundo em GET /logs (dashboard/app.py), usando o substituto
+SQLite do banco e receptores simulados, para os dois modos de execução.
+
+Uso:
+    python benchmarks/bench_servidor_http.py --clientes 32 --duracao 10
+    python benchmarks/bench_servidor_http.py --modos producao --workers 4 --threads 16
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from banco_sqlite import criar_banco, fabrica_sqlite  # noqa: E402
+
+ALVOS = {
+    "servidor": ("POST", "/alerta5656/enviar"),
+    "dashboard": ("GET", "/logs?dias=7&tipo=todos"),
+}
+
+
+class ReceptorSimulado(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        self.wfile.write(b"true")
+
+    def do_GET(self):
+        # /check-health do monitor de receptores
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def carregador(nome_app, caminho_banco):
+    """Carrega o app apontando o banco para o SQLite de teste"""
+    import servir
+
+    def carregar():
+        app = servir.CARREGADORES[nome_app]()
+        if nome_app == "servidor":
+            import server
+            server.pool_banco.fabrica = fabrica_sqlite(caminho_banco)
+        else:
+            sys.modules["dashboard_app"].conectar_banco_de_dados = fabrica_sqlite(caminho_banco)
+        return app
+
+    return carregar
+
+
+def executar_servidor(nome_app, modo, porta, caminho_banco, workers, threads):
+    """Ponto de entrada do subprocesso que hospeda o app"""
+    import builtins
+    builtins.print = lambda *args, **kwargs: None  # os prints por requisição distorcem a medição
+    carregar = carregador(nome_app, caminho_banco)
+    if modo == "dev":
+        app = carregar()
+        app.run(host="127.0.0.1", port=porta, threaded=True)
+    else:
+        import servir
+        servir.servir(nome_app, host="127.0.0.1", porta=porta, workers=workers,
+                      threads=threads, carregador=carregar)
+
+
+def popular_banco(caminho, receptores, logs):
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("INSERT INTO usuarios (nome_usuario, USERNAME) VALUES ('Usuario Bench', 'bench')")
+    conexao.execute("INSERT INTO salas (nome_sala, hostname, setor) VALUES ('Sala Bench', 'HOSTBENCH', '')")
+    conexao.executemany("INSERT INTO receptores (ip_receptor, nome_receptor, setor) VALUES (?, ?, '')",
+                        [(f"127.0.8.{i + 1}", f"r{i}") for i in range(receptores)])
+    agora = datetime.now()
+    conexao.executemany("INSERT INTO logs_sitema (log, data_hora) VALUES (?, ?)",
+                        [(f"log {i}", (agora - timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"))
+                         for i in range(logs)])
+    conexao.executemany(
+        "INSERT INTO logs_alertas (ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, status, id_evento) "
+        "VALUES (?, 'HOSTBENCH', 'Usuario Bench', 'Sala Bench', ?, 'Enviado', ?)",
+        [(f"127.0.8.{i % max(receptores, 1) + 1}", (agora - timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+          f"EV{i // max(receptores, 1)}") for i in range(logs)])
+    conexao.commit()
+    conexao.close()
+
+
+def aguardar(porta, tempo_limite=30):
+    limite = time.monotonic() + tempo_limite
+    while time.monotonic() < limite:
+        try:
+            requests.get(f"http://127.0.0.1:{porta}/__pronto__", timeout=1)
+            return True
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    return False
+
+
+def gerar_carga(porta, nome_app, clientes, duracao):
+    metodo, caminho = ALVOS[nome_app]
+    url = f"http://127.0.0.1:{porta}{caminho}"
+    corpo = {"hostname": "HOSTBENCH", "usuario": "bench", "codigo": "alerta5656"}
+    latencias = []
+    erros = [0]
+    lock = threading.Lock()
+    fim = time.monotonic() + duracao
+
+    def cliente():
+        sessao = requests.Session()
+        locais = []
+        falhas = 0
+        while time.monotonic() < fim:
+            inicio = time.perf_counter()
+            try:
+                resposta = sessao.request(metodo, url, json=corpo if metodo == "POST" else None, timeout=30)
+                if resposta.status_code == 200:
+                    locais.append(time.perf_counter() - inicio)
+                else:
+                    falhas += 1
+            except requests.exceptions.RequestException:
+                falhas += 1
+        with lock:
+            latencias.extend(locais)
+            erros[0] += falhas
+
+    with ThreadPoolExecutor(max_workers=clientes) as executor:
+        for _ in range(clientes):
+            executor.submit(cliente)
+
+    latencias.sort()
+
+    def percentil(p):
+        return round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 2) if latencias else None
+
+    return {
+        "requisicoes_ok": len(latencias),
+        "erros": erros[0],
+        "por_segundo": round(len(latencias) / duracao, 1),
+        "p50_ms": percentil(0.50),
+        "p99_ms": percentil(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara a vazão do servidor de desenvolvimento com servir.py")
+    parser.add_argument("--apps", nargs="+", default=["servidor", "dashboard"], choices=sorted(ALVOS))
+    parser.add_argument("--modos", nargs="+", default=["dev", "producao"], choices=["dev", "producao"])
+    parser.add_argument("--clientes", type=int, default=32)
+    parser.add_argument("--duracao", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--receptores", type=int, default=5)
+    parser.add_argument("--logs", type=int, default=2000, help="linhas de log para a página /logs")
+    parser.add_argument("--porta", type=int, default=19700)
+    parser.add_argument("--executar", nargs=6, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        nome_app, modo, porta, caminho_banco, workers, threads = args.executar
+        executar_servidor(nome_app, modo, int(porta), caminho_banco, int(workers), int(threads))
+        return
+
+    porta_receptor = args.porta + 90
+    for i in range(args.receptores):
+        receptor = ThreadingHTTPServer((f"127.0.8.{i + 1}", porta_receptor), ReceptorSimulado)
+        receptor.daemon_threads = True
+        threading.Thread(target=receptor.serve_forever, daemon=True).start()
+
+    ambiente = dict(os.environ, RECEPTOR_PORTA=str(porta_receptor))
+    ambiente.setdefault("WEBSOCKET_ATIVO", "0")  # mede o caminho HTTP
+    resultados = []
+    for nome_app in args.apps:
+        for modo in args.modos:
+            caminho_banco = os.path.join(tempfile.mkdtemp(prefix="bench_http_"), "botao_panico.db")
+            criar_banco(caminho_banco)
+            popular_banco(caminho_banco, args.receptores, args.logs)
+            processo = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--executar", nome_app, modo,
+                 str(args.porta), caminho_banco, str(args.workers), str(args.threads)],
+                env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                if not aguardar(args.porta):
+                    raise RuntimeError(f"{nome_app} ({modo}) não iniciou")
+                resultado = {"app": nome_app, "modo": modo}
+                if modo == "producao":
+                    resultado.update(workers=args.workers, threads=args.threads)
+                resultado.update(gerar_carga(args.porta, nome_app, args.clientes, args.duracao))
+                resultados.append(resultado)
+                print(json.dumps(resultado, ensure_ascii=False), file=sys.stderr)
+            finally:
+                processo.terminate()
+                processo.wait(30)
+                time.sleep(1)
+
+    print(json.dumps({"clientes": args.clientes, "duracao_s": args.duracao,
+                      "cpus": os.cpu_count(), "resultados": resultados}, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tempo até a tela de alerta do receptor_app ficar visível.
+
+A tela avisa o servidor quando é desenhada (POST
+/alerta5656/eventos/<id_evento>/confirmacao, etapa "exibido"); aqui
+um servidor HTTP local faz o papel do servidor e mede o intervalo entre o
+pedido de exibição e esse aviso.
+
+Cenários:
+  - interpretador_novo: um processo Python novo por alerta, como o antigo
+    script temporário (src/tela_alerta.py executado sozinho);
+  - trabalhador: TrabalhadorTela já aquecido, alerta enviado pelo Pipe;
+  - apos_queda: o processo de exibição é morto e o alerta seguinte é pedido
+    logo em seguida (inclui o reinício automático).
+
+Precisa de uma tela (no Linux, DISPLAY ou xvfb-run).
+
+Uso:
+    python benchmarks/bench_tela_alerta.py --repeticoes 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DIRETORIO_SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, DIRETORIO_SRC)
+
+PORTA = 19700
+
+
+class ServidorExibicao(BaseHTTPRequestHandler):
+    exibidos = {}  # id_evento -> instante
+    condicao = threading.Condition()
+
+    def do_POST(self):
+        dados = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if dados.get("etapa") == "exibido":
+            with self.condicao:
+                self.exibidos[self.path.split("/")[-2]] = time.perf_counter()
+                self.condicao.notify_all()
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def aguardar_exibicao(id_evento, inicio, tempo_limite=30):
+    fim = time.monotonic() + tempo_limite
+    with ServidorExibicao.condicao:
+        while id_evento not in ServidorExibicao.exibidos:
+            restante = fim - time.monotonic()
+            if restante <= 0:
+                return None
+            ServidorExibicao.condicao.wait(restante)
+        return (ServidorExibicao.exibidos[id_evento] - inicio) * 1000
+
+
+def resumir(tempos):
+    validos = sorted(tempo for tempo in tempos if tempo is not None)
+    if not validos:
+        return {"amostras": 0, "falhas": len(tempos)}
+    return {
+        "amostras": len(validos),
+        "falhas": len(tempos) - len(validos),
+        "p50_ms": round(statistics.median(validos), 1),
+        "max_ms": round(validos[-1], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo até a tela de alerta ficar visível")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+
+    import tkinter as tk
+    try:
+        tk.Tk().destroy()
+    except tk.TclError as e:
+        print(f"Sem tela disponível para o tkinter: {e}")
+        sys.exit(2)
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", PORTA), ServidorExibicao)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_servidor = f"http://127.0.0.1:{PORTA}"
+
+    from tela_alerta import TrabalhadorTela
+
+    resultado = {}
+
+    tempos = []
+    for i in range(args.repeticoes):
+        id_evento = uuid.uuid4().hex
+        inicio = time.perf_counter()
+        processo = subprocess.Popen([sys.executable, os.path.join(DIRETORIO_SRC, "tela_alerta.py"),
+                                     f"SALA {i}", "USUARIO", id_evento],
+                                    env=dict(os.environ, SERVIDOR_URL=url_servidor))
+        tempos.append(aguardar_exibicao(id_evento, inicio))
+        processo.kill()
+        processo.wait()
+    resultado["interpretador_novo"] = resumir(tempos)
+
+    trabalhador = TrabalhadorTela(url_servidor, espera_reinicio=0)
+    inicio = time.perf_counter()
+    trabalhador.iniciar()
+    trabalhador.pronto.wait(30)
+    resultado["aquecimento_trabalhador_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+
+    tempos = []
+    for i in range(args.repeticoes):
+        id_evento = uuid.uuid4().hex
+        inicio = time.perf_counter()
+        trabalhador.exibir(f"SALA {i}", "USUARIO", id_evento)
+        tempos.append(aguardar_exibicao(id_evento, inicio))
+        time.sleep(0.2)
+    resultado["trabalhador"] = resumir(tempos)
+
+    tempos = []
+    for i in range(min(args.repeticoes, 5)):
+        trabalhador._processo.kill()
+        id_evento = uuid.uuid4().hex
+        inicio = time.perf_counter()
+        trabalhador.exibir(f"SALA {i}", "USUARIO", id_evento)
+        tempos.append(aguardar_exibicao(id_evento, inicio))
+        trabalhador.pronto.wait(30)
+    resultado["apos_queda"] = resumir(tempos)
+    resultado["reinicios"] = trabalhador.reinicios
+
+    trabalhador.encerrar()
+    servidor.shutdown()
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Teste de estresse de concorrência dos eventos de alerta.
+
+Dispara muitos acionamentos simultâneos (cada um com hostname e usuário
+próprios) contra src/server.py, rodando com servidor WSGI multi-thread e,
+opcionalmente, vários processos compartilhando o mesmo banco. Ao final
+confere que toda linha de logs_alertas e todo alerta recebido pelos
+receptores simulados carregam o id_evento do acionamento que os gerou.
+
+Uso:
+    python benchmarks/stress_eventos.py --acionamentos 200 --receptores 5 --processos 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from banco_sqlite import contar_linhas, criar_banco, fabrica_sqlite  # noqa: E402
+
+
+class ReceptorSimulado(BaseHTTPRequestHandler):
+    recebidos = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        dados = json.loads(corpo)
+        with self.lock:
+            self.recebidos.append((self.server.server_address[0], dados))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        self.wfile.write(b"true")
+
+    def do_GET(self):
+        # /check-health do monitor de receptores
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_receptores(quantidade, porta):
+    servidores = []
+    for i in range(quantidade):
+        servidor = ThreadingHTTPServer((f"127.0.9.{i + 1}", porta), ReceptorSimulado)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        servidores.append(servidor)
+    return servidores
+
+
+def servir(caminho_banco, porta, pronto):
+    """Executa src/server.py num servidor WSGI multi-thread"""
+    from werkzeug.serving import make_server
+    import server
+
+    server.pool_banco.fabrica = fabrica_sqlite(caminho_banco)
+    servidor = make_server("127.0.0.1", porta, server.app, threaded=True)
+    pronto.set()
+    servidor.serve_forever()
+
+
+def popular_banco(caminho, acionamentos, receptores):
+    conexao = sqlite3.connect(caminho)
+    conexao.executemany("INSERT INTO usuarios (nome_usuario, USERNAME) VALUES (?, ?)",
+                        [(f"Usuario {i}", f"usuario{i}") for i in range(acionamentos)])
+    conexao.executemany("INSERT INTO salas (nome_sala, hostname, setor) VALUES (?, ?, ?)",
+                        [(f"Sala {i}", f"HOST{i}", "") for i in range(acionamentos)])
+    conexao.executemany("INSERT INTO receptores (ip_receptor, nome_receptor, setor) VALUES (?, ?, ?)",
+                        [(f"127.0.9.{i + 1}", f"receptor{i}", "") for i in range(receptores)])
+    conexao.commit()
+    conexao.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de estresse dos eventos de alerta")
+    parser.add_argument("--acionamentos", type=int, default=200)
+    parser.add_argument("--receptores", type=int, default=5)
+    parser.add_argument("--processos", type=int, default=1)
+    parser.add_argument("--porta-receptor", type=int, default=19090)
+    parser.add_argument("--porta-servidor", type=int, default=19600)
+    parser.add_argument("--tempo-limite", type=float, default=60)
+    args = parser.parse_args()
+
+    os.environ["RECEPTOR_PORTA"] = str(args.porta_receptor)
+    os.environ.setdefault("WEBSOCKET_ATIVO", "0")  # mede o caminho HTTP
+    diretorio = tempfile.mkdtemp(prefix="stress_eventos_")
+    caminho_banco = os.path.join(diretorio, "botao_panico.db")
+    criar_banco(caminho_banco)
+    popular_banco(caminho_banco, args.acionamentos, args.receptores)
+    iniciar_receptores(args.receptores, args.porta_receptor)
+
+    portas = [args.porta_servidor + i for i in range(args.processos)]
+    contexto = multiprocessing.get_context("spawn")
+    processos = []
+    for porta in portas:
+        pronto = contexto.Event()
+        processo = contexto.Process(target=servir, args=(caminho_banco, porta, pronto), daemon=True)
+        processo.start()
+        pronto.wait(30)
+        processos.append(processo)
+
+    def acionar(i):
+        porta = portas[i % len(portas)]
+        resposta = requests.post(f"http://127.0.0.1:{porta}/alerta5656/enviar",
+                                 json={"hostname": f"HOST{i}", "usuario": f"usuario{i}",
+                                       "codigo": "alerta5656"}, timeout=30)
+        return f"HOST{i}", resposta.json()["id_evento"]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(64, args.acionamentos)) as executor:
+        esperado = dict(executor.map(acionar, range(args.acionamentos)))
+    duracao = time.perf_counter() - inicio
+
+    total_linhas = args.acionamentos * args.receptores
+    limite = time.monotonic() + args.tempo_limite
+    while contar_linhas(caminho_banco, "logs_alertas") < total_linhas and time.monotonic() < limite:
+        time.sleep(0.2)
+
+    conexao = sqlite3.connect(caminho_banco)
+    linhas = conexao.execute("SELECT hostname_chamador, nome_usuario, nome_sala, id_evento FROM logs_alertas").fetchall()
+    conexao.close()
+
+    erros = 0
+    for hostname, nome_usuario, nome_sala, id_evento in linhas:
+        indice = hostname[len("HOST"):]
+        if (esperado.get(hostname) != id_evento or nome_usuario != f"Usuario {indice}"
+                or nome_sala != f"Sala {indice}"):
+            erros += 1
+
+    salas_por_evento = {id_evento: f"Sala {hostname[len('HOST'):]}" for hostname, id_evento in esperado.items()}
+    erros_receptores = sum(1 for _, dados in ReceptorSimulado.recebidos
+                           if salas_por_evento.get(dados.get("id_evento")) != dados.get("sala"))
+
+    for processo in processos:
+        processo.terminate()
+
+    resultado = {
+        "acionamentos": args.acionamentos,
+        "receptores": args.receptores,
+        "processos": args.processos,
+        "duracao_acionamentos_s": round(duracao, 3),
+        "eventos_distintos": len(set(esperado.values())),
+        "linhas_esperadas": total_linhas,
+        "linhas_gravadas": len(linhas),
+        "linhas_com_evento_errado": erros,
+        "alertas_recebidos": len(ReceptorSimulado.recebidos),
+        "alertas_com_evento_errado": erros_receptores,
+    }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    ok = erros == 0 and erros_receptores == 0 and len(linhas) == total_linhas
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Teste do servidor de alertas em cluster (CLUSTER_ATIVO=1).
+
+Sobe dois nós de src/server.py em processos separados, compartilhando o
+mesmo banco (SQLite substituto), e receptores simulados que demoram para
+responder, de modo que o envio de um alerta leve alguns segundos.
+
+  1. Dedupe: o mesmo acionamento (mesmo id_acionamento) é enviado aos dois
+     nós ao mesmo tempo; cada receptor deve receber um único alerta.
+  2. Queda: um acionamento vai para o nó A, que é morto (SIGKILL) no meio do
+     envio; o nó B deve assumir o evento quando o lease vencer e completar a
+     entrega a todos os receptores. Só podem se repetir os envios que o nó A
+     tinha em andamento (até --trabalhadores): as entregas confirmadas já
+     estão em entregas_cluster.
+
+Uso:
+    python benchmarks/teste_cluster.py --receptores 40 --atraso 0.25 --lease 2
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from banco_sqlite import criar_banco, fabrica_sqlite  # noqa: E402
+
+PORTA_RECEPTORES = 19190
+
+
+class ReceptorLento(BaseHTTPRequestHandler):
+    recebidos = []  # (ip_receptor, id_evento, instante)
+    lock = threading.Lock()
+    atraso = 0.25
+
+    def do_POST(self):
+        dados = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.atraso)
+        with self.lock:
+            self.recebidos.append((self.server.server_address[0], dados.get("id_evento"), time.monotonic()))
+        self.send_response(200)
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        self.wfile.write(b"true")
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def ip_receptor(i):
+    return f"127.0.10.{i + 1}"
+
+
+def iniciar_receptores(quantidade):
+    for i in range(quantidade):
+        servidor = ThreadingHTTPServer((ip_receptor(i), PORTA_RECEPTORES), ReceptorLento)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+
+def popular_banco(caminho, receptores):
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("INSERT INTO usuarios (nome_usuario, USERNAME) VALUES ('Usuario Teste', 'teste')")
+    conexao.execute("INSERT INTO salas (nome_sala, hostname, setor) VALUES ('Sala Teste', 'HOSTTESTE', '')")
+    conexao.executemany("INSERT INTO receptores (ip_receptor, nome_receptor, setor) VALUES (?, ?, '')",
+                        [(ip_receptor(i), f"receptor{i}") for i in range(receptores)])
+    conexao.commit()
+    conexao.close()
+
+
+def servir_no(caminho_banco, porta, no_id, lease, trabalhadores):
+    """Processo de um nó: configura o ambiente antes de importar o servidor"""
+    os.environ.update({
+        "CLUSTER_ATIVO": "1", "CLUSTER_NO_ID": no_id, "CLUSTER_LEASE": str(lease),
+        "WEBSOCKET_ATIVO": "0", "MONITOR_ATIVO": "0", "JANELA_COALESCENCIA": "0",
+        "RECEPTOR_PORTA": str(PORTA_RECEPTORES), "DESPACHO_TRABALHADORES": str(trabalhadores),
+        "DESPACHO_PRAZO": "60", "RETENTATIVA_PRAZO": "60",
+        # Cada nó simula uma máquina, com o próprio spool local
+        "SPOOL_ARQUIVO": os.path.join(os.path.dirname(caminho_banco), f"spool_{no_id}.db"),
+    })
+    from werkzeug.serving import make_server
+    import server
+
+    server.pool_banco.fabrica = fabrica_sqlite(caminho_banco)
+    make_server("127.0.0.1", porta, server.app, threaded=True).serve_forever()
+
+
+def aguardar_no(porta, tempo_limite=30):
+    fim = time.monotonic() + tempo_limite
+    while time.monotonic() < fim:
+        try:
+            if requests.get(f"http://127.0.0.1:{porta}/check-health", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError(f"Nó na porta {porta} não subiu")
+
+
+def acionar(porta, id_acionamento):
+    resposta = requests.post(f"http://127.0.0.1:{porta}/alerta5656/enviar", timeout=10, json={
+        "hostname": "HOSTTESTE", "usuario": "teste", "codigo": "alerta5656", "id_acionamento": id_acionamento})
+    return resposta.json()
+
+
+def recebidos_do_evento(id_evento):
+    with ReceptorLento.lock:
+        return [(ip, instante) for ip, evento, instante in ReceptorLento.recebidos if evento == id_evento]
+
+
+def aguardar_entregas(id_evento, esperados, tempo_limite):
+    fim = time.monotonic() + tempo_limite
+    while time.monotonic() < fim:
+        if len({ip for ip, _ in recebidos_do_evento(id_evento)}) >= esperados:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de dedupe e queda de nó do cluster de servidores")
+    parser.add_argument("--receptores", type=int, default=40)
+    parser.add_argument("--atraso", type=float, default=0.25, help="segundos que cada receptor leva para responder")
+    parser.add_argument("--trabalhadores", type=int, default=4, help="envios simultâneos por nó")
+    parser.add_argument("--lease", type=float, default=2)
+    parser.add_argument("--matar-apos", type=float, default=0.25,
+                        help="fração dos receptores atendidos antes de matar o nó A")
+    args = parser.parse_args()
+
+    ReceptorLento.atraso = args.atraso
+    iniciar_receptores(args.receptores)
+
+    pasta = tempfile.mkdtemp(prefix="teste_cluster_")
+    caminho = os.path.join(pasta, "botao_panico.db")
+    criar_banco(caminho)
+    popular_banco(caminho, args.receptores)
+
+    contexto = multiprocessing.get_context("spawn")
+    portas = {"A": 19611, "B": 19612}
+    nos = {}
+    for nome, porta in portas.items():
+        nos[nome] = contexto.Process(target=servir_no, daemon=True,
+                                     args=(caminho, porta, f"no{nome}", args.lease, args.trabalhadores))
+        nos[nome].start()
+    for porta in portas.values():
+        aguardar_no(porta)
+    resultado = {"receptores": args.receptores, "lease_s": args.lease}
+    tempo_envio = args.receptores * args.atraso / args.trabalhadores
+
+    # 1. O mesmo acionamento chega aos dois nós ao mesmo tempo
+    id_acionamento = uuid.uuid4().hex
+    with ThreadPoolExecutor(2) as executor:
+        respostas = list(executor.map(lambda porta: acionar(porta, id_acionamento), portas.values()))
+    ids = {resposta["id_evento"] for resposta in respostas}
+    id_evento = ids.pop() if len(ids) == 1 else None
+    completo = id_evento is not None and aguardar_entregas(id_evento, args.receptores, tempo_envio * 3 + 10)
+    time.sleep(1)
+    entregas = recebidos_do_evento(id_evento) if id_evento else []
+    resultado["dedupe"] = {
+        "ids_evento_respondidos": len(ids) + (1 if id_evento else 0),
+        "coalescidos": sum(1 for resposta in respostas if resposta.get("coalescido")),
+        "completo": completo,
+        "entregas": len(entregas),
+        "duplicadas": len(entregas) - len({ip for ip, _ in entregas}),
+    }
+
+    # 2. O nó A cai no meio do envio
+    inicio = time.monotonic()
+    id_evento = acionar(portas["A"], uuid.uuid4().hex)["id_evento"]
+    limite = max(1, int(args.receptores * args.matar_apos))
+    while len(recebidos_do_evento(id_evento)) < limite and time.monotonic() - inicio < tempo_envio * 3:
+        time.sleep(0.01)
+    os.kill(nos["A"].pid, signal.SIGKILL)
+    momento_queda = time.monotonic()
+    atendidos_antes = len({ip for ip, _ in recebidos_do_evento(id_evento)})
+    completo = aguardar_entregas(id_evento, args.receptores, args.lease * 3 + tempo_envio * 3 + 10)
+    time.sleep(1)
+    entregas = recebidos_do_evento(id_evento)
+    estado_b = requests.get(f"http://127.0.0.1:{portas['B']}/cluster/estado", timeout=5).json()
+    resultado["queda"] = {
+        "atendidos_antes_da_queda": atendidos_antes,
+        "completo": completo,
+        "receptores_atendidos": len({ip for ip, _ in entregas}),
+        "duplicadas": len(entregas) - len({ip for ip, _ in entregas}),
+        "tempo_ate_completar_s": round(max(instante for _, instante in entregas) - inicio, 2) if entregas else None,
+        "tempo_apos_queda_s": round(max(instante for _, instante in entregas) - momento_queda, 2) if entregas else None,
+        "eventos_assumidos_por_b": estado_b["eventos_assumidos"],
+    }
+
+    nos["B"].terminate()
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    ok = (resultado["dedupe"]["ids_evento_respondidos"] == 1 and resultado["dedupe"]["duplicadas"] == 0
+          and resultado["dedupe"]["completo"] and resultado["queda"]["completo"]
+          and resultado["queda"]["duplicadas"] <= args.trabalhadores)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
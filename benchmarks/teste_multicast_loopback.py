@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Teste do modo de entrega por multicast na interface de loopback.
+
+Sobe K receptores multicast na mesma máquina (cada um com um ip_receptor
+próprio), envia alertas pelo EmissorMulticast e mede quanto tempo leva até
+todos confirmarem. Com multicast o servidor envia o mesmo datagrama uma vez
+por alerta, então o tempo deve ficar praticamente constante quando K cresce.
+
+Uso:
+    python benchmarks/teste_multicast_loopback.py --receptores 1 10 50 --alertas 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from multicast import EmissorMulticast, ReceptorMulticast  # noqa: E402
+
+CHAVE = "chave-de-teste"
+
+
+def medir(quantidade, alertas, grupo, porta):
+    recebidos = []
+    lock = threading.Lock()
+
+    def ao_receber(sala, usuario, id_evento):
+        with lock:
+            recebidos.append(id_evento)
+
+    receptores = [ReceptorMulticast(CHAVE, ao_receber, grupo=grupo, porta=porta,
+                                    interface="127.0.0.1", ip_receptor=f"receptor{i}")
+                  for i in range(quantidade)]
+    for receptor in receptores:
+        receptor.iniciar()
+    emissor = EmissorMulticast(CHAVE, grupo=grupo, porta=porta, interface="127.0.0.1", repeticoes=1)
+
+    tempos = []
+    incompletos = 0
+    for i in range(alertas):
+        payload = {"sala": "Sala 1", "usuario": "Usuario 1", "codigo": "alerta5656",
+                   "id_evento": f"{quantidade}-{i}"}
+        inicio = time.perf_counter()
+        confirmados = emissor.transmitir(payload, tempo_limite=2.0, esperados=quantidade)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        if len(confirmados) != quantidade:
+            incompletos += 1
+
+    # A confirmação sai antes da exibição; dá tempo para os últimos callbacks
+    limite = time.monotonic() + 2
+    while len(recebidos) < quantidade * alertas and time.monotonic() < limite:
+        time.sleep(0.01)
+
+    emissor.encerrar()
+    for receptor in receptores:
+        receptor.encerrar()
+
+    return {
+        "receptores": quantidade,
+        "alertas": alertas,
+        "alertas_sem_todas_confirmacoes": incompletos,
+        "exibicoes": len(recebidos),
+        "exibicoes_esperadas": quantidade * alertas,
+        "tempo_ate_todas_confirmacoes_ms": {
+            "p50": round(statistics.median(tempos), 2),
+            "max": round(max(tempos), 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste do multicast na interface de loopback")
+    parser.add_argument("--receptores", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--alertas", type=int, default=20)
+    parser.add_argument("--grupo", default="239.255.56.57")
+    parser.add_argument("--porta", type=int, default=15656)
+    args = parser.parse_args()
+
+    resultados = []
+    for indice, quantidade in enumerate(args.receptores):
+        # Uma porta por rodada para não receber datagramas da rodada anterior
+        resultados.append(medir(quantidade, args.alertas, args.grupo, args.porta + indice))
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+    ok = all(r["alertas_sem_todas_confirmacoes"] == 0 and r["exibicoes"] == r["exibicoes_esperadas"]
+             for r in resultados)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
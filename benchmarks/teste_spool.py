@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Teste do spool local do servidor de alertas (SPOOL_ATIVO=1).
+
+Usa o banco SQLite substituto, que pode ser "derrubado" criando um arquivo
+de sinalização (o nó passa a não conseguir abrir conexões), e receptores
+simulados que demoram para responder.
+
+  1. O nó A sobe com o banco no ar e guarda a cópia do diretório no spool.
+  2. Com o banco fora, o nó B sobe do zero: o alerta 1 precisa chegar aos
+     receptores com os nomes de sala e usuário da cópia do spool.
+  3. O nó B recebe o alerta 2 e é morto (SIGKILL) no meio do envio; o nó C
+     sobe, ainda sem banco, e precisa retomar o evento pelo spool e completar
+     a entrega.
+  4. O banco volta: todas as linhas de log dos dois eventos precisam chegar
+     às tabelas.
+
+Uso:
+    python benchmarks/teste_spool.py --receptores 30 --atraso 0.25
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from banco_sqlite import ConexaoSQLite, criar_banco  # noqa: E402
+
+PORTA_RECEPTORES = 19290
+PORTA_NO = 19621
+
+
+class ReceptorLento(BaseHTTPRequestHandler):
+    recebidos = []  # (ip_receptor, payload, instante)
+    lock = threading.Lock()
+    atraso = 0.25
+
+    def do_POST(self):
+        dados = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        time.sleep(self.atraso)
+        with self.lock:
+            self.recebidos.append((self.server.server_address[0], dados, time.monotonic()))
+        self.send_response(200)
+        self.send_header("Content-Length", "4")
+        self.end_headers()
+        self.wfile.write(b"true")
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def ip_receptor(i):
+    return f"127.0.11.{i + 1}"
+
+
+def iniciar_receptores(quantidade):
+    for i in range(quantidade):
+        servidor = ThreadingHTTPServer((ip_receptor(i), PORTA_RECEPTORES), ReceptorLento)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+
+def popular_banco(caminho, receptores):
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("INSERT INTO usuarios (nome_usuario, USERNAME) VALUES ('Usuario Teste', 'teste')")
+    conexao.execute("INSERT INTO salas (nome_sala, hostname, setor) VALUES ('Sala Teste', 'HOSTTESTE', '')")
+    conexao.executemany("INSERT INTO receptores (ip_receptor, nome_receptor, setor) VALUES (?, ?, '')",
+                        [(ip_receptor(i), f"receptor{i}") for i in range(receptores)])
+    conexao.commit()
+    conexao.close()
+
+
+def servir_no(caminho_banco, sinal_queda, arquivo_spool, trabalhadores):
+    """Processo de um nó: configura o ambiente antes de importar o servidor"""
+    os.environ.update({
+        "SPOOL_ATIVO": "1", "SPOOL_ARQUIVO": arquivo_spool, "SPOOL_LEASE": "1",
+        "WEBSOCKET_ATIVO": "0", "MONITOR_ATIVO": "0", "JANELA_COALESCENCIA": "0",
+        "RECEPTOR_PORTA": str(PORTA_RECEPTORES), "DESPACHO_TRABALHADORES": str(trabalhadores),
+        "DESPACHO_PRAZO": "60", "RETENTATIVA_PRAZO": "60",
+    })
+    from werkzeug.serving import make_server
+    import server
+
+    def conectar():
+        if os.path.exists(sinal_queda):
+            return None
+        return ConexaoSQLite(caminho_banco)
+
+    server.pool_banco.fabrica = conectar
+    make_server("127.0.0.1", PORTA_NO, server.app, threaded=True).serve_forever()
+
+
+def subir_no(contexto, *args):
+    processo = contexto.Process(target=servir_no, args=args, daemon=True)
+    processo.start()
+    fim = time.monotonic() + 30
+    while time.monotonic() < fim:
+        try:
+            if requests.get(f"http://127.0.0.1:{PORTA_NO}/check-health", timeout=1).status_code == 200:
+                return processo
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise TimeoutError("Nó não subiu")
+
+
+def matar(processo):
+    os.kill(processo.pid, signal.SIGKILL)
+    processo.join()
+
+
+def acionar():
+    resposta = requests.post(f"http://127.0.0.1:{PORTA_NO}/alerta5656/enviar", timeout=10, json={
+        "hostname": "HOSTTESTE", "usuario": "teste", "codigo": "alerta5656"})
+    return resposta.status_code, resposta.json()
+
+
+def recebidos_do_evento(id_evento):
+    with ReceptorLento.lock:
+        return [(ip, dados, instante) for ip, dados, instante in ReceptorLento.recebidos
+                if dados.get("id_evento") == id_evento]
+
+
+def aguardar(condicao, tempo_limite):
+    fim = time.monotonic() + tempo_limite
+    while time.monotonic() < fim:
+        if condicao():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def contar_no_banco(caminho, id_evento):
+    conexao = sqlite3.connect(caminho)
+    enviados = conexao.execute("SELECT COUNT(DISTINCT ip_receptor) FROM logs_alertas "
+                               "WHERE id_evento = ? AND status = 'Enviado'", (id_evento,)).fetchone()[0]
+    aceito = conexao.execute("SELECT COUNT(*) FROM logs_sitema WHERE log LIKE ?",
+                             (f"Ação recebida%{id_evento}",)).fetchone()[0]
+    conexao.close()
+    return enviados, aceito
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste do spool local com o banco fora do ar e reinício do servidor")
+    parser.add_argument("--receptores", type=int, default=30)
+    parser.add_argument("--atraso", type=float, default=0.25, help="segundos que cada receptor leva para responder")
+    parser.add_argument("--trabalhadores", type=int, default=4, help="envios simultâneos no nó")
+    parser.add_argument("--matar-apos", type=float, default=0.3,
+                        help="fração dos receptores atendidos antes de matar o nó B")
+    args = parser.parse_args()
+
+    ReceptorLento.atraso = args.atraso
+    iniciar_receptores(args.receptores)
+
+    pasta = tempfile.mkdtemp(prefix="teste_spool_")
+    caminho = os.path.join(pasta, "botao_panico.db")
+    sinal_queda = os.path.join(pasta, "banco_fora")
+    arquivo_spool = os.path.join(pasta, "spool.db")
+    criar_banco(caminho)
+    popular_banco(caminho, args.receptores)
+    contexto = multiprocessing.get_context("spawn")
+    parametros_no = (caminho, sinal_queda, arquivo_spool, args.trabalhadores)
+    tempo_envio = args.receptores * args.atraso / args.trabalhadores
+    resultado = {"receptores": args.receptores}
+
+    # 1. Banco no ar: o diretório é carregado e copiado para o spool
+    no = subir_no(contexto, *parametros_no)
+    requests.post(f"http://127.0.0.1:{PORTA_NO}/diretorio/invalidar", timeout=5)
+    aguardar(lambda: requests.get(f"http://127.0.0.1:{PORTA_NO}/diretorio/estado", timeout=5).json()["carregado"], 10)
+    matar(no)
+
+    # 2. Banco fora, servidor reiniciado: nomes vêm da cópia do spool
+    open(sinal_queda, "w").close()
+    no = subir_no(contexto, *parametros_no)
+    status, resposta = acionar()
+    id_evento_1 = resposta.get("id_evento")
+    completo = aguardar(lambda: len({ip for ip, _, _ in recebidos_do_evento(id_evento_1)}) >= args.receptores,
+                        tempo_envio * 3 + 10)
+    payloads = [dados for _, dados, _ in recebidos_do_evento(id_evento_1)]
+    resultado["banco_fora"] = {
+        "status_http": status,
+        "completo": completo,
+        "nomes": sorted({(dados["sala"], dados["usuario"]) for dados in payloads}),
+    }
+
+    # 3. Queda do processo no meio do envio, com o banco ainda fora
+    inicio = time.monotonic()
+    id_evento_2 = acionar()[1]["id_evento"]
+    limite = max(1, int(args.receptores * args.matar_apos))
+    aguardar(lambda: len(recebidos_do_evento(id_evento_2)) >= limite, tempo_envio * 3)
+    matar(no)
+    momento_queda = time.monotonic()
+    atendidos_antes = len({ip for ip, _, _ in recebidos_do_evento(id_evento_2)})
+    no = subir_no(contexto, *parametros_no)
+    completo = aguardar(lambda: len({ip for ip, _, _ in recebidos_do_evento(id_evento_2)}) >= args.receptores,
+                        tempo_envio * 3 + 15)
+    entregas = recebidos_do_evento(id_evento_2)
+    resultado["reinicio"] = {
+        "atendidos_antes_da_queda": atendidos_antes,
+        "completo": completo,
+        "receptores_atendidos": len({ip for ip, _, _ in entregas}),
+        "duplicadas": len(entregas) - len({ip for ip, _, _ in entregas}),
+        "tempo_apos_queda_s": round(max(instante for _, _, instante in entregas) - momento_queda, 2)
+        if entregas else None,
+        "tempo_total_s": round(max(instante for _, _, instante in entregas) - inicio, 2) if entregas else None,
+    }
+
+    # 4. Banco de volta: o replicador grava as linhas guardadas no spool
+    pendentes_antes = requests.get(f"http://127.0.0.1:{PORTA_NO}/spool/estado", timeout=5).json()["linhas_pendentes"]
+    os.remove(sinal_queda)
+    volta = time.monotonic()
+    replicado = aguardar(lambda: requests.get(f"http://127.0.0.1:{PORTA_NO}/spool/estado",
+                                              timeout=5).json()["linhas_pendentes"] == 0, 60)
+    resultado["replicacao"] = {
+        "linhas_no_spool_com_banco_fora": pendentes_antes,
+        "replicado": replicado,
+        "tempo_s": round(time.monotonic() - volta, 2),
+    }
+    for nome, id_evento in (("evento_1", id_evento_1), ("evento_2", id_evento_2)):
+        enviados, aceito = contar_no_banco(caminho, id_evento)
+        resultado["replicacao"][nome] = {"receptores_enviado_no_banco": enviados, "log_aceite": aceito}
+    no.terminate()
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    ok = (resultado["banco_fora"]["completo"]
+          and resultado["banco_fora"]["nomes"] == [("Sala Teste", "Usuario Teste")]
+          and resultado["reinicio"]["completo"] and replicado
+          and all(resultado["replicacao"][nome]["receptores_enviado_no_banco"] == args.receptores
+                  and resultado["replicacao"][nome]["log_aceite"] >= 1 for nome in ("evento_1", "evento_2")))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
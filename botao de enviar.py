@@ -5,6 +5,7 @@ import getpass
 import tkinter as tk
 import json
 import socket
+import uuid
 
 
 
@@ -12,6 +13,11 @@ import socket
 server = "localhost"
 chave = "alerta5656"
 
+# Servidores de alerta em ordem de preferência, separados por vírgula; se um
+# não responder o botão tenta o próximo. O id_acionamento faz os servidores
+# tratarem as tentativas como um único alerta.
+servidores = [url.strip() for url in os.getenv('BOTAO_SERVIDORES', 'http://172.19.200.1:9600').split(',') if url.strip()]
+
 
 def enviar_mensagem():
     hostname = socket.gethostname()
@@ -21,14 +27,24 @@ def enviar_mensagem():
     mensagem = {
         'hostname': hostname,
         'usuario': usuario_windows,
-        'codigo': 'alerta5656'
+        'codigo': 'alerta5656',
+        'id_acionamento': uuid.uuid4().hex
     }
     
     print(f"Enviando mensagem: {mensagem}")
 
-  
-    requests.post(f"http://172.19.200.1:9600/{chave}/enviar", json=mensagem)
-      
+    for tentativa in range(3):
+        for url in servidores:
+            try:
+                response = requests.post(f"{url}/{chave}/enviar", json=mensagem, timeout=(2, 5))
+                if response.status_code == 200:
+                    print(f"Mensagem enviada para {url}")
+                    return True
+                print(f"Erro ao enviar mensagem para {url}: {response.status_code}")
+            except Exception as e:
+                print(f"Servidor {url} indisponível: {e}")
+        time.sleep(1)
+    return False
 
 
 def mostrar_tela_enviado():
@@ -12,6 +12,10 @@ from datetime import datetime, timedelta
 import dotenv
 import os
 import json
+import threading
+import csv
+import glob
+import gzip
 
 # Carregar variáveis de ambiente
 dotenv.load_dotenv()
@@ -25,6 +29,10 @@ app.secret_key = 'botao_panico_dashboard_2024'
 # Configuração do servidor principal
 SERVER_URL = "http://localhost:9600"
 
+# Pasta dos logs arquivados pelo job de retenção (src/retencao_logs.py)
+ARQUIVO_LOGS_PASTA = os.getenv('ARQUIVO_LOGS_PASTA',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'arquivo_logs'))
+
 def conectar_banco_de_dados():
     """Conecta ao banco de dados MySQL"""
     try:
@@ -39,6 +47,16 @@ def conectar_banco_de_dados():
         print(f"Erro ao conectar ao banco de dados: {e}")
         return None
 
+def invalidar_diretorio_servidor():
+    """Avisa o servidor principal que salas, usuários ou receptores mudaram"""
+    def notificar():
+        try:
+            requests.post(f"{SERVER_URL}/diretorio/invalidar", timeout=2)
+        except Exception as e:
+            print(f"Não foi possível invalidar o diretório do servidor: {e}")
+    
+    threading.Thread(target=notificar, daemon=True).start()
+
 def verificar_status_servidor():
     """Verifica se o servidor principal está online"""
     try:
@@ -47,6 +65,33 @@ def verificar_status_servidor():
     except:
         return False
 
+def buscar_ultimos_acionamentos(cursor, quantidade):
+    """
+    Agrupa só os eventos mais recentes: os ids saem do índice de data_hora
+    em vez de agrupar a tabela logs_alertas inteira.
+    """
+    cursor.execute("""
+        SELECT id_evento FROM logs_alertas
+        ORDER BY data_hora DESC
+        LIMIT 5000
+    """)
+    ids_eventos = list(dict.fromkeys(linha['id_evento'] for linha in cursor.fetchall()))[:quantidade]
+    if not ids_eventos:
+        return []
+    
+    marcadores = ", ".join(["%s"] * len(ids_eventos))
+    cursor.execute(f"""
+        SELECT nome_sala, nome_usuario, data_hora, id_evento,
+               COUNT(*) as total_receptores,
+               SUM(CASE WHEN status = 'Enviado' THEN 1 ELSE 0 END) as enviados_sucesso
+        FROM logs_alertas 
+        WHERE id_evento IN ({marcadores})
+        GROUP BY id_evento, nome_sala, nome_usuario, data_hora
+        ORDER BY data_hora DESC 
+        LIMIT %s
+    """, (*ids_eventos, quantidade))
+    return cursor.fetchall()
+
 @app.route('/')
 def inicio():
     """Página inicial com visão geral do sistema"""
@@ -64,20 +109,11 @@ def inicio():
     cursor.execute("SELECT COUNT(*) as total FROM usuarios")
     total_usuarios = cursor.fetchone()['total']
     
-    cursor.execute("SELECT COUNT(*) as total FROM RECEPTORES")
+    cursor.execute("SELECT COUNT(*) as total FROM receptores")
     total_receptores = cursor.fetchone()['total']
     
     # Últimos acionamentos por evento (últimos 5)
-    cursor.execute("""
-        SELECT nome_sala, nome_usuario, data_hora, id_evento,
-               COUNT(*) as total_receptores,
-               SUM(CASE WHEN status = 'Enviado' THEN 1 ELSE 0 END) as enviados_sucesso
-        FROM logs_alertas 
-        GROUP BY id_evento, nome_sala, nome_usuario, data_hora
-        ORDER BY data_hora DESC 
-        LIMIT 5
-    """)
-    ultimos_acionamentos = cursor.fetchall()
+    ultimos_acionamentos = buscar_ultimos_acionamentos(cursor, 5)
     
     # Logs do sistema (últimos 10)
     cursor.execute("""
@@ -145,7 +181,7 @@ def receptores():
         return render_template('erro.html')
     
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM RECEPTORES ORDER BY ip_receptor")
+    cursor.execute("SELECT * FROM receptores ORDER BY ip_receptor")
     receptores_list = cursor.fetchall()
     
     cursor.close()
@@ -153,12 +189,39 @@ def receptores():
     
     return render_template('receptores.html', receptores=receptores_list)
 
+def ler_logs_arquivados(tabela, data_inicio, data_fim):
+    """
+    Lê os registros de uma tabela de log entre data_inicio e data_fim nos
+    arquivos <tabela>_AAAAMM.csv.gz gerados pelo job de retenção. Só abre os
+    arquivos dos meses que cruzam o período pedido.
+    """
+    registros = []
+    for caminho in sorted(glob.glob(os.path.join(ARQUIVO_LOGS_PASTA, f"{tabela}_[0-9]*.csv.gz"))):
+        sufixo = os.path.basename(caminho)[len(tabela) + 1:-len('.csv.gz')]
+        try:
+            inicio_mes = datetime.strptime(sufixo, '%Y%m')
+        except ValueError:
+            continue
+        fim_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        if fim_mes <= data_inicio or inicio_mes >= data_fim:
+            continue
+        with gzip.open(caminho, 'rt', encoding='utf-8', newline='') as arquivo:
+            for linha in csv.DictReader(arquivo):
+                data_hora = datetime.strptime(linha['data_hora'], '%Y-%m-%d %H:%M:%S')
+                if data_inicio <= data_hora < data_fim:
+                    linha['data_hora'] = data_hora
+                    registros.append(linha)
+    registros.sort(key=lambda registro: registro['data_hora'], reverse=True)
+    return registros
+
 @app.route('/logs')
 def logs():
     """Página de visualização de logs"""
     # Parâmetros de filtro
     dias = request.args.get('dias', '7')
     tipo = request.args.get('tipo', 'todos')
+    de = request.args.get('de', '')
+    ate = request.args.get('ate', '')
     
     try:
         dias_int = int(dias)
@@ -166,6 +229,16 @@ def logs():
         dias_int = 7
     
     data_inicio = datetime.now() - timedelta(days=dias_int)
+    data_fim = datetime.now() + timedelta(days=1)
+    # Período personalizado, que pode alcançar os meses já arquivados
+    try:
+        if de:
+            data_inicio = datetime.strptime(de, '%Y-%m-%d')
+        if ate:
+            data_fim = datetime.strptime(ate, '%Y-%m-%d') + timedelta(days=1)
+    except ValueError:
+        flash('Data inválida no período personalizado', 'error')
+        de = ate = ''
     
     conn = conectar_banco_de_dados()
     if not conn:
@@ -176,25 +249,32 @@ def logs():
     
     logs_sistema = []
     logs_alertas = []
+    registros_arquivados = 0
     
     if tipo in ['todos', 'sistema']:
         cursor.execute("""
             SELECT log, data_hora 
             FROM logs_sitema 
-            WHERE data_hora >= %s 
+            WHERE data_hora >= %s AND data_hora < %s
             ORDER BY data_hora DESC
-        """, (data_inicio,))
+        """, (data_inicio, data_fim))
         logs_sistema = cursor.fetchall()
+        arquivados = ler_logs_arquivados('logs_sitema', data_inicio, data_fim)
+        registros_arquivados += len(arquivados)
+        logs_sistema.extend(arquivados)
     
     if tipo in ['todos', 'alertas']:
         cursor.execute("""
             SELECT ip_receptor, hostname_chamador, nome_usuario, nome_sala, 
                    data_hora, status, id_evento 
             FROM logs_alertas 
-            WHERE data_hora >= %s 
+            WHERE data_hora >= %s AND data_hora < %s
             ORDER BY data_hora DESC
-        """, (data_inicio,))
+        """, (data_inicio, data_fim))
         logs_alertas = cursor.fetchall()
+        arquivados = ler_logs_arquivados('logs_alertas', data_inicio, data_fim)
+        registros_arquivados += len(arquivados)
+        logs_alertas.extend(arquivados)
     
     cursor.close()
     conn.close()
@@ -203,7 +283,102 @@ def logs():
                          logs_sistema=logs_sistema,
                          logs_alertas=logs_alertas,
                          dias_selecionado=dias,
-                         tipo_selecionado=tipo)
+                         tipo_selecionado=tipo,
+                         de_selecionado=de,
+                         ate_selecionado=ate,
+                         registros_arquivados=registros_arquivados)
+
+NOMES_ETAPAS = {
+    "recebido": "Acionamento recebido",
+    "repeticao": "Acionamento repetido",
+    "diretorio": "Usuário e sala resolvidos",
+    "despacho": "Envio iniciado",
+    "resposta": "Resposta HTTP",
+    "ack_websocket": "Confirmação WebSocket",
+    "ack_multicast": "Confirmação multicast",
+    "exibido": "Tela exibida",
+    "reconhecido": "Reconhecido pelo operador",
+    "retomado": "Assumido por outro servidor",
+}
+
+def montar_linha_tempo(linhas):
+    """Junta as linhas de linha_tempo_eventos de um evento em etapas do servidor e por receptor"""
+    etapas = []
+    for linha in linhas:
+        try:
+            etapas.extend(json.loads(linha['etapas']))
+        except (TypeError, ValueError):
+            continue
+    if not etapas:
+        return None
+    
+    inicio = next((instante for etapa, _, instante, _ in etapas if etapa == 'recebido'),
+                  min(instante for _, _, instante, _ in etapas))
+    servidor = []
+    receptores = {}
+    for etapa, ip_receptor, instante, status in sorted(etapas, key=lambda e: e[2]):
+        item = {"etapa": etapa, "nome": NOMES_ETAPAS.get(etapa, etapa),
+                "ms": round(instante - inicio, 1), "status": status}
+        if ip_receptor is None or etapa == 'repeticao':
+            servidor.append(dict(item, ip_receptor=ip_receptor))
+        else:
+            receptores.setdefault(ip_receptor, []).append(item)
+    
+    despacho = next((item['ms'] for item in servidor if item['etapa'] == 'despacho'), 0)
+    # O reconhecimento pelo operador leva segundos: fica fora da escala da cascata
+    fim = max([item['ms'] for item in servidor] +
+              [item['ms'] for itens in receptores.values() for item in itens if item['etapa'] != 'reconhecido'] + [1])
+    lista_receptores = []
+    for ip_receptor, itens in receptores.items():
+        entregas = [item for item in itens if item['etapa'] not in ('exibido', 'reconhecido')]
+        exibido = next((item['ms'] for item in itens if item['etapa'] == 'exibido'), None)
+        reconhecido = next((item['ms'] for item in itens if item['etapa'] == 'reconhecido'), None)
+        entrega = next((item for item in entregas if item['status'] == 'Enviado'),
+                       entregas[-1] if entregas else None)
+        lista_receptores.append({
+            "ip_receptor": ip_receptor,
+            "tentativas": len([item for item in entregas if item['etapa'] == 'resposta']),
+            "entrega_ms": entrega['ms'] if entrega else None,
+            "canal": entrega['etapa'] if entrega else None,
+            "status": entrega['status'] if entrega else None,
+            "exibido_ms": exibido,
+            "reconhecido_ms": reconhecido,
+            "etapas": itens,
+        })
+    lista_receptores.sort(key=lambda r: (r['entrega_ms'] is None, r['entrega_ms'] or 0))
+    return {"servidor": servidor, "receptores": lista_receptores, "despacho_ms": despacho, "fim_ms": fim}
+
+@app.route('/eventos/<id_evento>')
+def linha_tempo_evento(id_evento):
+    """Linha do tempo (waterfall) de um evento de alerta"""
+    conn = conectar_banco_de_dados()
+    if not conn:
+        flash('Erro ao conectar com o banco de dados', 'error')
+        return render_template('erro.html')
+    
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT etapas FROM linha_tempo_eventos
+        WHERE id_evento = %s
+        ORDER BY id
+    """, (id_evento,))
+    linha_tempo = montar_linha_tempo(cursor.fetchall())
+    
+    cursor.execute("""
+        SELECT ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, status
+        FROM logs_alertas
+        WHERE id_evento = %s
+    """, (id_evento,))
+    logs_evento = cursor.fetchall()
+    
+    cursor.close()
+    conn.close()
+    
+    return render_template('evento.html',
+                         id_evento=id_evento,
+                         linha_tempo=linha_tempo,
+                         logs_evento=logs_evento,
+                         status_por_receptor={log['ip_receptor']: log['status'] for log in logs_evento})
 
 # APIs para CRUD
 
@@ -223,6 +398,7 @@ def adicionar_sala():
             VALUES (%s, %s, %s)
         """, (data['nome_sala'], data['hostname'], data.get('setor', '')))
         conn.commit()
+        invalidar_diretorio_servidor()
         flash('Sala adicionada com sucesso!', 'success')
         return jsonify({'success': True})
     except Exception as e:
@@ -249,6 +425,7 @@ def editar_sala(sala_id):
             WHERE id = %s
         """, (data['nome_sala'], data['hostname'], data.get('setor', ''), sala_id))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -268,6 +445,7 @@ def deletar_sala(sala_id):
     try:
         cursor.execute("DELETE FROM salas WHERE id = %s", (sala_id,))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -292,6 +470,7 @@ def adicionar_usuario():
             VALUES (%s, %s)
         """, (data['nome_usuario'], data['USERNAME']))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -317,6 +496,7 @@ def editar_usuario(usuario_id):
             WHERE id = %s
         """, (data['nome_usuario'], data['USERNAME'], usuario_id))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -336,6 +516,7 @@ def deletar_usuario(usuario_id):
     try:
         cursor.execute("DELETE FROM usuarios WHERE id = %s", (usuario_id,))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -356,11 +537,12 @@ def adicionar_receptor():
     cursor = conn.cursor()
     try:
         cursor.execute("""
-            INSERT INTO RECEPTORES (ip_receptor, nome_receptor, setor) 
+            INSERT INTO receptores (ip_receptor, nome_receptor, setor) 
             VALUES (%s, %s, %s)
         """, (data['ip_receptor'], data.get('nome_receptor', ''), 
               data.get('setor', '')))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -381,12 +563,13 @@ def editar_receptor(receptor_id):
     cursor = conn.cursor()
     try:
         cursor.execute("""
-            UPDATE RECEPTORES 
+            UPDATE receptores 
             SET ip_receptor = %s, nome_receptor = %s, setor = %s 
             WHERE id = %s
         """, (data['ip_receptor'], data.get('nome_receptor', ''), 
               data.get('setor', ''), receptor_id))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -404,8 +587,9 @@ def deletar_receptor(receptor_id):
     
     cursor = conn.cursor()
     try:
-        cursor.execute("DELETE FROM RECEPTORES WHERE id = %s", (receptor_id,))
+        cursor.execute("DELETE FROM receptores WHERE id = %s", (receptor_id,))
         conn.commit()
+        invalidar_diretorio_servidor()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -415,4 +599,5 @@ def deletar_receptor(receptor_id):
         conn.close()
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8100, debug=True) 
\ No newline at end of file
+    # Servidor de desenvolvimento; em produção use: python servir.py dashboard
+    app.run(host='0.0.0.0', port=8100, debug=os.getenv('DASHBOARD_DEBUG') == '1')
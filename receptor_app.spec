@@ -8,6 +8,11 @@ app_name = 'BotaoPanico_Receptor'
 main_script = 'src/receptor.py'
 icon_path = 'data/icons/client.png'
 
+# Pasta (onedir) por padrão: o executável de arquivo único extrai tudo para
+# uma pasta temporária a cada logon antes de o receptor começar a subir.
+# RECEPTOR_ONEFILE=1 volta a gerar um único .exe
+arquivo_unico = os.getenv('RECEPTOR_ONEFILE') == '1'
+
 # Dados adicionais para incluir no executável
 added_files = [
     ('data/icons/client.png'),
@@ -26,10 +31,13 @@ hiddenimports = [
     'tkinter.font',
     'threading',
     'queue',
-    'subprocess',
     'datetime',
-    'tempfile',
-    'requests',
+    'werkzeug.serving',  # importados dentro das funções (subida mais rápida)
+    'websockets',
+    'websockets.legacy.client',
+    'cliente_websocket',
+    'multicast',
+    'audio_alerta',
     'pygame',
     'pygame.mixer',
 ]
@@ -37,7 +45,7 @@ hiddenimports = [
 # Análise do script principal
 a = Analysis(
     [main_script],
-    pathex=[],
+    pathex=['src'],
     binaries=[],
     datas=added_files,
     hiddenimports=hiddenimports,
@@ -64,18 +72,22 @@ a = Analysis(
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
 # Configuração do executável
+if arquivo_unico:
+    conteudo_exe = [a.binaries, a.zipfiles, a.datas]
+else:
+    conteudo_exe = []
+
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
+    *conteudo_exe,
     [],
+    exclude_binaries=not arquivo_unico,
     name=app_name,
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    upx=False,  # DLLs comprimidas com UPX são descomprimidas a cada execução
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,  # Sem console
@@ -96,4 +108,16 @@ exe = EXE(
         'copyright': '© 2025 Sistema de Segurança',
         'original_filename': f'{app_name}.exe',
     }
-) 
\ No newline at end of file
+)
+
+if not arquivo_unico:
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name=app_name,
+    )
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Execução em produção do servidor de alertas e da dashboard.
+
+Substitui o app.run() (servidor de desenvolvimento do Flask) por um servidor
+WSGI de produção:
+
+- Linux: gunicorn com vários processos (workers) e threads por processo,
+  reload gracioso com `kill -HUP <pid do master>` e limite de conexões.
+- Windows: waitress (gunicorn não roda no Windows), com várias threads num
+  único processo e limite de conexões.
+
+Uso:
+    python servir.py servidor --workers 4 --threads 16
+    python servir.py dashboard --workers 2 --threads 8 --porta 8100
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+APPS = {
+    "servidor": {"porta": 9600},
+    "dashboard": {"porta": 8100},
+}
+
+
+def carregar_servidor():
+    sys.path.insert(0, os.path.join(RAIZ, "src"))
+    import server
+    return server.app
+
+
+def carregar_dashboard():
+    caminho = os.path.join(RAIZ, "dashboard", "app.py")
+    spec = importlib.util.spec_from_file_location("dashboard_app", caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules["dashboard_app"] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo.app
+
+
+CARREGADORES = {
+    "servidor": carregar_servidor,
+    "dashboard": carregar_dashboard,
+}
+
+
+def servir_gunicorn(carregador, host, porta, workers, threads, limite_conexoes,
+                    max_requisicoes, tempo_limite):
+    from gunicorn.app.base import BaseApplication
+
+    class AplicacaoGunicorn(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{porta}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("threads", threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("worker_connections", limite_conexoes)
+            self.cfg.set("backlog", limite_conexoes)
+            self.cfg.set("timeout", tempo_limite)
+            self.cfg.set("graceful_timeout", tempo_limite)
+            self.cfg.set("keepalive", 5)
+            # Recicla os workers aos poucos para conter vazamentos de memória
+            self.cfg.set("max_requests", max_requisicoes)
+            self.cfg.set("max_requests_jitter", max(1, max_requisicoes // 10))
+
+        def load(self):
+            # Chamado dentro de cada worker, depois do fork
+            return carregador()
+
+    AplicacaoGunicorn().run()
+
+
+def servir_waitress(carregador, host, porta, threads, limite_conexoes):
+    from waitress import serve
+
+    serve(carregador(), host=host, port=porta, threads=threads,
+          connection_limit=limite_conexoes, backlog=limite_conexoes,
+          channel_timeout=30)
+
+
+def servir(nome_app, host="0.0.0.0", porta=None, workers=None, threads=None,
+           limite_conexoes=1000, max_requisicoes=10000, tempo_limite=30, carregador=None):
+    porta = porta or APPS[nome_app]["porta"]
+    workers = workers or int(os.getenv("SERVIR_WORKERS", "2"))
+    threads = threads or int(os.getenv("SERVIR_THREADS", "8"))
+    carregador = carregador or CARREGADORES[nome_app]
+
+    if os.name == "nt":
+        if workers > 1:
+            print("Aviso: no Windows o waitress usa um único processo; --workers ignorado")
+        print(f"Iniciando {nome_app} com waitress em {host}:{porta} ({threads} threads)")
+        servir_waitress(carregador, host, porta, threads, limite_conexoes)
+    else:
+        print(f"Iniciando {nome_app} com gunicorn em {host}:{porta} "
+              f"({workers} workers x {threads} threads)")
+        servir_gunicorn(carregador, host, porta, workers, threads, limite_conexoes,
+                        max_requisicoes, tempo_limite)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa o servidor ou a dashboard em modo de produção")
+    parser.add_argument("app", choices=sorted(APPS))
+    parser.add_argument("--host", default=os.getenv("SERVIR_HOST", "0.0.0.0"))
+    parser.add_argument("--porta", type=int)
+    parser.add_argument("--workers", type=int, help="processos (padrão: SERVIR_WORKERS ou 2)")
+    parser.add_argument("--threads", type=int, help="threads por processo (padrão: SERVIR_THREADS ou 8)")
+    parser.add_argument("--limite-conexoes", type=int,
+                        default=int(os.getenv("SERVIR_LIMITE_CONEXOES", "1000")))
+    parser.add_argument("--max-requisicoes", type=int, default=10000,
+                        help="requisições atendidas por worker antes de ser reciclado")
+    parser.add_argument("--tempo-limite", type=int, default=30)
+    args = parser.parse_args()
+
+    servir(args.app, host=args.host, porta=args.porta, workers=args.workers,
+           threads=args.threads, limite_conexoes=args.limite_conexoes,
+           max_requisicoes=args.max_requisicoes, tempo_limite=args.tempo_limite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Som de alerta dos receptores.
+
+O mixer do pygame é iniciado uma vez, na subida do receptor, e o arquivo de
+som é decodificado nessa hora para um pygame.mixer.Sound em memória. Cada
+alerta toca esse buffer num canal próprio, com número fixo de repetições:
+o som começa junto com a janela e dois alertas ao mesmo tempo não se
+interrompem (mixer.music, usado antes, é um único fluxo global).
+
+O arquivo é procurado em SOM_ALERTA, na pasta sounds/ do executável
+(PyInstaller) ou do projeto e em C:\\Botão_panico\\sounds.
+
+O pygame só é importado em iniciar(): o processo principal do receptor_app,
+que importa este módulo mas não toca som, não paga esse custo na subida.
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+
+mixer = None  # pygame.mixer, importado em MotorAudio.iniciar()
+
+NOME_ARQUIVO = "alerta-sonoro.mp3"
+
+
+def caminhos_som():
+    caminhos = []
+    if os.getenv('SOM_ALERTA'):
+        caminhos.append(os.getenv('SOM_ALERTA'))
+    base_executavel = getattr(sys, '_MEIPASS', None)
+    if base_executavel:
+        caminhos.append(os.path.join(base_executavel, "sounds", NOME_ARQUIVO))
+    raiz = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    caminhos += [
+        os.path.join(raiz, "sounds", NOME_ARQUIVO),
+        os.path.join(raiz, "Botão_panico", "sounds", NOME_ARQUIVO),
+        os.path.join("C:\\", "Botão_panico", "sounds", NOME_ARQUIVO),
+        os.path.join("sounds", NOME_ARQUIVO),
+    ]
+    return caminhos
+
+
+class MotorAudio:
+    """Mixer iniciado uma vez e som do alerta pré-carregado, tocado em canais independentes"""
+
+    def __init__(self, canais=8, repeticoes=None):
+        self.canais = canais
+        self.repeticoes = repeticoes or int(os.getenv('SOM_REPETICOES', '4'))
+        self.som = None
+        self.arquivo = None
+        self.iniciado = False
+        self._lock = threading.Lock()
+
+    @property
+    def disponivel(self):
+        """pygame instalado (sem importá-lo)"""
+        return mixer is not None or importlib.util.find_spec("pygame") is not None
+
+    def iniciar(self):
+        """Inicia o mixer e decodifica o som; retorna True se há som para tocar"""
+        with self._lock:
+            if self.iniciado:
+                return self.som is not None
+            self.iniciado = True
+            global mixer
+            try:
+                from pygame import mixer
+            except ImportError:
+                print("Pygame não disponível - som desabilitado")
+                return False
+            try:
+                # Buffer pequeno: menos atraso entre play() e o som sair na caixa
+                mixer.pre_init(buffer=512)
+                mixer.init()
+                mixer.set_num_channels(self.canais)
+            except Exception as e:
+                print(f"Erro ao iniciar o mixer de áudio: {e}")
+                return False
+            for caminho in caminhos_som():
+                if os.path.exists(caminho):
+                    try:
+                        self.som = mixer.Sound(caminho)
+                        self.arquivo = caminho
+                    except Exception as e:
+                        print(f"Erro ao carregar o som {caminho}: {e}")
+                        continue
+                    break
+            if self.som is None:
+                print("Arquivo de som do alerta não encontrado - som desabilitado")
+            return self.som is not None
+
+    def tocar(self):
+        """
+        Toca o som do alerta num canal livre. Retorna (canal, duracao em
+        segundos) ou (None, 0) se não há som.
+        """
+        if not self.iniciar():
+            return None, 0
+        try:
+            # Com todos os canais ocupados, reaproveita o que toca há mais tempo
+            canal = mixer.find_channel(True)
+            canal.play(self.som, loops=self.repeticoes - 1)
+        except Exception as e:
+            print(f"Erro ao tocar o som do alerta: {e}")
+            return None, 0
+        return canal, self.som.get_length() * self.repeticoes
+
+
+motor_audio = MotorAudio()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Canal WebSocket persistente entre o servidor e os receptores.
+
+Cada receptor mantém uma conexão WebSocket aberta com o servidor (com ping
+periódico), e o alerta é transmitido por essas conexões já estabelecidas,
+sem um handshake TCP por alerta e sem depender de regras de entrada no
+firewall dos receptores.
+
+Quando o servidor roda com vários workers apenas um processo consegue abrir
+a porta do canal (o "hub"); os demais se conectam a ele pela mesma porta,
+via loopback, como clientes de controle e pedem a transmissão por ali.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+
+import websockets
+
+ENDERECOS_LOCAIS = ("127.0.0.1", "::1", "localhost")
+
+
+class CanalWebSocket:
+    """Hub dos receptores conectados (ou cliente de controle do hub)"""
+
+    def __init__(self, host="0.0.0.0", porta=9601, chave="alerta5656",
+                 intervalo_ping=10, tempo_limite_ping=10, proxies_confiaveis=()):
+        self.host = host
+        self.porta = porta
+        self.chave = chave
+        # Só conexões vindas destes endereços (e do loopback) podem informar outro ip_receptor
+        self.proxies_confiaveis = set(proxies_confiaveis)
+        self.intervalo_ping = intervalo_ping
+        self.tempo_limite_ping = tempo_limite_ping
+
+        self.modo = None  # "hub", "controle" ou None (indisponível)
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._receptores = {}  # ip_receptor -> websocket
+        self._acks = {}        # (id_evento, ip_receptor) -> Future
+        self._controle = None  # conexão com o hub, no modo controle
+        self._respostas = {}   # id da requisição de controle -> Future
+        self._sequencia = itertools.count(1)
+
+    # Inicialização -------------------------------------------------------
+
+    def iniciar(self, tempo_limite=5):
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name="canal-websocket", daemon=True)
+                self._thread.start()
+        try:
+            self._executar(self._assumir_papel(), tempo_limite)
+        except Exception as e:
+            print(f"Canal WebSocket indisponível: {e}")
+            self.modo = None
+        return self.modo
+
+    def _executar(self, corrotina, tempo_limite):
+        futuro = asyncio.run_coroutine_threadsafe(corrotina, self._loop)
+        return futuro.result(tempo_limite)
+
+    async def _assumir_papel(self):
+        try:
+            self._servidor = await websockets.serve(
+                self._atender, self.host, self.porta,
+                ping_interval=self.intervalo_ping, ping_timeout=self.tempo_limite_ping)
+            self.modo = "hub"
+            print(f"Canal WebSocket escutando na porta {self.porta}")
+        except OSError:
+            # Porta já aberta por outro worker: vira cliente de controle dele
+            await self._conectar_controle()
+            self.modo = "controle"
+
+    # Lado do hub ----------------------------------------------------------
+
+    async def _atender(self, websocket):
+        try:
+            registro = json.loads(await asyncio.wait_for(websocket.recv(), 10))
+        except Exception:
+            return
+        if registro.get("chave") != self.chave:
+            await websocket.close(code=4001, reason="Chave inválida")
+            return
+
+        if registro.get("tipo") == "controle":
+            if websocket.remote_address[0] in ENDERECOS_LOCAIS:
+                await self._atender_controle(websocket)
+            return
+
+        ip_receptor = self._identificar(websocket, registro)
+        anterior = self._receptores.get(ip_receptor)
+        self._receptores[ip_receptor] = websocket
+        if anterior is not None and anterior is not websocket:
+            await anterior.close(code=4000, reason="Substituída por nova conexão")
+        print(f"Receptor {ip_receptor} conectado pelo canal WebSocket")
+
+        try:
+            async for mensagem in websocket:
+                dados = json.loads(mensagem)
+                if dados.get("tipo") == "ack":
+                    futuro = self._acks.pop((dados.get("id_evento"), ip_receptor), None)
+                    if futuro is not None and not futuro.done():
+                        futuro.set_result(time.monotonic())
+        except (websockets.ConnectionClosed, ValueError):
+            pass
+        finally:
+            if self._receptores.get(ip_receptor) is websocket:
+                del self._receptores[ip_receptor]
+            print(f"Receptor {ip_receptor} desconectado do canal WebSocket")
+
+    def _identificar(self, websocket, registro):
+        """
+        O receptor é identificado pelo endereço de origem da conexão; o
+        ip_receptor enviado no registro só vale atrás do loopback ou de um
+        proxy confiável. Assim outra máquina da rede não consegue se registrar
+        com o IP de um receptor e tomar o lugar da conexão dele.
+        """
+        origem = websocket.remote_address[0]
+        if origem.startswith("::ffff:"):
+            origem = origem[len("::ffff:"):]
+        informado = registro.get("ip_receptor")
+        if not informado or informado == origem:
+            return origem
+        if origem in ENDERECOS_LOCAIS or origem in self.proxies_confiaveis:
+            return informado
+        print(f"Registro WebSocket de {origem} informou ip_receptor {informado}; usando o endereço de origem")
+        return origem
+
+    async def _atender_controle(self, websocket):
+        async def responder(pedido):
+            status, latencias = await self._transmitir_local(pedido["payload"], pedido["tempo_limite"],
+                                                             pedido.get("destinos"))
+            await websocket.send(json.dumps({"id": pedido["id"], "status": status, "latencias": latencias}))
+
+        try:
+            async for mensagem in websocket:
+                asyncio.ensure_future(responder(json.loads(mensagem)))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _enviar_e_aguardar(self, ip_receptor, websocket, mensagem, id_evento, tempo_limite):
+        """Retorna (status, instante monotônico da confirmação ou None)"""
+        futuro = self._loop.create_future()
+        self._acks[(id_evento, ip_receptor)] = futuro
+        try:
+            await websocket.send(mensagem)
+            return "Enviado", await asyncio.wait_for(futuro, tempo_limite)
+        except asyncio.TimeoutError:
+            return "Timeout", None
+        except websockets.ConnectionClosed:
+            return "Erro_Conexao", None
+        finally:
+            self._acks.pop((id_evento, ip_receptor), None)
+
+    async def _transmitir_local(self, payload, tempo_limite, destinos=None):
+        """Retorna ({ip_receptor: status}, {ip_receptor: segundos do início até a confirmação})"""
+        mensagem = json.dumps(dict(payload, tipo="alerta"))
+        id_evento = payload.get("id_evento")
+        receptores = list(self._receptores.items())
+        if destinos is not None:
+            destinos = set(destinos)
+            receptores = [(ip, websocket) for ip, websocket in receptores if ip in destinos]
+        inicio = time.monotonic()
+        resultados = await asyncio.gather(*[
+            self._enviar_e_aguardar(ip, websocket, mensagem, id_evento, tempo_limite)
+            for ip, websocket in receptores])
+        status = {ip: status for (ip, _), (status, _) in zip(receptores, resultados)}
+        # Durações, e não instantes: no modo controle o relógio do hub é de outro processo
+        latencias = {ip: chegada - inicio for (ip, _), (_, chegada) in zip(receptores, resultados)
+                     if chegada is not None}
+        return status, latencias
+
+    # Lado do cliente de controle -------------------------------------------
+
+    async def _conectar_controle(self):
+        self._controle = await websockets.connect(
+            f"ws://127.0.0.1:{self.porta}", ping_interval=self.intervalo_ping,
+            ping_timeout=self.tempo_limite_ping)
+        await self._controle.send(json.dumps({"tipo": "controle", "chave": self.chave}))
+        asyncio.ensure_future(self._ler_respostas(self._controle))
+
+    async def _ler_respostas(self, conexao):
+        try:
+            async for mensagem in conexao:
+                dados = json.loads(mensagem)
+                futuro = self._respostas.pop(dados.get("id"), None)
+                if futuro is not None and not futuro.done():
+                    futuro.set_result((dados.get("status", {}), dados.get("latencias", {})))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for futuro in self._respostas.values():
+                if not futuro.done():
+                    futuro.set_result(({}, {}))
+            self._respostas.clear()
+
+    async def _transmitir_via_hub(self, payload, tempo_limite, destinos=None):
+        if self._controle is None or self._controle.closed:
+            # O hub caiu (worker reciclado): tenta assumir a porta ou reconectar
+            await self._assumir_papel()
+            if self.modo == "hub":
+                return await self._transmitir_local(payload, tempo_limite, destinos)
+
+        id_pedido = next(self._sequencia)
+        futuro = self._loop.create_future()
+        self._respostas[id_pedido] = futuro
+        await self._controle.send(json.dumps({"id": id_pedido, "payload": payload,
+                                              "tempo_limite": tempo_limite, "destinos": destinos}))
+        return await asyncio.wait_for(futuro, tempo_limite + 1)
+
+    # API usada pelo servidor ----------------------------------------------
+
+    def transmitir(self, payload, tempo_limite=1.0, destinos=None, instantes=None):
+        """
+        Envia o alerta aos receptores conectados (só aos IPs de destinos, se
+        informado) e aguarda a confirmação de cada um. Retorna {ip_receptor: status}.
+        Se instantes for um dict, recebe {ip_receptor: instante (time.monotonic())
+        em que a confirmação chegou}.
+        """
+        if self.modo is None:
+            return {}
+        destinos = list(destinos) if destinos is not None else None
+        inicio = time.monotonic()
+        try:
+            if self.modo == "hub":
+                corrotina = self._transmitir_local(payload, tempo_limite, destinos)
+            else:
+                corrotina = self._transmitir_via_hub(payload, tempo_limite, destinos)
+            status, latencias = self._executar(corrotina, tempo_limite + 2)
+        except Exception as e:
+            print(f"Erro ao transmitir pelo canal WebSocket: {e}")
+            return {}
+        if instantes is not None:
+            instantes.update({ip: inicio + latencia for ip, latencia in latencias.items()})
+        return status
+
+    def conectados(self):
+        if self.modo != "hub":
+            return []
+        return list(self._receptores)
+
+    def encerrar(self):
+        if self._loop is None:
+            return
+
+        async def fechar():
+            if self._servidor is not None:
+                self._servidor.close()
+            if self._controle is not None:
+                await self._controle.close()
+
+        try:
+            self._executar(fechar(), 5)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
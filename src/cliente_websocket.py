@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Cliente WebSocket dos receptores.
+
+Mantém uma conexão permanente com o canal do servidor, reconectando com
+espera crescente quando ela cai, e entrega cada alerta recebido para a mesma
+rotina usada pela rota HTTP do receptor.
+"""
+
+import asyncio
+import json
+import random
+import threading
+from collections import OrderedDict
+
+
+class EventosRecentes:
+    """Ids de evento já exibidos, para ignorar o mesmo alerta vindo por outro caminho"""
+
+    def __init__(self, tamanho=256):
+        self.tamanho = tamanho
+        self._ids = OrderedDict()
+        self._lock = threading.Lock()
+
+    def registrar(self, id_evento):
+        """Retorna True se o evento é novo"""
+        if not id_evento:
+            return True
+        with self._lock:
+            if id_evento in self._ids:
+                return False
+            self._ids[id_evento] = True
+            if len(self._ids) > self.tamanho:
+                self._ids.popitem(last=False)
+            return True
+
+
+class ClienteWebSocket:
+    """Conexão permanente do receptor com o canal WebSocket do servidor"""
+
+    def __init__(self, url, ao_receber, chave="alerta5656", ip_receptor=None,
+                 intervalo_ping=10, tempo_limite_ping=10, espera_maxima=30, ao_mudar_estado=None):
+        self.url = url
+        self.ao_receber = ao_receber  # função(sala, usuario, id_evento)
+        self.chave = chave
+        self.ip_receptor = ip_receptor
+        self.intervalo_ping = intervalo_ping
+        self.tempo_limite_ping = tempo_limite_ping
+        self.espera_maxima = espera_maxima
+        self.ao_mudar_estado = ao_mudar_estado
+        self.conectado = False
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._executar()),
+                                            name="cliente-websocket", daemon=True)
+            self._thread.start()
+
+    def _estado(self, conectado):
+        self.conectado = conectado
+        if self.ao_mudar_estado:
+            try:
+                self.ao_mudar_estado(conectado)
+            except Exception as e:
+                print(f"Erro ao atualizar estado do canal WebSocket: {e}")
+
+    async def _executar(self):
+        import websockets
+
+        tentativa = 0
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=self.intervalo_ping,
+                                              ping_timeout=self.tempo_limite_ping) as conexao:
+                    await conexao.send(json.dumps({
+                        "tipo": "registro",
+                        "chave": self.chave,
+                        # IP local usado para falar com o servidor, o mesmo cadastrado em receptores
+                        "ip_receptor": self.ip_receptor or conexao.local_address[0],
+                    }))
+                    tentativa = 0
+                    self._estado(True)
+                    async for mensagem in conexao:
+                        dados = json.loads(mensagem)
+                        if dados.get("tipo") != "alerta" or dados.get("codigo") != self.chave:
+                            continue
+                        self.ao_receber(dados.get("sala", "Desconhecida"),
+                                        dados.get("usuario", "Desconhecido"),
+                                        dados.get("id_evento"))
+                        await conexao.send(json.dumps({"tipo": "ack", "id_evento": dados.get("id_evento")}))
+            except Exception as e:
+                print(f"Canal WebSocket desconectado: {e}")
+            self._estado(False)
+            tentativa += 1
+            await asyncio.sleep(random.uniform(0.5, min(self.espera_maxima, 2 ** tentativa)))
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Coordenação de vários servidores de alerta ativos ao mesmo tempo.
+
+Os nós compartilham o banco botao_panico:
+
+  - eventos_cluster: uma linha por acionamento, com chave única (o
+    id_acionamento enviado pelo botão). O nó que consegue inserir a linha é o
+    dono do evento; um segundo nó que receba o mesmo acionamento responde com
+    o id_evento já existente, sem enviar de novo.
+  - O dono renova um lease (lease_expira) enquanto o evento e as retentativas
+    dele estão em andamento. Se o nó cair, o lease vence e outro nó assume o
+    evento com um UPDATE condicional; só um consegue.
+  - entregas_cluster: receptores que já confirmaram o alerta, para que o nó
+    que assume reenvie apenas aos que faltam (os receptores ignoram alertas
+    repetidos pelo id_evento, então um reenvio não causa duas telas).
+
+Os instantes são milissegundos desde a época segundo o relógio de cada nó;
+os servidores precisam estar sincronizados (NTP) com folga bem menor que o
+lease.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+
+
+def agora_ms():
+    return int(time.time() * 1000)
+
+
+class CoordenadorCluster:
+    """Dedupe, lease e retomada de eventos entre os nós do servidor de alertas"""
+
+    def __init__(self, pool, ao_assumir, no_id=None, lease=15, intervalo=None,
+                 idade_maxima=600, max_assumir=20, retencao=86400, preparar=None):
+        self.pool = pool
+        self.ao_assumir = ao_assumir  # função(dados, entregues), chamada no nó que assume
+        self.preparar = preparar  # chamada antes de cada ciclo (migrações do banco)
+        self.no_id = no_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = lease
+        self.intervalo = intervalo or max(0.5, lease / 3)
+        self.idade_maxima = idade_maxima
+        self.max_assumir = max_assumir
+        self.retencao = retencao
+
+        self._lock = threading.Lock()
+        self._acompanhados = {}  # id_evento -> instante (monotônico) do fim das retentativas
+        self._thread = None
+        self._parar = threading.Event()
+        self._pid = os.getpid()
+        self._proxima_limpeza = 0
+
+        self.eventos_registrados = 0
+        self.eventos_duplicados = 0
+        self.eventos_assumidos = 0
+        self.falhas_banco = 0
+
+    # Nó que recebe o acionamento --------------------------------------------
+
+    def registrar_evento(self, chave, dados, prazo):
+        """
+        Tenta registrar o evento como deste nó. Retorna None se registrou (ou
+        se o banco está indisponível: o alerta não pode esperar) ou o
+        id_evento do evento que outro nó já registrou com a mesma chave.
+        """
+        id_evento = dados["id_evento"]
+        agora = agora_ms()
+        try:
+            with self.pool.conexao() as conn:
+                if not conn:
+                    raise ConnectionError("Banco de dados indisponível")
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT IGNORE INTO eventos_cluster (id_evento, chave, dados, no_dono, lease_expira, "
+                    "estado, criado_em) VALUES (%s, %s, %s, %s, %s, 'em_andamento', %s)",
+                    (id_evento, chave, json.dumps(dados), self.no_id, agora + int(self.lease * 1000), agora))
+                inserido = cursor.rowcount == 1
+                existente = None
+                if not inserido:
+                    cursor.execute("SELECT id_evento FROM eventos_cluster WHERE chave = %s", (chave,))
+                    linhas = cursor.fetchall()
+                    existente = linhas[0][0] if linhas else None
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            with self._lock:
+                self.falhas_banco += 1
+            print(f"Cluster: não foi possível registrar o evento {id_evento}, enviando sem coordenação: {e}")
+            return None
+
+        if existente is not None and existente != id_evento:
+            with self._lock:
+                self.eventos_duplicados += 1
+            return existente
+        self.acompanhar(id_evento, prazo)
+        with self._lock:
+            self.eventos_registrados += 1
+        return None
+
+    def acompanhar(self, id_evento, prazo):
+        """Mantém o lease do evento até o instante monotônico prazo"""
+        self.iniciar()
+        with self._lock:
+            self._acompanhados[id_evento] = prazo
+
+    def registrar_entregas(self, id_evento, ips_receptores):
+        """
+        Grava na hora os receptores que confirmaram o alerta: um nó que
+        assuma o evento logo depois da queda deste lê entregas_cluster e não
+        pode ficar sem as entregas ainda paradas numa fila. Retorna False se
+        o banco falhou.
+        """
+        try:
+            with self.pool.conexao() as conn:
+                if not conn:
+                    raise ConnectionError("Banco de dados indisponível")
+                cursor = conn.cursor()
+                cursor.executemany("INSERT IGNORE INTO entregas_cluster (id_evento, ip_receptor) VALUES (%s, %s)",
+                                   [(id_evento, ip_receptor) for ip_receptor in ips_receptores])
+                conn.commit()
+                cursor.close()
+            return True
+        except Exception as e:
+            with self._lock:
+                self.falhas_banco += 1
+            print(f"Cluster: não foi possível gravar as entregas do evento {id_evento}: {e}")
+            return False
+
+    def conhece_evento(self, id_evento):
+        """O evento foi registrado por algum nó? None se o banco está indisponível"""
+        try:
+            with self.pool.conexao() as conn:
+                if not conn:
+                    return None
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM eventos_cluster WHERE id_evento = %s", (id_evento,))
+                encontrado = bool(cursor.fetchall())
+                cursor.close()
+            return encontrado
+        except Exception as e:
+            print(f"Cluster: não foi possível consultar o evento {id_evento}: {e}")
+            return None
+
+    # Manutenção em segundo plano --------------------------------------------
+
+    def iniciar(self):
+        # Reinicia a thread quando o processo foi criado por fork (workers)
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._acompanhados = {}
+            self._parar = threading.Event()
+            self._thread = threading.Thread(target=self._executar, name="cluster", daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        parar = self._parar
+        while not parar.is_set():
+            try:
+                if self.preparar is not None:
+                    self.preparar()
+                self.renovar()
+                self.assumir_vencidos()
+                self._limpar()
+            except Exception as e:
+                with self._lock:
+                    self.falhas_banco += 1
+                print(f"Erro na coordenação do cluster: {e}")
+            parar.wait(self.intervalo)
+
+    def renovar(self):
+        """Renova o lease dos eventos em andamento e conclui os que já terminaram"""
+        agora = time.monotonic()
+        with self._lock:
+            ativos = [id_evento for id_evento, prazo in self._acompanhados.items() if prazo > agora]
+            concluidos = [id_evento for id_evento, prazo in self._acompanhados.items() if prazo <= agora]
+        if not ativos and not concluidos:
+            return
+        with self.pool.conexao() as conn:
+            if not conn:
+                raise ConnectionError("Banco de dados indisponível")
+            cursor = conn.cursor()
+            if ativos:
+                marcadores = ", ".join(["%s"] * len(ativos))
+                cursor.execute(f"UPDATE eventos_cluster SET lease_expira = %s "
+                               f"WHERE no_dono = %s AND estado = 'em_andamento' AND id_evento IN ({marcadores})",
+                               [agora_ms() + int(self.lease * 1000), self.no_id] + ativos)
+            if concluidos:
+                marcadores = ", ".join(["%s"] * len(concluidos))
+                cursor.execute(f"UPDATE eventos_cluster SET estado = 'concluido' "
+                               f"WHERE no_dono = %s AND id_evento IN ({marcadores})",
+                               [self.no_id] + concluidos)
+            conn.commit()
+            cursor.close()
+        with self._lock:
+            for id_evento in concluidos:
+                self._acompanhados.pop(id_evento, None)
+
+    def assumir_vencidos(self):
+        """Assume os eventos cujo dono parou de renovar o lease; retorna quantos assumiu"""
+        agora = agora_ms()
+        with self.pool.conexao() as conn:
+            if not conn:
+                raise ConnectionError("Banco de dados indisponível")
+            cursor = conn.cursor()
+            cursor.execute("SELECT id_evento, dados, criado_em FROM eventos_cluster "
+                           "WHERE estado = 'em_andamento' AND lease_expira < %s "
+                           "ORDER BY criado_em LIMIT %s", (agora, self.max_assumir))
+            vencidos = cursor.fetchall()
+
+            assumidos = []
+            for id_evento, dados, criado_em in vencidos:
+                if agora - criado_em > self.idade_maxima * 1000:
+                    # Velho demais para ainda ser útil na tela dos receptores
+                    cursor.execute("UPDATE eventos_cluster SET estado = 'abandonado' "
+                                   "WHERE id_evento = %s AND estado = 'em_andamento' AND lease_expira < %s",
+                                   (id_evento, agora))
+                    conn.commit()
+                    print(f"Cluster: evento {id_evento} abandonado, sem dono há mais de {self.idade_maxima}s")
+                    continue
+                # Só um nó consegue trocar o dono enquanto o lease está vencido
+                cursor.execute("UPDATE eventos_cluster SET no_dono = %s, lease_expira = %s "
+                               "WHERE id_evento = %s AND estado = 'em_andamento' AND lease_expira < %s",
+                               (self.no_id, agora + int(self.lease * 1000), id_evento, agora))
+                ganhou = cursor.rowcount == 1
+                conn.commit()
+                if not ganhou:
+                    continue
+                cursor.execute("SELECT ip_receptor FROM entregas_cluster WHERE id_evento = %s", (id_evento,))
+                entregues = {linha[0] for linha in cursor.fetchall()}
+                assumidos.append((json.loads(dados), entregues))
+            cursor.close()
+
+        for dados, entregues in assumidos:
+            with self._lock:
+                self.eventos_assumidos += 1
+            print(f"Cluster: nó {self.no_id} assumiu o evento {dados['id_evento']} "
+                  f"({len(entregues)} receptores já atendidos)")
+            try:
+                self.ao_assumir(dados, entregues)
+            except Exception as e:
+                print(f"Erro ao retomar o evento {dados['id_evento']}: {e}")
+        return len(assumidos)
+
+    def _limpar(self):
+        agora = time.monotonic()
+        if agora < self._proxima_limpeza:
+            return
+        self._proxima_limpeza = agora + 600
+        limite = agora_ms() - int(self.retencao * 1000)
+        with self.pool.conexao() as conn:
+            if not conn:
+                return
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM entregas_cluster WHERE id_evento IN "
+                           "(SELECT id_evento FROM eventos_cluster WHERE estado <> 'em_andamento' AND criado_em < %s)",
+                           (limite,))
+            cursor.execute("DELETE FROM eventos_cluster WHERE estado <> 'em_andamento' AND criado_em < %s", (limite,))
+            conn.commit()
+            cursor.close()
+
+    def liberar(self):
+        """
+        Devolve os leases dos eventos ainda em andamento (encerramento
+        ordenado do worker), para que outro nó os assuma sem esperar o lease
+        vencer.
+        """
+        with self._lock:
+            pendentes = [id_evento for id_evento, prazo in self._acompanhados.items() if prazo > time.monotonic()]
+            self._acompanhados.clear()
+        if not pendentes:
+            return
+        try:
+            with self.pool.conexao() as conn:
+                if not conn:
+                    return
+                cursor = conn.cursor()
+                marcadores = ", ".join(["%s"] * len(pendentes))
+                cursor.execute(f"UPDATE eventos_cluster SET lease_expira = 0 "
+                               f"WHERE no_dono = %s AND estado = 'em_andamento' AND id_evento IN ({marcadores})",
+                               [self.no_id] + pendentes)
+                conn.commit()
+                cursor.close()
+        except Exception as e:
+            print(f"Cluster: não foi possível liberar os eventos em andamento: {e}")
+
+    def encerrar(self):
+        self._parar.set()
+        self.liberar()
+
+    def estado(self):
+        with self._lock:
+            return {
+                "no_id": self.no_id,
+                "lease_s": self.lease,
+                "eventos_acompanhados": len(self._acompanhados),
+                "eventos_registrados": self.eventos_registrados,
+                "eventos_duplicados": self.eventos_duplicados,
+                "eventos_assumidos": self.eventos_assumidos,
+                "falhas_banco": self.falhas_banco,
+            }
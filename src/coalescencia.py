@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Janela de coalescência dos acionamentos repetidos.
+
+Quando o mesmo usuário aperta o botão várias vezes na mesma máquina, os
+acionamentos dentro da janela são anexados ao evento já em andamento em vez
+de gerar um novo envio para todos os receptores.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class JanelaCoalescencia:
+    """Eventos recentes por (hostname, usuario), com tamanho limitado"""
+
+    def __init__(self, janela=30, max_entradas=10000):
+        self.janela = janela
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._eventos = OrderedDict()  # chave -> (evento, ultimo_acionamento)
+        self.coalescidos = 0
+
+    def _remover_expirados(self, agora):
+        # O dicionário fica ordenado pelo último acionamento
+        while self._eventos:
+            chave, (_, ultimo) = next(iter(self._eventos.items()))
+            if agora - ultimo < self.janela:
+                break
+            self._eventos.popitem(last=False)
+
+    def anexar_ou_registrar(self, hostname, usuario, evento):
+        """
+        Retorna o evento em andamento para (hostname, usuario) se houver um na
+        janela, contando o acionamento repetido; caso contrário registra o
+        evento novo e retorna None.
+        """
+        if self.janela <= 0:
+            return None
+
+        chave = (hostname, usuario)
+        agora = time.monotonic()
+        with self._lock:
+            self._remover_expirados(agora)
+            existente = self._eventos.get(chave)
+            if existente is not None:
+                evento_existente = existente[0]
+                evento_existente.repeticoes += 1
+                self._eventos[chave] = (evento_existente, agora)
+                self._eventos.move_to_end(chave)
+                self.coalescidos += 1
+                return evento_existente
+
+            self._eventos[chave] = (evento, agora)
+            if len(self._eventos) > self.max_entradas:
+                self._eventos.popitem(last=False)
+            return None
+
+    def descartar(self, hostname, usuario, evento):
+        """Remove o registro de (hostname, usuario) se ele ainda aponta para evento"""
+        chave = (hostname, usuario)
+        with self._lock:
+            existente = self._eventos.get(chave)
+            if existente is not None and existente[0] is evento:
+                del self._eventos[chave]
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "janela_s": self.janela,
+                "eventos_na_janela": len(self._eventos),
+                "coalescidos": self.coalescidos,
+            }
@@ -25,12 +25,36 @@ create table salas (
 create table receptores (
     id int auto_increment primary key,
     ip_receptor varchar(255) not null,
-    nome_receptor varchar(255) not null
+    nome_receptor varchar(255) not null,
+    setor varchar(255) not null default ''
 );
 
 
+create table linha_tempo_eventos (
+    id int auto_increment primary key,
+    id_evento varchar(255) not null,
+    data_hora datetime not null,
+    etapas mediumtext not null
+);
+
 create table logs_sitema (
     id int auto_increment primary key,
     log varchar(255) not null,
     data_hora datetime not null
-);
\ No newline at end of file
+);
+
+create table eventos_cluster (
+    id_evento varchar(64) primary key,
+    chave varchar(255) not null,
+    dados text not null,
+    no_dono varchar(255) not null,
+    lease_expira bigint not null,
+    estado varchar(20) not null,
+    criado_em bigint not null
+);
+
+create table entregas_cluster (
+    id_evento varchar(64) not null,
+    ip_receptor varchar(255) not null,
+    primary key (id_evento, ip_receptor)
+);
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Motor de envio (fan-out) dos alertas para os receptores.
+
+Os eventos são processados fora da requisição do botão, e as entregas de
+todos os eventos compartilham um único pool limitado de threads, de modo que
+vários alertas simultâneos não multiplicam o número de threads.
+"""
+
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class AgendadorRetentativas:
+    """
+    Fila de retentativas ordenada pelo horário de execução.
+
+    Uma única thread espera pela próxima retentativa vencida e a entrega ao
+    executor de envios; nenhuma thread fica parada por retentativa pendente.
+    """
+
+    def __init__(self, executar, base=0.5, maximo=15):
+        self.executar = executar  # função(funcao, *args) que dispara a retentativa
+        self.base = base
+        self.maximo = maximo
+        self._condicao = threading.Condition()
+        self._fila = []
+        self._sequencia = itertools.count()
+        self._thread = None
+        self._pid = None
+        self._parar = False
+
+    def atraso(self, tentativa):
+        """Backoff exponencial com jitter ("full jitter") para a tentativa n"""
+        return random.uniform(0, min(self.maximo, self.base * (2 ** tentativa)))
+
+    def agendar(self, atraso, funcao, *args):
+        with self._condicao:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._fila = []
+                self._parar = False
+                self._thread = threading.Thread(target=self._executar, name="retentativas", daemon=True)
+                self._thread.start()
+            heapq.heappush(self._fila, (time.monotonic() + atraso, next(self._sequencia), funcao, args))
+            self._condicao.notify()
+
+    def pendentes(self):
+        with self._condicao:
+            return len(self._fila)
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                while not self._parar:
+                    if self._fila:
+                        espera = self._fila[0][0] - time.monotonic()
+                        if espera <= 0:
+                            break
+                        self._condicao.wait(espera)
+                    else:
+                        self._condicao.wait()
+                if self._parar:
+                    return
+                _, _, funcao, args = heapq.heappop(self._fila)
+            try:
+                self.executar(funcao, *args)
+            except Exception as e:
+                print(f"Erro ao disparar retentativa: {e}")
+
+    def encerrar(self):
+        with self._condicao:
+            self._parar = True
+            self._fila = []
+            self._condicao.notify_all()
+
+
+class Despachante:
+    """Executa os eventos em segundo plano e entrega para os receptores em paralelo"""
+
+    def __init__(self, max_entregas=100, max_eventos=8, prazo_evento=10,
+                 retentativa_base=0.5, retentativa_maximo=15):
+        self.max_entregas = max_entregas
+        self.max_eventos = max_eventos
+        self.prazo_evento = prazo_evento
+        self.retentativas = AgendadorRetentativas(self._submeter_entrega, base=retentativa_base,
+                                                  maximo=retentativa_maximo)
+
+        self._lock = threading.Lock()
+        self._executor_entregas = None
+        self._executor_eventos = None
+        self._sessoes = {}
+
+    def _executores(self):
+        # Criados sob demanda para que cada worker (após fork) tenha os seus
+        with self._lock:
+            if self._executor_eventos is None:
+                self._executor_eventos = ThreadPoolExecutor(
+                    max_workers=self.max_eventos, thread_name_prefix="evento")
+                self._executor_entregas = ThreadPoolExecutor(
+                    max_workers=self.max_entregas, thread_name_prefix="entrega")
+            return self._executor_eventos, self._executor_entregas
+
+    def sessao(self, ip_receptor):
+        """Sessão HTTP keep-alive reaproveitada entre os alertas de um receptor"""
+        with self._lock:
+            sessao = self._sessoes.get(ip_receptor)
+            if sessao is None:
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+                sessao.mount("http://", adaptador)
+                self._sessoes[ip_receptor] = sessao
+            return sessao
+
+    def descartar_sessao(self, ip_receptor):
+        with self._lock:
+            sessao = self._sessoes.pop(ip_receptor, None)
+        if sessao is not None:
+            sessao.close()
+
+    def agendar_evento(self, funcao, *args):
+        """Processa um evento em segundo plano e retorna imediatamente"""
+        executor_eventos, _ = self._executores()
+        return executor_eventos.submit(funcao, *args)
+
+    def _submeter_entrega(self, funcao, *args):
+        _, executor_entregas = self._executores()
+        executor_entregas.submit(funcao, *args)
+
+    def agendar_retentativa(self, tentativa, prazo_final, funcao, *args):
+        """
+        Agenda uma nova execução de funcao com backoff; retorna False se a
+        próxima tentativa já cairia depois do prazo final do evento.
+        """
+        atraso = self.retentativas.atraso(tentativa)
+        if time.monotonic() + atraso >= prazo_final:
+            return False
+        self.retentativas.agendar(atraso, funcao, *args)
+        return True
+
+    def entregar(self, destinos, funcao, *args, prazo=None):
+        """
+        Chama funcao(destino, prazo_final, *args) para cada destino em paralelo.
+
+        Aguarda no máximo até o prazo do evento e retorna a lista dos destinos
+        que não foram atendidos a tempo.
+        """
+        _, executor_entregas = self._executores()
+        prazo_final = time.monotonic() + (prazo or self.prazo_evento)
+
+        futuros = {executor_entregas.submit(funcao, destino, prazo_final, *args): destino
+                   for destino in destinos}
+        _, pendentes = wait(futuros, timeout=max(0, prazo_final - time.monotonic()))
+
+        nao_atendidos = []
+        for futuro in pendentes:
+            # Entregas que ainda nem começaram não serão mais tentadas
+            if futuro.cancel():
+                nao_atendidos.append(futuros[futuro])
+        return nao_atendidos
+
+    def encerrar(self):
+        self.retentativas.encerrar()
+        with self._lock:
+            executores = (self._executor_eventos, self._executor_entregas)
+            self._executor_eventos = None
+            self._executor_entregas = None
+            sessoes = list(self._sessoes.values())
+            self._sessoes.clear()
+        for executor in executores:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        for sessao in sessoes:
+            sessao.close()
+
+
+def tempo_restante(prazo_final, maximo):
+    """Timeout de uma chamada limitado ao que resta do prazo do evento"""
+    return max(0.05, min(maximo, prazo_final - time.monotonic()))
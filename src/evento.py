@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Evento de alerta que percorre todo o fluxo do servidor.
+
+Cada acionamento do botão gera um EventoAlerta com os dados da requisição;
+ele é passado explicitamente da rota até cada envio para os receptores, sem
+depender de variáveis globais compartilhadas entre requisições.
+
+O evento também guarda a linha do tempo das etapas (recebimento, resolução
+do diretório, início do envio, resposta e exibição em cada receptor), medida
+com o relógio monotônico a partir do recebimento.
+"""
+
+import random
+import string
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+def gerar_combo(tamanho=6):
+
+  caracteres = string.ascii_letters + string.digits
+  combo = ''.join(random.choices(caracteres, k=tamanho))
+
+  return combo
+
+
+@dataclass
+class EventoAlerta:
+    hostname: str
+    usuario: str
+    codigo: str
+    request_ip: str
+    id_evento: str = field(default_factory=gerar_combo)
+    nome_usuario: str = None
+    nome_sala: str = None
+    setor_sala: str = None
+    repeticoes: int = 0
+    recebido_em: float = field(default_factory=time.monotonic)
+    data_hora: str = field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    recebido_em_epoch: float = field(default_factory=time.time)
+    etapas: list = field(default_factory=list, repr=False)
+    # Receptores que já confirmaram o alerta, por qualquer canal
+    entregues: set = field(default_factory=set, repr=False)
+    _lock_etapas: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def marcar(self, etapa, ip_receptor=None, status=None, monotonico=None):
+        """
+        Registra uma etapa da linha do tempo. O instante fica em milissegundos
+        desde a época, mas é calculado pelo relógio monotônico a partir do
+        recebimento, sem sofrer com ajustes do relógio do sistema. monotonico
+        (time.monotonic()) registra uma etapa que aconteceu antes da chamada.
+        """
+        if monotonico is None:
+            monotonico = time.monotonic()
+        instante = (self.recebido_em_epoch + monotonico - self.recebido_em) * 1000
+        with self._lock_etapas:
+            self.etapas.append([etapa, ip_receptor, round(instante, 1), status])
+
+    def retirar_etapas(self):
+        """Retorna as etapas ainda não gravadas e esvazia a lista"""
+        with self._lock_etapas:
+            etapas, self.etapas = self.etapas, []
+        return etapas
+
+    # Campos gravados em eventos_cluster para que outro servidor possa retomar o evento
+    CAMPOS_CLUSTER = ("id_evento", "hostname", "usuario", "codigo", "request_ip",
+                      "nome_usuario", "nome_sala", "setor_sala", "data_hora")
+
+    def para_dados(self):
+        return {campo: getattr(self, campo) for campo in self.CAMPOS_CLUSTER}
+
+    @classmethod
+    def de_dados(cls, dados):
+        """Recria o evento num servidor que o assumiu; os prazos recomeçam a contar agora"""
+        return cls(**{campo: dados.get(campo) for campo in cls.CAMPOS_CLUSTER})
+
+    def payload_receptor(self):
+        """Corpo enviado para cada receptor"""
+        return {
+            "sala": self.nome_sala,
+            "usuario": self.nome_usuario,
+            "codigo": "alerta5656",
+            "id_evento": self.id_evento,
+        }
+
+
+class RegistroEventos:
+    """Eventos recentes por id_evento, para associar confirmações que chegam depois do envio"""
+
+    def __init__(self, maximo=5000):
+        self.maximo = maximo
+        self._eventos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def adicionar(self, evento):
+        with self._lock:
+            self._eventos[evento.id_evento] = evento
+            while len(self._eventos) > self.maximo:
+                self._eventos.popitem(last=False)
+
+    def obter(self, id_evento):
+        with self._lock:
+            return self._eventos.get(id_evento)
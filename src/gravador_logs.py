@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Gravação assíncrona dos logs do servidor.
+
+As linhas de logs_sitema e logs_alertas são colocadas numa fila em memória e
+uma thread separada as grava em lotes com executemany, sem que o envio dos
+alertas precise esperar pelo banco.
+
+Com um spool (spool.SpoolLocal), os lotes vão para o arquivo local e o
+replicador do spool os leva ao MySQL; uma queda do banco não perde linhas.
+
+Um lote recusado pelo banco é regravado linha a linha: só a linha com dado
+inválido (texto maior que a coluna, NOT NULL, ...) é descartada, sem travar
+as demais atrás dela.
+"""
+
+import os
+import queue
+import threading
+import time
+
+_PARAR = object()
+
+# Classes da DB-API para erros do próprio dado (SQLSTATE 22 e 23): repetir a
+# linha não adianta. Falha de conexão ou de SQL mantém o lote para depois
+ERROS_DE_DADOS = ("DataError", "IntegrityError")
+
+
+def erro_de_dados(erro):
+    return any(classe.__name__ in ERROS_DE_DADOS for classe in type(erro).__mro__)
+
+
+def gravar_linhas(pool, linhas):
+    """
+    Grava [(sql, parametros), ...] numa transação, agrupando as linhas
+    consecutivas de mesmo SQL em executemany. Se o lote falhar por causa de
+    um dado, regrava linha a linha e retorna [(sql, parametros, erro), ...]
+    das linhas recusadas; as outras são gravadas. Levanta a exceção quando o
+    banco está indisponível ou o erro não é de dado.
+    """
+    grupos = []
+    for sql, parametros in linhas:
+        if grupos and grupos[-1][0] == sql:
+            grupos[-1][1].append(parametros)
+        else:
+            grupos.append((sql, [parametros]))
+
+    with pool.conexao() as conn:
+        if not conn:
+            raise ConnectionError("Banco de dados indisponível")
+        cursor = conn.cursor()
+        try:
+            try:
+                for sql, parametros in grupos:
+                    cursor.executemany(sql, parametros)
+                conn.commit()
+                return []
+            except Exception as e:
+                conn.rollback()
+                if not erro_de_dados(e):
+                    raise
+
+            # Só o comando que falhou é desfeito; as outras linhas seguem na transação
+            recusadas = []
+            for sql, parametros in linhas:
+                try:
+                    cursor.execute(sql, parametros)
+                except Exception as e:
+                    if not erro_de_dados(e):
+                        conn.rollback()
+                        raise
+                    recusadas.append((sql, parametros, e))
+            conn.commit()
+            return recusadas
+        finally:
+            cursor.close()
+
+
+class GravadorLogs:
+    """Fila de linhas de log drenada em lotes por uma thread gravadora"""
+
+    def __init__(self, pool, tamanho_fila=10000, tamanho_lote=200, intervalo=0.5,
+                 bloquear_se_cheia=False, tempo_bloqueio=0.05, ao_gravar=None, spool=None):
+        self.pool = pool
+        self.spool = spool
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.bloquear_se_cheia = bloquear_se_cheia
+        self.tempo_bloqueio = tempo_bloqueio
+        self.ao_gravar = ao_gravar  # função(duracao, linhas, ok), para métricas
+
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._pendentes = []  # lote que falhou e será regravado
+
+        self.gravadas = 0
+        self.descartadas = 0
+        self.lotes = 0
+        self.falhas = 0
+        self.rejeitadas = 0  # linhas recusadas pelo banco e descartadas
+
+    def _iniciar(self):
+        # A thread é criada no primeiro uso (e de novo após um fork)
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar, name="gravador-logs", daemon=True)
+            self._thread.start()
+
+    def registrar(self, sql, parametros):
+        """Enfileira uma linha; nunca bloqueia além de tempo_bloqueio"""
+        if self._thread is None or self._pid != os.getpid():
+            self._iniciar()
+        try:
+            if self.bloquear_se_cheia:
+                self._fila.put((sql, parametros), timeout=self.tempo_bloqueio)
+            else:
+                self._fila.put_nowait((sql, parametros))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.descartadas += 1
+            return False
+
+    def _executar(self):
+        lote = []
+        limite = time.monotonic() + self.intervalo
+        while True:
+            espera = max(0, limite - time.monotonic())
+            try:
+                item = self._fila.get(timeout=espera)
+            except queue.Empty:
+                item = None
+
+            if item is _PARAR:
+                self._gravar(lote)
+                return
+            if item is not None:
+                lote.append(item)
+
+            if len(lote) >= self.tamanho_lote or time.monotonic() >= limite:
+                if lote or self._pendentes:
+                    self._gravar(lote)
+                lote = []
+                limite = time.monotonic() + self.intervalo
+
+    def _gravar(self, lote):
+        linhas = self._pendentes + lote
+        self._pendentes = []
+        if not linhas:
+            return
+
+        inicio = time.perf_counter()
+        recusadas = []
+        try:
+            if self.spool is not None:
+                self.spool.anexar_linhas(linhas)
+            else:
+                recusadas = gravar_linhas(self.pool, linhas)
+        except Exception as e:
+            self._notificar(time.perf_counter() - inicio, len(linhas), False)
+            with self._lock:
+                self.falhas += 1
+            # Guarda as linhas para a próxima tentativa, respeitando o limite da fila
+            self._pendentes = linhas[-self._fila.maxsize:]
+            with self._lock:
+                self.descartadas += len(linhas) - len(self._pendentes)
+            print(f"Erro ao gravar lote de logs ({len(linhas)} linhas): {e}")
+            return
+
+        self._notificar(time.perf_counter() - inicio, len(linhas), True)
+        self._rejeitar(recusadas)
+        with self._lock:
+            self.gravadas += len(linhas) - len(recusadas)
+            self.lotes += 1
+
+    def _rejeitar(self, recusadas):
+        if not recusadas:
+            return
+        with self._lock:
+            self.rejeitadas += len(recusadas)
+        for sql, parametros, erro in recusadas:
+            print(f"Linha de log recusada pelo banco e descartada ({erro}): {sql} {str(parametros)[:200]}")
+
+    def _notificar(self, duracao, linhas, ok):
+        if self.ao_gravar is not None:
+            try:
+                self.ao_gravar(duracao, linhas, ok)
+            except Exception as e:
+                print(f"Erro ao registrar gravação de logs: {e}")
+
+    def encerrar(self, tempo_limite=10):
+        """Grava tudo o que está na fila antes do processo terminar"""
+        with self._lock:
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._fila.put(_PARAR, timeout=tempo_limite)
+        except queue.Full:
+            pass
+        thread.join(tempo_limite)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "na_fila": self._fila.qsize(),
+                "pendentes": len(self._pendentes),
+                "gravadas": self.gravadas,
+                "descartadas": self.descartadas,
+                "lotes": self.lotes,
+                "falhas": self.falhas,
+                "rejeitadas": self.rejeitadas,
+            }
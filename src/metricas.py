@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Métricas do servidor no formato de texto do Prometheus.
+
+Contadores, histogramas e medidores simples, mantidos em memória e
+protegidos por lock, para a rota /metrics. Atualizar uma métrica custa um
+lock e uma soma; a exportação só percorre os valores já agregados, então a
+rota pode ser consultada a cada poucos segundos mesmo sob carga.
+
+Os valores são por processo. Com vários workers (gunicorn), cada consulta
+mostra apenas o worker que a atendeu.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+LIMITES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+def _formatar_numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+
+    def _chave(self, rotulos):
+        return tuple(str(rotulos.get(nome, "")) for nome in self.rotulos)
+
+    def _cabecalho(self):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        super().__init__(nome, ajuda, rotulos)
+        self._valores = {}
+
+    def inc(self, valor=1, **rotulos):
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + valor
+
+    def valor(self, **rotulos):
+        with self._lock:
+            return self._valores.get(self._chave(rotulos), 0)
+
+    def exportar(self):
+        with self._lock:
+            valores = list(self._valores.items())
+        linhas = self._cabecalho()
+        if not valores and not self.rotulos:
+            valores = [((), 0)]
+        for chave, valor in valores:
+            linhas.append(f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}")
+        return linhas
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.limites = tuple(sorted(limites))
+        self._series = {}  # chave -> [contagens por faixa..., soma, total]
+
+    def observar(self, valor, **rotulos):
+        chave = self._chave(rotulos)
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0] * (len(self.limites) + 1) + [0.0, 0]
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    @contextmanager
+    def medir(self, **rotulos):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def exportar(self):
+        with self._lock:
+            series = [(chave, list(serie)) for chave, serie in self._series.items()]
+        linhas = self._cabecalho()
+        for chave, serie in series:
+            acumulado = 0
+            for limite, contagem in zip(self.limites + (float("inf"),), serie):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, chave, ("le", _formatar_numero(limite)))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(serie[-2])}")
+            linhas.append(f"{self.nome}_count{rotulos} {serie[-1]}")
+        return linhas
+
+
+class Medidor(_Metrica):
+    """Valor instantâneo; pode ser mantido com inc/dec ou lido de uma função na exportação"""
+
+    tipo = "gauge"
+
+    def __init__(self, nome, ajuda, funcao=None):
+        super().__init__(nome, ajuda)
+        self.funcao = funcao
+        self._valor = 0
+
+    def inc(self, valor=1):
+        with self._lock:
+            self._valor += valor
+
+    def dec(self, valor=1):
+        self.inc(-valor)
+
+    def definir(self, valor):
+        with self._lock:
+            self._valor = valor
+
+    @contextmanager
+    def em_andamento(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+    def exportar(self):
+        if self.funcao is not None:
+            try:
+                valor = self.funcao()
+            except Exception:
+                return []
+        else:
+            with self._lock:
+                valor = self._valor
+        return self._cabecalho() + [f"{self.nome} {_formatar_numero(valor)}"]
+
+
+class RegistroMetricas:
+    """Conjunto das métricas exportadas pela rota /metrics"""
+
+    TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metricas = []
+        self._lock = threading.Lock()
+
+    def _adicionar(self, metrica):
+        with self._lock:
+            self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._adicionar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        return self._adicionar(Histograma(nome, ajuda, rotulos, limites))
+
+    def medidor(self, nome, ajuda, funcao=None):
+        return self._adicionar(Medidor(nome, ajuda, funcao))
+
+    def exportar(self):
+        with self._lock:
+            metricas = list(self._metricas)
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
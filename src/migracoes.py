@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Migrações versionadas do banco botao_panico.
+
+Cada migração tem um número de versão e é registrada em schema_migrations
+quando termina. Os passos verificam o estado atual antes de alterar algo
+(tabela, coluna ou índice já existente), então reexecutar uma migração
+interrompida no meio é seguro. O servidor aplica as pendentes ao iniciar;
+para aplicar manualmente:
+
+    python src/migracoes.py
+"""
+
+from datetime import datetime
+
+from retencao_logs import TABELAS_LOG, particionar_tabela
+
+# Nome do lock do MySQL que impede dois workers de migrar ao mesmo tempo
+NOME_LOCK = "botao_panico_migracoes"
+
+
+def _dialeto(conn):
+    # O substituto em SQLite dos benchmarks se identifica; o padrão é MySQL
+    return getattr(conn, "dialeto", "mysql")
+
+
+def _tabelas(cursor, dialeto):
+    if dialeto == "sqlite":
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    else:
+        cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE()")
+    return {linha[0] for linha in cursor.fetchall()}
+
+
+def _colunas(cursor, dialeto, tabela):
+    if dialeto == "sqlite":
+        cursor.execute(f"PRAGMA table_info({tabela})")
+        return {linha[1].lower() for linha in cursor.fetchall()}
+    cursor.execute("SELECT column_name FROM information_schema.columns "
+                   "WHERE table_schema = DATABASE() AND table_name = %s", (tabela,))
+    return {linha[0].lower() for linha in cursor.fetchall()}
+
+
+def _indices(cursor, dialeto, tabela):
+    if dialeto == "sqlite":
+        cursor.execute(f"PRAGMA index_list({tabela})")
+        return {linha[1] for linha in cursor.fetchall()}
+    cursor.execute("SELECT DISTINCT index_name FROM information_schema.statistics "
+                   "WHERE table_schema = DATABASE() AND table_name = %s", (tabela,))
+    return {linha[0] for linha in cursor.fetchall()}
+
+
+def _tem_duplicados(cursor, tabela, coluna):
+    cursor.execute(f"SELECT {coluna} FROM {tabela} GROUP BY {coluna} HAVING COUNT(*) > 1 LIMIT 1")
+    return cursor.fetchone() is not None
+
+
+def criar_indice(cursor, dialeto, tabela, nome, colunas, unico=False):
+    """Cria o índice se ainda não existir; retorna True se criou"""
+    if nome in _indices(cursor, dialeto, tabela):
+        return False
+    tipo = "UNIQUE INDEX" if unico else "INDEX"
+    cursor.execute(f"CREATE {tipo} {nome} ON {tabela} ({', '.join(colunas)})")
+    return True
+
+
+def criar_indice_unico_se_possivel(cursor, dialeto, tabela, coluna, nome_unico, nome_simples):
+    """
+    Índice único quando os dados atuais permitem; se já houver valores
+    repetidos, cria um índice comum (a busca fica rápida do mesmo jeito) e
+    avisa para que os cadastros sejam corrigidos.
+    """
+    indices = _indices(cursor, dialeto, tabela)
+    if nome_unico in indices or nome_simples in indices:
+        return
+    if _tem_duplicados(cursor, tabela, coluna):
+        print(f"Migração: {tabela}.{coluna} tem valores repetidos; criando índice não único {nome_simples}")
+        criar_indice(cursor, dialeto, tabela, nome_simples, [coluna])
+    else:
+        criar_indice(cursor, dialeto, tabela, nome_unico, [coluna], unico=True)
+
+
+# Migrações -------------------------------------------------------------------
+
+def _m001_receptores(cursor, dialeto):
+    """Tabela receptores com nome em minúsculas e coluna setor"""
+    tabelas = _tabelas(cursor, dialeto)
+    if dialeto == "mysql" and "RECEPTORES" in tabelas:
+        # Só acontece com lower_case_table_names=0 (Linux): os nomes diferem de verdade
+        if "receptores" in tabelas:
+            colunas = _colunas(cursor, dialeto, "RECEPTORES")
+            setor = "setor" if "setor" in colunas else "''"
+            if "setor" not in _colunas(cursor, dialeto, "receptores"):
+                cursor.execute("ALTER TABLE receptores ADD COLUMN setor varchar(255) not null default ''")
+            cursor.execute(f"INSERT INTO receptores (ip_receptor, nome_receptor, setor) "
+                           f"SELECT ip_receptor, nome_receptor, {setor} FROM RECEPTORES "
+                           f"WHERE ip_receptor NOT IN (SELECT ip_receptor FROM receptores)")
+            cursor.execute("RENAME TABLE RECEPTORES TO RECEPTORES_antiga")
+        else:
+            cursor.execute("RENAME TABLE RECEPTORES TO receptores")
+        tabelas = _tabelas(cursor, dialeto)
+
+    if not any(nome.lower() == "receptores" for nome in tabelas):
+        cursor.execute("""
+            create table receptores (
+                id int auto_increment primary key,
+                ip_receptor varchar(255) not null,
+                nome_receptor varchar(255) not null,
+                setor varchar(255) not null default ''
+            )""" if dialeto == "mysql" else """
+            create table receptores (
+                id integer primary key autoincrement,
+                ip_receptor varchar(255) not null,
+                nome_receptor varchar(255) not null,
+                setor varchar(255) not null default ''
+            )""")
+    elif "setor" not in _colunas(cursor, dialeto, "receptores"):
+        cursor.execute("ALTER TABLE receptores ADD COLUMN setor varchar(255) not null default ''")
+
+
+def _m002_linha_tempo(cursor, dialeto):
+    """Tabela linha_tempo_eventos em bancos criados antes dela"""
+    if "linha_tempo_eventos" in _tabelas(cursor, dialeto):
+        return
+    chave = "int auto_increment primary key" if dialeto == "mysql" else "integer primary key autoincrement"
+    cursor.execute(f"""
+        create table linha_tempo_eventos (
+            id {chave},
+            id_evento varchar(255) not null,
+            data_hora datetime not null,
+            etapas mediumtext not null
+        )""")
+
+
+def _m003_indices(cursor, dialeto):
+    """Índices das buscas do servidor e dos filtros da dashboard"""
+    # Buscas por usuário, sala e receptor (servidor e cadastros da dashboard)
+    criar_indice_unico_se_possivel(cursor, dialeto, "usuarios", "USERNAME",
+                                   "uq_usuarios_username", "idx_usuarios_username")
+    criar_indice_unico_se_possivel(cursor, dialeto, "salas", "hostname",
+                                   "uq_salas_hostname", "idx_salas_hostname")
+    criar_indice_unico_se_possivel(cursor, dialeto, "receptores", "ip_receptor",
+                                   "uq_receptores_ip", "idx_receptores_ip")
+    # Filtro por período e agrupamento por evento nas páginas de logs
+    criar_indice(cursor, dialeto, "logs_alertas", "idx_logs_alertas_data_hora", ["data_hora"])
+    criar_indice(cursor, dialeto, "logs_alertas", "idx_logs_alertas_evento", ["id_evento"])
+    criar_indice(cursor, dialeto, "logs_sitema", "idx_logs_sitema_data_hora", ["data_hora"])
+    criar_indice(cursor, dialeto, "linha_tempo_eventos", "idx_linha_tempo_evento", ["id_evento"])
+
+
+def _m004_particoes_logs(cursor, dialeto):
+    """
+    Partições mensais por data_hora em logs_alertas e logs_sitema, para que a
+    retenção (src/retencao_logs.py) descarte meses antigos com DROP PARTITION.
+    No MySQL a chave primária passa a ser (id, data_hora), exigência do
+    particionamento. A conversão copia a tabela inteira uma única vez, por
+    isso ela é manual (MIGRACOES_MANUAIS): rode python src/migracoes.py numa
+    janela de manutenção.
+    """
+    if dialeto != "mysql":
+        return  # o SQLite não tem partições; a retenção usa DELETE por mês
+    for tabela in TABELAS_LOG:
+        particionar_tabela(cursor, tabela)
+
+
+def _m005_cluster(cursor, dialeto):
+    """Tabelas de coordenação entre vários servidores de alerta (src/cluster.py)"""
+    tabelas = _tabelas(cursor, dialeto)
+    if "eventos_cluster" not in tabelas:
+        cursor.execute("""
+            create table eventos_cluster (
+                id_evento varchar(64) primary key,
+                chave varchar(255) not null,
+                dados text not null,
+                no_dono varchar(255) not null,
+                lease_expira bigint not null,
+                estado varchar(20) not null,
+                criado_em bigint not null
+            )""")
+    if "entregas_cluster" not in tabelas:
+        cursor.execute("""
+            create table entregas_cluster (
+                id_evento varchar(64) not null,
+                ip_receptor varchar(255) not null,
+                primary key (id_evento, ip_receptor)
+            )""")
+    criar_indice(cursor, dialeto, "eventos_cluster", "uq_eventos_cluster_chave", ["chave"], unico=True)
+    criar_indice(cursor, dialeto, "eventos_cluster", "idx_eventos_cluster_lease", ["estado", "lease_expira"])
+
+
+MIGRACOES = [
+    (1, "receptores em minúsculas com coluna setor", _m001_receptores),
+    (2, "tabela linha_tempo_eventos", _m002_linha_tempo),
+    (3, "índices de buscas e logs", _m003_indices),
+    (4, "partições mensais nas tabelas de log", _m004_particoes_logs),
+    (5, "tabelas de coordenação do cluster", _m005_cluster),
+]
+
+# Reescrevem tabelas grandes (minutos com a tabela travada): o servidor não as
+# aplica sozinho, só python src/migracoes.py
+MIGRACOES_MANUAIS = {4}
+
+
+# Execução --------------------------------------------------------------------
+
+def _garantir_tabela_versoes(cursor, dialeto):
+    if "schema_migrations" in _tabelas(cursor, dialeto):
+        return
+    cursor.execute("""
+        create table if not exists schema_migrations (
+            versao int primary key,
+            descricao varchar(255) not null,
+            aplicada_em datetime not null
+        )""")
+
+
+def versoes_aplicadas(cursor):
+    cursor.execute("SELECT versao FROM schema_migrations")
+    return {linha[0] for linha in cursor.fetchall()}
+
+
+def aplicar_migracoes(conn, tempo_lock=60, automatico=False):
+    """
+    Aplica as migrações pendentes e retorna a lista de versões aplicadas
+    agora. Com automatico=True (subida do servidor) pula MIGRACOES_MANUAIS.
+    """
+    dialeto = _dialeto(conn)
+    cursor = conn.cursor()
+    travado = False
+    try:
+        if dialeto == "mysql":
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (NOME_LOCK, tempo_lock))
+            travado = cursor.fetchone()[0] == 1
+            if not travado:
+                raise TimeoutError("Outro processo está aplicando as migrações")
+
+        _garantir_tabela_versoes(cursor, dialeto)
+        conn.commit()
+        aplicadas = versoes_aplicadas(cursor)
+        novas = []
+        for versao, descricao, migracao in MIGRACOES:
+            if versao in aplicadas:
+                continue
+            if automatico and versao in MIGRACOES_MANUAIS:
+                print(f"Migração {versao} ({descricao}) pendente: aplique com python src/migracoes.py "
+                      f"numa janela de manutenção")
+                continue
+            print(f"Aplicando migração {versao}: {descricao}")
+            migracao(cursor, dialeto)
+            cursor.execute("INSERT INTO schema_migrations (versao, descricao, aplicada_em) VALUES (%s, %s, %s)",
+                           (versao, descricao, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+            novas.append(versao)
+        return novas
+    finally:
+        if travado:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (NOME_LOCK,))
+            cursor.fetchone()
+        cursor.close()
+
+
+if __name__ == "__main__":
+    import os
+
+    import dotenv
+    import mysql.connector
+
+    dotenv.load_dotenv()
+    conexao = mysql.connector.connect(host=os.getenv('DATABASE_HOST'), user=os.getenv('DATABASE_USER'),
+                                      password=os.getenv('PASSWORD'), database='botao_panico')
+    try:
+        novas = aplicar_migracoes(conexao)
+        print(f"Migrações aplicadas: {novas}" if novas else "Banco já está na versão mais recente")
+    finally:
+        conexao.close()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Monitor de disponibilidade dos receptores.
+
+Uma thread em segundo plano consulta periodicamente o /check-health de todos
+os receptores cadastrados, em paralelo, e mantém em memória o estado de cada
+um (ativo/inativo, último tempo de resposta, falhas consecutivas). O envio
+dos alertas usa esse estado para não prender a primeira onda em receptores
+que já se sabe estarem fora do ar.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class MonitorReceptores:
+    """Verificação periódica de /check-health com estado por receptor"""
+
+    def __init__(self, listar_receptores, sondar, intervalo=10, tempo_limite=2,
+                 falhas_para_queda=2, max_sondas=32, ao_mudar_estado=None):
+        self.listar_receptores = listar_receptores  # função() -> lista de IPs
+        self.sondar = sondar                        # função(ip, tempo_limite) -> bool
+        self.intervalo = intervalo
+        self.tempo_limite = tempo_limite
+        self.falhas_para_queda = falhas_para_queda
+        self.max_sondas = max_sondas
+        self.ao_mudar_estado = ao_mudar_estado      # função(ip, ativo)
+
+        self._lock = threading.Lock()
+        self._estado = {}  # ip -> dict com o estado do receptor
+        self._parar = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._pid = None
+        self._ultima_rodada = None
+
+    def iniciar(self):
+        # Reinicia a thread quando o processo foi criado por fork (workers)
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._parar = threading.Event()
+            self._executor = ThreadPoolExecutor(max_workers=self.max_sondas, thread_name_prefix="sonda")
+            self._thread = threading.Thread(target=self._executar, name="monitor-receptores", daemon=True)
+            self._thread.start()
+
+    def _executar(self):
+        parar = self._parar
+        while not parar.is_set():
+            try:
+                self.verificar_todos()
+            except Exception as e:
+                print(f"Erro ao verificar receptores: {e}")
+            parar.wait(self.intervalo)
+
+    def verificar_todos(self):
+        """Executa uma rodada de verificação em todos os receptores cadastrados"""
+        ips = list(dict.fromkeys(self.listar_receptores()))
+        with self._lock:
+            for ip in list(self._estado):
+                if ip not in ips:
+                    del self._estado[ip]
+            executor = self._executor
+        if executor is None or not ips:
+            return
+        list(executor.map(self._verificar, ips))
+        self._ultima_rodada = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def _verificar(self, ip_receptor):
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            ok = self.sondar(ip_receptor, self.tempo_limite)
+        except Exception as e:
+            ok, erro = False, str(e)
+        rtt = (time.perf_counter() - inicio) * 1000 if ok else None
+        self.registrar(ip_receptor, ok, rtt_ms=rtt, erro=erro)
+
+    def registrar(self, ip_receptor, ok, rtt_ms=None, erro=None):
+        """Atualiza o estado de um receptor (pelas sondas ou pelos próprios envios)"""
+        with self._lock:
+            estado = self._estado.setdefault(ip_receptor, {
+                "ativo": None, "rtt_ms": None, "falhas_consecutivas": 0,
+                "ultima_verificacao": None, "ultima_mudanca": None, "ultimo_erro": None,
+            })
+            anterior = estado["ativo"]
+            estado["ultima_verificacao"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if ok:
+                estado["falhas_consecutivas"] = 0
+                estado["ativo"] = True
+                if rtt_ms is not None:
+                    estado["rtt_ms"] = round(rtt_ms, 1)
+            else:
+                estado["falhas_consecutivas"] += 1
+                estado["ultimo_erro"] = erro
+                # Uma falha isolada não tira o receptor da primeira onda
+                if estado["falhas_consecutivas"] >= self.falhas_para_queda:
+                    estado["ativo"] = False
+            mudou = anterior is not None and anterior != estado["ativo"]
+            if mudou or (anterior is None and estado["ativo"] is not None):
+                estado["ultima_mudanca"] = estado["ultima_verificacao"]
+
+        if mudou and self.ao_mudar_estado:
+            try:
+                self.ao_mudar_estado(ip_receptor, estado["ativo"])
+            except Exception as e:
+                print(f"Erro ao notificar mudança de estado do receptor {ip_receptor}: {e}")
+
+    def inativo(self, ip_receptor):
+        with self._lock:
+            estado = self._estado.get(ip_receptor)
+            return estado is not None and estado["ativo"] is False
+
+    def separar(self, ips_receptores):
+        """Divide os receptores em (ativos ou ainda não verificados, inativos)"""
+        ativos, inativos = [], []
+        for ip in ips_receptores:
+            (inativos if self.inativo(ip) else ativos).append(ip)
+        return ativos, inativos
+
+    def estado(self):
+        with self._lock:
+            receptores = {ip: dict(estado) for ip, estado in self._estado.items()}
+        return {
+            "intervalo": self.intervalo,
+            "ultima_rodada": self._ultima_rodada,
+            "ativos": sum(1 for e in receptores.values() if e["ativo"] is True),
+            "inativos": sum(1 for e in receptores.values() if e["ativo"] is False),
+            "receptores": receptores,
+        }
+
+    def encerrar(self):
+        with self._lock:
+            self._parar.set()
+            executor, self._executor = self._executor, None
+            self._thread = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Entrega dos alertas por multicast UDP na rede local.
+
+O servidor envia um único datagrama assinado (HMAC-SHA256) por alerta,
+repetido algumas vezes para tolerar perdas, para um grupo multicast do qual
+todos os receptores da sub-rede participam. Cada receptor confirma com um
+datagrama unicast pequeno e assinado, para que logs_alertas continue tendo
+o status de cada receptor.
+"""
+
+import hashlib
+import hmac
+import json
+import socket
+import struct
+import threading
+import time
+
+
+def _assinatura(chave, corpo):
+    return hmac.new(chave.encode(), corpo, hashlib.sha256).hexdigest()
+
+
+def empacotar(chave, dados):
+    """Serializa e assina uma mensagem"""
+    corpo = json.dumps(dict(dados, ts=time.time()), sort_keys=True, separators=(",", ":")).encode()
+    return corpo + b"\n" + _assinatura(chave, corpo).encode()
+
+
+def desempacotar(chave, datagrama, validade=30):
+    """Retorna os dados da mensagem ou None se a assinatura ou o horário forem inválidos"""
+    try:
+        corpo, assinatura = datagrama.rsplit(b"\n", 1)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(_assinatura(chave, corpo).encode(), assinatura):
+        return None
+    dados = json.loads(corpo)
+    if abs(time.time() - dados.get("ts", 0)) > validade:
+        return None
+    return dados
+
+
+def ip_local_para(destino):
+    """IP local usado para alcançar o destino (sem enviar nenhum pacote)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.connect((destino, 9))
+        return sock.getsockname()[0]
+    except OSError:
+        return "127.0.0.1"
+    finally:
+        sock.close()
+
+
+class EmissorMulticast:
+    """Lado do servidor: envia os alertas ao grupo e coleta as confirmações"""
+
+    def __init__(self, chave, grupo="239.255.56.56", porta=5656, porta_ack=0,
+                 interface="0.0.0.0", ttl=1, repeticoes=3, intervalo_repeticao=0.02):
+        self.chave = chave
+        self.grupo = grupo
+        self.porta = porta
+        self.porta_ack = porta_ack
+        self.interface = interface
+        self.repeticoes = repeticoes
+        self.intervalo_repeticao = intervalo_repeticao
+
+        self._envio = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._envio.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self._envio.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        if interface != "0.0.0.0":
+            self._envio.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+        self._lock = threading.Lock()
+        self._confirmacoes = {}  # id_evento -> ({ip_receptor: instante da confirmação}, threading.Event)
+        self._esperados = {}     # id_evento -> quantidade ou conjunto de IPs esperados (None = desconhecido)
+        self._ack = None
+        self._thread = None
+
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._abrir_confirmacoes()
+
+    def _abrir_confirmacoes(self):
+        # Porta 0: cada processo (worker) recebe as confirmações numa porta própria,
+        # informada aos receptores dentro do próprio alerta
+        self._ack = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self._ack.bind((self.interface, self.porta_ack))
+        self.porta_ack = self._ack.getsockname()[1]
+        self._thread = threading.Thread(target=self._ler_confirmacoes, name="multicast-ack", daemon=True)
+        self._thread.start()
+
+    def _ler_confirmacoes(self):
+        while True:
+            try:
+                datagrama, _ = self._ack.recvfrom(2048)
+            except OSError:
+                return
+            dados = desempacotar(self.chave, datagrama)
+            if not dados or dados.get("tipo") != "ack":
+                continue
+            with self._lock:
+                registro = self._confirmacoes.get(dados.get("id_evento"))
+                if registro is None:
+                    continue
+                receptores, completo = registro
+                # Cada alerta sai repetido; vale o instante da primeira confirmação
+                receptores.setdefault(dados.get("ip_receptor"), time.monotonic())
+                if self._completo(self._esperados.get(dados.get("id_evento")), receptores):
+                    completo.set()
+
+    @staticmethod
+    def _completo(esperados, receptores):
+        if esperados is None:
+            return False
+        if isinstance(esperados, int):
+            return len(receptores) >= esperados
+        return esperados.issubset(receptores)
+
+    def transmitir(self, payload, tempo_limite=1.0, esperados=None, instantes=None):
+        """
+        Envia o alerta ao grupo e aguarda as confirmações até o tempo limite,
+        ou até que `esperados` confirme: uma quantidade de receptores ou o
+        conjunto dos IPs que precisam confirmar (None espera o tempo todo).
+        Retorna o conjunto de receptores que confirmaram; sem nenhum receptor
+        esperado (0 ou conjunto vazio) retorna na hora, sem enviar. Se
+        instantes for um dict, recebe {ip_receptor: instante (time.monotonic())
+        da confirmação}.
+        """
+        if esperados is not None and not esperados:
+            return set()
+        if esperados is not None and not isinstance(esperados, int):
+            esperados = set(esperados)
+        self.iniciar()
+        id_evento = payload.get("id_evento")
+        completo = threading.Event()
+        with self._lock:
+            self._confirmacoes[id_evento] = ({}, completo)
+            self._esperados[id_evento] = esperados
+
+        datagrama = empacotar(self.chave, dict(payload, tipo="alerta", porta_ack=self.porta_ack))
+        for i in range(self.repeticoes):
+            self._envio.sendto(datagrama, (self.grupo, self.porta))
+            if i < self.repeticoes - 1:
+                time.sleep(self.intervalo_repeticao)
+
+        completo.wait(tempo_limite)
+        with self._lock:
+            receptores, _ = self._confirmacoes.pop(id_evento)
+            self._esperados.pop(id_evento, None)
+        if instantes is not None:
+            instantes.update(receptores)
+        return set(receptores)
+
+    def encerrar(self):
+        for sock in (self._envio, self._ack):
+            if sock is not None:
+                sock.close()
+
+
+class ReceptorMulticast:
+    """Lado do receptor: participa do grupo e confirma cada alerta recebido"""
+
+    def __init__(self, chave, ao_receber, grupo="239.255.56.56", porta=5656,
+                 interface="0.0.0.0", ip_receptor=None, codigo="alerta5656"):
+        self.chave = chave
+        self.ao_receber = ao_receber  # função(sala, usuario, id_evento)
+        self.grupo = grupo
+        self.porta = porta
+        self.interface = interface
+        self.ip_receptor = ip_receptor
+        self.codigo = codigo
+        self._sock = None
+        self._thread = None
+        self._vistos = {}  # id_evento -> horário, para ignorar as repetições
+
+    def iniciar(self):
+        if self._thread is not None:
+            return
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", self.porta))
+        membro = struct.pack("4s4s", socket.inet_aton(self.grupo), socket.inet_aton(self.interface))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membro)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._executar, name="multicast-receptor", daemon=True)
+        self._thread.start()
+
+    def _executar(self):
+        while True:
+            try:
+                datagrama, origem = self._sock.recvfrom(8192)
+            except OSError:
+                return
+            dados = desempacotar(self.chave, datagrama)
+            if not dados or dados.get("tipo") != "alerta" or dados.get("codigo") != self.codigo:
+                continue
+
+            # Antes de marcar como visto: o mesmo evento pode chegar depois numa onda que inclui este receptor
+            ip_receptor = self.ip_receptor or ip_local_para(origem[0])
+            destinos = dados.get("destinos")
+            if destinos is not None and ip_receptor not in destinos:
+                continue  # alerta roteado para outro setor
+
+            id_evento = dados.get("id_evento")
+            agora = time.monotonic()
+            self._vistos = {k: v for k, v in self._vistos.items() if agora - v < 60}
+            novo = id_evento not in self._vistos
+            self._vistos[id_evento] = agora
+
+            # Confirma mesmo as repetições, caso a primeira confirmação tenha se perdido
+            ack = empacotar(self.chave, {"tipo": "ack", "id_evento": id_evento, "ip_receptor": ip_receptor})
+            try:
+                self._sock.sendto(ack, (origem[0], dados.get("porta_ack", self.porta + 1)))
+            except OSError as e:
+                print(f"Erro ao confirmar alerta multicast: {e}")
+
+            if novo:
+                try:
+                    self.ao_receber(dados.get("sala", "Desconhecida"),
+                                    dados.get("usuario", "Desconhecido"), id_evento)
+                except Exception as e:
+                    print(f"Erro ao processar alerta multicast: {e}")
+
+    def encerrar(self):
+        if self._sock is not None:
+            self._sock.close()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Pool de conexões MySQL usado pelo servidor de alertas.
+
+Mantém um número limitado de conexões abertas e reaproveita cada uma entre
+as chamadas, evitando um handshake TCP/autenticação por consulta.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolConexoes:
+    """Pool limitado e thread-safe de conexões com o banco de dados"""
+
+    def __init__(self, fabrica, tamanho_maximo=10, tempo_vida_maximo=1800,
+                 intervalo_verificacao=30, tempo_espera=5):
+        # fabrica: função sem argumentos que abre uma conexão nova
+        self.fabrica = fabrica
+        self.tamanho_maximo = tamanho_maximo
+        self.tempo_vida_maximo = tempo_vida_maximo
+        self.intervalo_verificacao = intervalo_verificacao
+        self.tempo_espera = tempo_espera
+
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(tamanho_maximo)
+        self._livres = deque()  # (conexao, criada_em, devolvida_em)
+        self._criacao = {}  # id(conexao) -> criada_em
+        self._pid = os.getpid()
+
+        self.conexoes_criadas = 0
+        self.conexoes_reutilizadas = 0
+        self.conexoes_descartadas = 0
+        self.falhas_verificacao = 0
+        self.esgotamentos = 0
+        self.em_uso = 0
+        self.espera_total = 0.0
+
+    def _abrir(self):
+        conn = self.fabrica()
+        if conn is None:
+            return None
+        with self._lock:
+            self.conexoes_criadas += 1
+            self._criacao[id(conn)] = time.monotonic()
+        return conn
+
+    def _fechar(self, conn):
+        with self._lock:
+            self._criacao.pop(id(conn), None)
+            self.conexoes_descartadas += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _verificar_processo(self):
+        # Após um fork (servidor com vários workers) as conexões herdadas
+        # pertencem ao processo pai e não podem ser compartilhadas
+        if os.getpid() != self._pid:
+            with self._lock:
+                self._pid = os.getpid()
+                self._livres.clear()
+                self._criacao.clear()
+
+    def _conexao_saudavel(self, conn, criada_em, devolvida_em):
+        agora = time.monotonic()
+        if agora - criada_em > self.tempo_vida_maximo:
+            return False
+        if agora - devolvida_em > self.intervalo_verificacao:
+            try:
+                return conn.is_connected()
+            except Exception:
+                with self._lock:
+                    self.falhas_verificacao += 1
+                return False
+        return True
+
+    def obter(self):
+        """Retorna uma conexão do pool ou None se não for possível obter uma"""
+        self._verificar_processo()
+
+        inicio = time.monotonic()
+        if not self._vagas.acquire(timeout=self.tempo_espera):
+            with self._lock:
+                self.esgotamentos += 1
+                self.espera_total += time.monotonic() - inicio
+            print(f"Pool de conexões esgotado ({self.tamanho_maximo} conexões em uso)")
+            return None
+
+        with self._lock:
+            self.espera_total += time.monotonic() - inicio
+            self.em_uso += 1
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._livres.pop() if self._livres else None
+                if item is None:
+                    break
+                conn, criada_em, devolvida_em = item
+                if self._conexao_saudavel(conn, criada_em, devolvida_em):
+                    with self._lock:
+                        self.conexoes_reutilizadas += 1
+                    return conn
+                self._fechar(conn)
+
+            conn = self._abrir()
+        except Exception as e:
+            print(f"Erro ao obter conexão do pool: {e}")
+            conn = None
+
+        if conn is None:
+            self._liberar_vaga()
+        return conn
+
+    def devolver(self, conn, descartar=False):
+        """Devolve a conexão ao pool; conexões com erro são descartadas"""
+        if conn is None:
+            return
+        try:
+            if descartar or os.getpid() != self._pid:
+                self._fechar(conn)
+                return
+            try:
+                # Encerra a transação aberta por leituras sem commit: sem isso a
+                # conexão guarda o snapshot do REPEATABLE READ e devolve dados velhos
+                conn.rollback()
+            except Exception:
+                self._fechar(conn)
+                return
+            criada_em = self._criacao.get(id(conn), 0)
+            with self._lock:
+                self._livres.append((conn, criada_em, time.monotonic()))
+        finally:
+            self._liberar_vaga()
+
+    def _liberar_vaga(self):
+        with self._lock:
+            self.em_uso -= 1
+        self._vagas.release()
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão (ou None) durante o bloco `with`"""
+        conn = self.obter()
+        try:
+            yield conn
+        except Exception:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    self.devolver(conn, descartar=True)
+                    conn = None
+                    raise
+            raise
+        finally:
+            if conn is not None:
+                self.devolver(conn)
+
+    def fechar_todas(self):
+        """Fecha as conexões ociosas (usado no encerramento do processo)"""
+        with self._lock:
+            livres = list(self._livres)
+            self._livres.clear()
+        for conn, _, _ in livres:
+            self._fechar(conn)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "tamanho_maximo": self.tamanho_maximo,
+                "em_uso": self.em_uso,
+                "livres": len(self._livres),
+                "conexoes_criadas": self.conexoes_criadas,
+                "conexoes_reutilizadas": self.conexoes_reutilizadas,
+                "conexoes_descartadas": self.conexoes_descartadas,
+                "falhas_verificacao": self.falhas_verificacao,
+                "esgotamentos": self.esgotamentos,
+                "espera_total_s": round(self.espera_total, 4),
+            }
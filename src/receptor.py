@@ -2,67 +2,144 @@
 
 import threading
 import time
-from flask import Flask, request, jsonify
 import tkinter as tk
 import json
-import tkinter as tk
-from tkinter import ttk
 import tkinter.font as tkfont
-from pygame import mixer
-import threading
 import queue
+import os
 
-import requests
+from cliente_websocket import ClienteWebSocket, EventosRecentes
+from multicast import ReceptorMulticast
+from audio_alerta import motor_audio
 
-app = Flask(__name__)
+# O Flask só é importado pela thread do servidor HTTP (criar_app): o WebSocket
+# e a interface sobem enquanto ele carrega
 
 chave = 'alerta5656'
 fila_alertas = queue.Queue()
-thread_gui_ativa = False
-
-@app.route('/check-health', methods=['GET'])
-def check_health():
-    return jsonify({"status": "ok"}), 200
+eventos_recentes = EventosRecentes()
+url_canal_websocket = os.getenv('SERVIDOR_WEBSOCKET', 'ws://172.19.200.1:9601')
+chave_multicast = os.getenv('CHAVE_MULTICAST')
+url_servidor = os.getenv('SERVIDOR_URL', 'http://172.19.200.1:9600')
+porta_receptor = 9090
+servidor_pronto = threading.Event()  # porta HTTP aceitando conexões
 
-@app.route(f'/{chave}/enviar', methods=['POST'])
-def receber_mensagem():
+def criar_app():
+    from flask import Flask, request, jsonify
+    
+    app = Flask(__name__)
+    
+    @app.route('/check-health', methods=['GET'])
+    def check_health():
+        return jsonify({"status": "ok"}), 200
     
+    @app.route(f'/{chave}/enviar', methods=['POST'])
+    def receber_mensagem():
+        
+        try:
+            data = request.json
+            if data['codigo'] == chave:
+                enfileirar_alerta(data['sala'], data['usuario'], data.get('id_evento'))
+                return jsonify(True), 200
+            else:
+                print("Chave inválida")
+        except Exception as e:
+            print(f"Erro ao receber mensagem: {e}")
+        return jsonify({"message": "Erro ao processar mensagem"}), 400
+    
+    return app
+
+def servir_http():
+    """Thread do servidor HTTP: sinaliza servidor_pronto assim que a porta está aberta"""
+    from werkzeug.serving import make_server
     try:
-        data = request.json
-        if data['codigo'] == chave:
-            # Adiciona o alerta na fila
-            fila_alertas.put((data['sala'], data['usuario']))
-            
-            global thread_gui_ativa
-            if not thread_gui_ativa:
-                thread_gui = threading.Thread(target=processar_alertas, daemon=True)
-                thread_gui.start()
-            
-            return jsonify(True), 200
-        else:
-            print("Chave inválida")
+        servidor = make_server('0.0.0.0', porta_receptor, criar_app(), threaded=True)
     except Exception as e:
-        print(f"Erro ao receber mensagem: {e}")
-    return jsonify({"message": "Erro ao processar mensagem"}), 400
+        print(f"Erro ao iniciar o servidor HTTP na porta {porta_receptor}: {e}")
+        return
+    servidor_pronto.set()
+    servidor.serve_forever()
+
+def enfileirar_alerta(sala, usuario, id_evento=None):
+    # O mesmo alerta pode chegar pelo WebSocket, pelo multicast e pelo HTTP
+    if not eventos_recentes.registrar(id_evento):
+        return
+    
+    # Adiciona o alerta na fila e acorda a thread da interface
+    fila_alertas.put((sala, usuario, id_evento))
+    interface_alertas.iniciar()
+    interface_alertas.acordar()
 
-def processar_alertas():
-    global thread_gui_ativa
-    thread_gui_ativa = True
+class InterfaceAlertas:
+    """
+    Única thread de interface do receptor: uma raiz Tk, criada uma vez, e uma
+    única janela de alerta em tela cheia. Alertas que chegam com a janela
+    aberta entram na lista de locais ativos em vez de abrir outra janela.
+    """
+    
+    def __init__(self, fila):
+        self.fila = fila
+        self.root = None
+        self.tela = None
+        self.pronta = threading.Event()  # mainloop rodando; a partir daí acordar() é seguro
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="interface-alertas", daemon=True)
+                self._thread.start()
+    
+    def _executar(self):
+        # Mixer e som do alerta carregados antes do primeiro alerta, fora da thread principal
+        motor_audio.iniciar()
+        try:
+            self.root = tk.Tk()
+            self.root.withdraw()
+            self.root.bind("<<NovoAlerta>>", lambda evento: self.processar_fila())
+            self.root.after(0, self._marcar_pronta)
+            self.root.mainloop()
+        except Exception as e:
+            print(f"Erro na interface de alertas: {e}")
+    
+    def _marcar_pronta(self):
+        # Alertas enfileirados antes do mainloop não tiveram quem os acordasse
+        self.pronta.set()
+        self.processar_fila()
     
-    while True:
+    def acordar(self):
+        """Chamado por qualquer thread: o tkinter entrega o evento à thread da interface"""
+        if not self.pronta.is_set():
+            return
         try:
-            sala, usuario = fila_alertas.get(timeout=1)
-            abrir_tela(sala, usuario)
-        except queue.Empty:
-            continue
+            self.root.event_generate("<<NovoAlerta>>", when="tail")
         except Exception as e:
-            print(f"Erro ao processar alerta: {e}")
+            print(f"Erro ao acordar a interface de alertas: {e}")
+    
+    def processar_fila(self):
+        while True:
+            try:
+                sala, usuario, id_evento = self.fila.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if self.tela is None or not self.tela.aberta:
+                    self.tela = Tela(tk.Toplevel(self.root))
+                self.tela.adicionar_alerta(sala, usuario, id_evento)
+                # Roda assim que o alerta for desenhado
+                self.root.after_idle(confirmar_etapa, id_evento, "exibido")
+            except Exception as e:
+                print(f"Erro ao exibir alerta: {e}")
 
 class Tela:
-    def __init__(self, master, sala, usuario):
+    def __init__(self, master):
         self.master = master
+        self.aberta = True
         self.som_tocando = True  # Controla se o som ainda está tocando
-        self.mixer_inicializado = False
+        self.fim_som = 0  # time.monotonic() em que termina o som do alerta mais recente
+        self.locais = []  # [sala, usuario, hora, quantidade] na ordem de chegada
+        self.eventos = []  # id_evento de cada alerta mostrado, reconhecidos juntos no FECHAR
         
         self.master.title("Tela de Alerta")
         
@@ -78,8 +155,8 @@ class Tela:
         botao_fonte = tkfont.Font(family="Arial", size=28, weight="bold")
         icone_fonte = tkfont.Font(family="Arial", size=120, weight="bold")
         texto_fonte = tkfont.Font(family="Arial", size=48, weight="bold")
-        sala_fonte = tkfont.Font(family="Helvetica", size=52, weight="bold")
         local_fonte = tkfont.Font(family="Helvetica", size=45, weight="bold")
+        self.lista_fonte = tkfont.Font(family="Helvetica", size=26, weight="bold")
         
         self.frame = tk.Frame(self.master, bg="#B22222")
         self.frame.pack(expand=True, fill="both")
@@ -91,14 +168,19 @@ class Tela:
                                     font=texto_fonte, fg="white", bg="#B22222", justify="center")
         self.texto_aviso.pack(pady=(0, 10))
 
-        self.texto_sala = tk.Label(self.frame, text=f"LOCAL:  {sala.upper()} ", 
+        self.texto_sala = tk.Label(self.frame, text="", 
                                    font=local_fonte, fg="#000000", bg="#B22222", anchor="w")
         self.texto_sala.pack(pady=(0, 30))
         
         self.nome_usuario_fonte = tkfont.Font(family="Arial", size=36, weight="bold")
-        self.nome_usuario_label = tk.Label(self.frame, text=f"Nome do Usuário: {usuario}", 
+        self.nome_usuario_label = tk.Label(self.frame, text="", 
                                            font=self.nome_usuario_fonte, fg="white", bg="#B22222")
         self.nome_usuario_label.pack(pady=(0, 5))
+        
+        # Locais ativos: aparece a partir do segundo alerta
+        self.lista_locais = tk.Label(self.frame, text="", font=self.lista_fonte,
+                                     fg="#FFD700", bg="#B22222", justify="left")
+        self.lista_locais.pack(pady=(10, 0))
  
         botao_frame = tk.Frame(self.frame, bg="#B22222")
         botao_frame.pack(side="bottom", pady=(0, 50))
@@ -114,11 +196,54 @@ class Tela:
                              font=("Arial", 18), bg="#B22222", fg="white")
         self.label.pack(pady=30)
 
+        self.piscar_contador = 8
+        self._verificacao_som = None
+
+    def adicionar_alerta(self, sala, usuario, id_evento=None):
+        """Novo alerta na janela aberta: atualiza a lista, toca o som e volta a piscar"""
+        if id_evento:
+            self.eventos.append(id_evento)
+        for local in self.locais:
+            if local[0] == sala and local[1] == usuario:
+                self.locais.remove(local)
+                local[2] = time.strftime("%H:%M:%S")
+                local[3] += 1
+                self.locais.append(local)
+                break
+        else:
+            self.locais.append([sala, usuario, time.strftime("%H:%M:%S"), 1])
+        self.atualizar_textos()
+        
+        # Reinicia o pisca-pisca se ele já tinha terminado
+        piscando = self.piscar_contador < 8
         self.piscar_contador = 0
-        self.piscar()
+        if not piscando:
+            self.piscar()
+        self.master.deiconify()
+        self.master.focus_force()
 
-        # tocar som ao iniciar a tela
-        threading.Thread(target=self.tocar_som_inicial, daemon=True).start()
+        # Som pré-carregado em memória, num canal próprio: começa junto com o alerta
+        # O botão fechar só é liberado quando termina o som do alerta mais recente
+        _, duracao = motor_audio.tocar()
+        self.fim_som = max(self.fim_som, time.monotonic() + duracao)
+        if duracao > 0 and not self.som_tocando:
+            self.som_tocando = True
+            self.botao.config(text="AGUARDE...", bg="#666666", state="disabled")
+        if self._verificacao_som is not None:
+            self.master.after_cancel(self._verificacao_som)
+        self._verificacao_som = self.master.after(int(max(0, self.fim_som - time.monotonic()) * 1000),
+                                                  self.habilitar_botao_fechar)
+
+    def atualizar_textos(self):
+        sala, usuario, _, _ = self.locais[-1]
+        self.texto_sala.config(text=f"LOCAL:  {sala.upper()} ")
+        self.nome_usuario_label.config(text=f"Nome do Usuário: {usuario}")
+        if len(self.locais) > 1:
+            linhas = [f"{hora}   {sala.upper()} - {usuario}" + (f"  ({quantidade}x)" if quantidade > 1 else "")
+                      for sala, usuario, hora, quantidade in reversed(self.locais)]
+            self.lista_locais.config(text=f"LOCAIS ATIVOS ({len(self.locais)}):\n" + "\n".join(linhas))
+        else:
+            self.lista_locais.config(text="")
 
     def piscar(self):
         if self.piscar_contador < 8:  # 4 segundos (8 mudanças de 0.5 segundos)
@@ -129,12 +254,14 @@ class Tela:
             self.texto_aviso.configure(bg=nova_cor)
             self.texto_sala.configure(bg=nova_cor)
             self.nome_usuario_label.configure(bg=nova_cor)
+            self.lista_locais.configure(bg=nova_cor)
             self.label.configure(bg=nova_cor)
             self.piscar_contador += 1
             self.master.after(500, self.piscar)
 
     def habilitar_botao_fechar(self):
         """Habilita o botão fechar após o som terminar"""
+        self._verificacao_som = None
         self.som_tocando = False
         self.botao.config(text="FECHAR", bg="#c2c2c2", state="normal")
         self.label.config(text="")
@@ -147,14 +274,13 @@ class Tela:
             self.label.config(text="")
 
     def fechar_aplicacao(self):
+        # Fecha a janela e limpa a lista; o próximo alerta abre uma janela nova
+        self.aberta = False
+        # O operador viu todos os alertas da lista
+        for id_evento in self.eventos:
+            confirmar_etapa(id_evento, "reconhecido")
+        self.eventos = []
         self.label.config(text="Fechando...")
-        # Limpa recursos do mixer antes de fechar
-        try:
-            if self.mixer_inicializado:
-                mixer.music.stop()
-                mixer.quit()
-        except:
-            pass
         self.master.after(100, self.master.destroy)
 
     def nao_fechar(self):
@@ -166,51 +292,53 @@ class Tela:
     def manter_foco(self, event):
         self.master.focus_force()
 
-    def tocar_som_inicial(self):
-        try:
-            mixer.init()
-            self.mixer_inicializado = True
-            mixer.music.load(r"C:\Botão_panico\sounds\alerta-sonoro.mp3")
-            
-            # Toca o som 4 vezes
-            for i in range(4):
-                mixer.music.play()
-                # Aguarda o som terminar antes de tocar novamente
-                while mixer.music.get_busy():
-                    time.sleep(0.1)
-                
-                # Pausa entre as reproduções (exceto na última)
-                if i < 3:
-                    time.sleep(0.5)
-            
-            # Som terminou, habilita o botão fechar
-            self.master.after(0, self.habilitar_botao_fechar)
-            
-        except Exception as e:
-            print(f"Erro ao tocar som: {e}")
-            # Se houver erro no som, habilita o botão imediatamente
-            self.master.after(0, self.habilitar_botao_fechar)
-
-def abrir_tela(sala, usuario):
-    """Cria uma nova janela de alerta em uma thread separada"""
-    def criar_janela():
+def confirmar_etapa(id_evento, etapa):
+    """
+    Avisa o servidor que a tela apareceu ("exibido") ou que o operador
+    pressionou FECHAR ("reconhecido"), para a linha do tempo do evento
+    """
+    if not id_evento:
+        return
+    
+    def enviar():
+        import urllib.request  # ~30 ms com o ssl: só quando há o que confirmar
         try:
-            root = tk.Tk()
-            app_tela = Tela(root, sala, usuario)
-            root.mainloop()
+            corpo = json.dumps({"codigo": chave, "etapa": etapa}).encode()
+            requisicao = urllib.request.Request(f"{url_servidor}/alerta5656/eventos/{id_evento}/confirmacao",
+                                                data=corpo, headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(requisicao, timeout=3).close()
         except Exception as e:
-            print(f"Erro ao criar janela: {e}")
+            print(f"Erro ao confirmar etapa {etapa} do alerta: {e}")
     
-    thread_janela = threading.Thread(target=criar_janela, daemon=True)
-    thread_janela.start()
+    threading.Thread(target=enviar, daemon=True).start()
+
+interface_alertas = InterfaceAlertas(fila_alertas)
 
 if __name__ == "__main__":
     print("Iniciando servidor receptor...")
+    inicio = time.monotonic()
     
-    flask_thread = threading.Thread(target=lambda: app.run(host='0.0.0.0', port=9090, debug=False), daemon=True)
+    flask_thread = threading.Thread(target=servir_http, name="servidor-http", daemon=True)
     flask_thread.start()
     
-    print("Servidor iniciado. Pressione Ctrl+C para sair.")
+    # Conexão permanente com o servidor; o HTTP na porta 9090 continua como alternativa
+    cliente_websocket = ClienteWebSocket(url_canal_websocket, enfileirar_alerta)
+    cliente_websocket.iniciar()
+    
+    # Alertas por multicast na rede local, quando o servidor usa MODO_ENTREGA=multicast
+    if chave_multicast:
+        receptor_multicast = ReceptorMulticast(
+            chave_multicast, enfileirar_alerta,
+            grupo=os.getenv('MULTICAST_GRUPO', '239.255.56.56'),
+            porta=int(os.getenv('MULTICAST_PORTA', '5656')),
+            interface=os.getenv('MULTICAST_INTERFACE', '0.0.0.0'))
+        receptor_multicast.iniciar()
+    
+    # Mixer, som do alerta e interface sobem na thread da interface
+    interface_alertas.iniciar()
+    
+    if servidor_pronto.wait(30):
+        print(f"Servidor iniciado na porta {porta_receptor} em {time.monotonic() - inicio:.2f} s. Pressione Ctrl+C para sair.")
     
     try:
         # Mantém o programa rodando
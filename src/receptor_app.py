@@ -2,23 +2,14 @@
 
 import tkinter as tk
 from tkinter import ttk
-import tkinter.font as tkfont
-from flask import Flask, request, jsonify
 import threading
 import time
 import os
-import sys
-import queue
-import subprocess
+import multiprocessing
 from datetime import datetime
-
-# Adicionar pygame se disponível
-try:
-    from pygame import mixer
-    PYGAME_DISPONIVEL = True
-except ImportError:
-    PYGAME_DISPONIVEL = False
-    print("Pygame não disponível - som desabilitado")
+from cliente_websocket import ClienteWebSocket, EventosRecentes
+from multicast import ReceptorMulticast
+from tela_alerta import TrabalhadorTela
 
 class ReceptorApp:
     def __init__(self):
@@ -35,13 +26,27 @@ class ReceptorApp:
         except:
             pass
         
-        self.app = Flask(__name__)
+        # Processo da tela de alerta sobe primeiro: aquece enquanto o resto do aplicativo inicia
+        self.trabalhador_tela = TrabalhadorTela(
+            os.getenv('SERVIDOR_URL', 'http://172.19.200.1:9600'), ao_registrar=lambda mensagem: self.root.after(0, self.adicionar_log, mensagem))
+        self.trabalhador_tela.iniciar()
+        
+        self.app = None  # criado pela thread do servidor HTTP, que também importa o Flask
         self.chave = 'alerta5656'
-        self.fila_alertas = queue.Queue()
         self.servidor_rodando = False
+        self.eventos_recentes = EventosRecentes()
+        self.cliente_websocket = ClienteWebSocket(
+            os.getenv('SERVIDOR_WEBSOCKET', 'ws://172.19.200.1:9601'),
+            self.receber_alerta, ao_mudar_estado=self.atualizar_estado_canal)
+        self.receptor_multicast = None
+        if os.getenv('CHAVE_MULTICAST'):
+            self.receptor_multicast = ReceptorMulticast(
+                os.getenv('CHAVE_MULTICAST'), self.receber_alerta,
+                grupo=os.getenv('MULTICAST_GRUPO', '239.255.56.56'),
+                porta=int(os.getenv('MULTICAST_PORTA', '5656')),
+                interface=os.getenv('MULTICAST_INTERFACE', '0.0.0.0'))
         
         self.setup_gui()
-        self.setup_routes()
         
         # Iniciar servidor Flask em thread separada
         self.iniciar_servidor()
@@ -64,9 +69,13 @@ class ReceptorApp:
         self.status_label = ttk.Label(main_frame, text="Iniciando...", foreground="orange")
         self.status_label.grid(row=1, column=1, sticky=tk.W)
         
-        # Porta
+        # Porta e canal WebSocket
         ttk.Label(main_frame, text="Porta:").grid(row=2, column=0, sticky=tk.W)
-        ttk.Label(main_frame, text="9090").grid(row=2, column=1, sticky=tk.W)
+        porta_frame = ttk.Frame(main_frame)
+        porta_frame.grid(row=2, column=1, sticky=tk.W)
+        ttk.Label(porta_frame, text="9090").pack(side=tk.LEFT)
+        self.canal_label = ttk.Label(porta_frame, text="  WebSocket: conectando...", foreground="orange")
+        self.canal_label.pack(side=tk.LEFT)
         
         # Último alerta
         ttk.Label(main_frame, text="Último Alerta:").grid(row=3, column=0, sticky=tk.W, pady=(10, 0))
@@ -99,6 +108,8 @@ class ReceptorApp:
         self.adicionar_log("Aplicação iniciada")
 
     def setup_routes(self):
+        from flask import request, jsonify
+        
         @self.app.route('/check-health', methods=['GET'])
         def check_health():
             return jsonify({"status": "ok"}), 200
@@ -111,12 +122,7 @@ class ReceptorApp:
                     sala = data.get('sala', 'Desconhecida')
                     usuario = data.get('usuario', 'Desconhecido')
                     
-                    # Adicionar à fila de alertas
-                    self.fila_alertas.put((sala, usuario))
-                    
-                    # Processar alerta em thread separada
-                    threading.Thread(target=self.processar_alerta, 
-                                   args=(sala, usuario), daemon=True).start()
+                    self.receber_alerta(sala, usuario, data.get('id_evento'))
                     
                     return jsonify({"status": "success"}), 200
                 else:
@@ -126,239 +132,82 @@ class ReceptorApp:
                 self.adicionar_log(f"Erro ao receber mensagem: {e}")
                 return jsonify({"error": "Erro interno"}), 500
 
+    def receber_alerta(self, sala, usuario, id_evento=None):
+        # O mesmo alerta pode chegar pelo WebSocket, pelo multicast e pelo HTTP
+        if not self.eventos_recentes.registrar(id_evento):
+            return
+        
+        # Processar alerta em thread separada
+        threading.Thread(target=self.processar_alerta, 
+                       args=(sala, usuario, id_evento), daemon=True).start()
+
+    def atualizar_estado_canal(self, conectado):
+        def atualizar():
+            if conectado:
+                self.canal_label.config(text="  WebSocket: conectado", foreground="green")
+                self.adicionar_log("Canal WebSocket com o servidor conectado")
+            else:
+                self.canal_label.config(text="  WebSocket: desconectado", foreground="red")
+        self.root.after(0, atualizar)
+
     def iniciar_servidor(self):
+        inicio = time.monotonic()
+        
         def run_server():
+            # Flask carregado fora da thread da interface: a janela aparece sem esperar por ele
+            from flask import Flask
+            from werkzeug.serving import make_server
             try:
-                self.app.run(host='0.0.0.0', port=9090, debug=False, use_reloader=False)
+                self.app = Flask(__name__)
+                self.setup_routes()
+                servidor = make_server('0.0.0.0', 9090, self.app, threaded=True)
             except Exception as e:
-                self.adicionar_log(f"Erro no servidor: {e}")
+                self.root.after(0, self.servidor_offline, e)
+                return
+            # A porta já está aceitando conexões: é o próprio servidor que avisa que está online
+            self.root.after(0, self.servidor_online, time.monotonic() - inicio)
+            servidor.serve_forever()
         
         server_thread = threading.Thread(target=run_server, daemon=True)
         server_thread.start()
         
-        # Verificar se o servidor iniciou
-        self.root.after(2000, self.verificar_servidor)
+        # Conexão permanente com o servidor; o HTTP na porta 9090 continua como alternativa
+        self.cliente_websocket.iniciar()
+        if self.receptor_multicast is not None:
+            try:
+                self.receptor_multicast.iniciar()
+                self.adicionar_log("Recebendo alertas por multicast")
+            except OSError as e:
+                self.adicionar_log(f"Erro ao entrar no grupo multicast: {e}")
 
-    def verificar_servidor(self):
-        try:
-            import requests
-            response = requests.get("http://localhost:9090/check-health", timeout=2)
-            if response.status_code == 200:
-                self.status_label.config(text="Online", foreground="green")
-                self.servidor_rodando = True
-                self.adicionar_log("Servidor Flask iniciado com sucesso na porta 9090")
-            else:
-                self.status_label.config(text="Erro", foreground="red")
-        except:
-            self.status_label.config(text="Offline", foreground="red")
-            self.adicionar_log("Erro ao iniciar servidor Flask")
+    def servidor_online(self, duracao):
+        self.status_label.config(text="Online", foreground="green")
+        self.servidor_rodando = True
+        self.adicionar_log(f"Servidor Flask iniciado com sucesso na porta 9090 ({duracao:.2f} s)")
 
-    def processar_alerta(self, sala, usuario):
+    def servidor_offline(self, erro):
+        self.status_label.config(text="Offline", foreground="red")
+        self.adicionar_log(f"Erro ao iniciar servidor Flask: {erro}")
+
+    def processar_alerta(self, sala, usuario, id_evento=None):
         try:
             # Atualizar GUI
             self.root.after(0, lambda: self.atualizar_ultimo_alerta(sala, usuario))
             self.root.after(0, lambda: self.adicionar_log(f"ALERTA RECEBIDO: {sala} - {usuario}"))
             
             # Abrir tela de alerta
-            self.abrir_tela_alerta(sala, usuario)
+            self.abrir_tela_alerta(sala, usuario, id_evento)
             
         except Exception as e:
-            self.root.after(0, lambda: self.adicionar_log(f"Erro ao processar alerta: {e}"))
+            self.root.after(0, lambda erro=e: self.adicionar_log(f"Erro ao processar alerta: {erro}"))
 
-    def abrir_tela_alerta(self, sala, usuario):
+    def abrir_tela_alerta(self, sala, usuario, id_evento=None):
         try:
-            # Criar script temporário para a tela de alerta
-            script_temp = self.criar_script_alerta_temp(sala, usuario)
-            
-            if script_temp:
-                # Executar como processo separado
-                subprocess.Popen([sys.executable, script_temp], 
-                               creationflags=subprocess.CREATE_NEW_CONSOLE if os.name == 'nt' else 0)
-                
+            # A janela é aberta pelo processo de exibição, já com tkinter e pygame carregados
+            self.trabalhador_tela.exibir(sala, usuario, id_evento)
         except Exception as e:
             self.adicionar_log(f"Erro ao abrir tela de alerta: {e}")
 
-    def criar_script_alerta_temp(self, sala, usuario):
-        try:
-            import tempfile
-            
-            temp_dir = tempfile.gettempdir()
-            script_path = os.path.join(temp_dir, f"alerta_gui_{int(time.time())}.py")
-            
-            codigo_gui = f'''#!/usr/bin/env python3
-import tkinter as tk
-import tkinter.font as tkfont
-import threading
-import time
-import os
-
-# Pygame opcional
-try:
-    from pygame import mixer
-    PYGAME_DISPONIVEL = True
-except ImportError:
-    PYGAME_DISPONIVEL = False
-
-class TelaAlerta:
-    def __init__(self, master, sala, usuario):
-        self.master = master
-        self.som_tocando = True
-        self.mixer_inicializado = False
-        
-        self.master.title("ALERTA - BOTÃO DE PÂNICO")
-        self.master.attributes('-fullscreen', True)
-        self.master.protocol("WM_DELETE_WINDOW", self.nao_fechar)
-        self.master.attributes('-topmost', True)
-        self.master.focus_force()
-        self.master.bind("<FocusOut>", self.manter_foco)
-        self.master.configure(bg="#B22222")
-        
-        # Configurar fontes
-        try:
-            botao_fonte = tkfont.Font(family="Arial", size=28, weight="bold")
-            icone_fonte = tkfont.Font(family="Arial", size=120, weight="bold")
-            texto_fonte = tkfont.Font(family="Arial", size=48, weight="bold")
-            local_fonte = tkfont.Font(family="Helvetica", size=45, weight="bold")
-        except:
-            botao_fonte = ("Arial", 28, "bold")
-            icone_fonte = ("Arial", 120, "bold")
-            texto_fonte = ("Arial", 48, "bold")
-            local_fonte = ("Helvetica", 45, "bold")
-        
-        self.frame = tk.Frame(self.master, bg="#B22222")
-        self.frame.pack(expand=True, fill="both")
-
-        self.icone_alerta = tk.Label(self.frame, text="⚠", font=icone_fonte, fg="#FFD700", bg="#B22222")
-        self.icone_alerta.pack(pady=(50, 20))
-
-        self.texto_aviso = tk.Label(self.frame, text="ATENÇÃO!\\n\\nCÓDIGO VIOLETA!\\n\\n", 
-                                    font=texto_fonte, fg="white", bg="#B22222", justify="center")
-        self.texto_aviso.pack(pady=(0, 10))
-
-        self.texto_sala = tk.Label(self.frame, text=f"LOCAL: {sala.upper()}", 
-                                   font=local_fonte, fg="#000000", bg="#B22222")
-        self.texto_sala.pack(pady=(0, 30))
-        
-        self.nome_usuario_label = tk.Label(self.frame, text=f"USUÁRIO: {usuario.upper()}", 
-                                           font=local_fonte, fg="white", bg="#B22222")
-        self.nome_usuario_label.pack(pady=(0, 5))
- 
-        botao_frame = tk.Frame(self.frame, bg="#B22222")
-        botao_frame.pack(side="bottom", pady=(0, 50))
-
-        self.botao = tk.Button(botao_frame, text="AGUARDE...", font=botao_fonte,
-                               bg="#666666", fg="white", activebackground="#666666",
-                               activeforeground="white", relief=tk.FLAT,
-                               command=self.tentar_fechar, padx=30, pady=15,
-                               state="disabled")
-        self.botao.pack()
-        
-        self.label = tk.Label(self.frame, text="", 
-                             font=("Arial", 18), bg="#B22222", fg="white")
-        self.label.pack(pady=30)
-
-        self.piscar_contador = 0
-        self.piscar()
-        
-        # Iniciar som
-        if PYGAME_DISPONIVEL:
-            threading.Thread(target=self.tocar_som_inicial, daemon=True).start()
-        else:
-            self.master.after(10000, self.habilitar_botao_fechar)
-
-    def piscar(self):
-        if self.piscar_contador < 8:
-            cor_atual = self.frame.cget("background")
-            nova_cor = "#CD5C5C" if cor_atual == "#B22222" else "#B22222"
-            self.frame.configure(background=nova_cor)
-            self.icone_alerta.configure(bg=nova_cor)
-            self.texto_aviso.configure(bg=nova_cor)
-            self.texto_sala.configure(bg=nova_cor)
-            self.nome_usuario_label.configure(bg=nova_cor)
-            self.label.configure(bg=nova_cor)
-            self.piscar_contador += 1
-            self.master.after(500, self.piscar)
-
-    def habilitar_botao_fechar(self):
-        self.som_tocando = False
-        self.botao.config(text="FECHAR", bg="#c2c2c2", state="normal")
-        self.label.config(text="")
-
-    def tentar_fechar(self):
-        if not self.som_tocando:
-            self.fechar_aplicacao()
-
-    def fechar_aplicacao(self):
-        self.label.config(text="Fechando...")
-        try:
-            if PYGAME_DISPONIVEL and self.mixer_inicializado:
-                mixer.music.stop()
-                mixer.quit()
-        except:
-            pass
-        self.master.after(100, self.master.destroy)
-
-    def nao_fechar(self):
-        if not self.som_tocando:
-            self.fechar_aplicacao()
-
-    def manter_foco(self, event):
-        self.master.focus_force()
-
-    def tocar_som_inicial(self):
-        if not PYGAME_DISPONIVEL:
-            return
-            
-        try:
-            mixer.init()
-            self.mixer_inicializado = True
-            
-            caminhos_som = [
-                r"C:\\Botão_panico\\sounds\\alerta-sonoro.mp3",
-                r"sounds\\alerta-sonoro.mp3",
-                r".\\sounds\\alerta-sonoro.mp3"
-            ]
-            
-            arquivo_som = None
-            for caminho in caminhos_som:
-                if os.path.exists(caminho):
-                    arquivo_som = caminho
-                    break
-            
-            if arquivo_som is None:
-                self.master.after(0, self.habilitar_botao_fechar)
-                return
-                
-            mixer.music.load(arquivo_som)
-            
-            for i in range(4):
-                mixer.music.play()
-                while mixer.music.get_busy():
-                    time.sleep(0.1)
-                
-                if i < 3:
-                    time.sleep(0.5)
-            
-            self.master.after(0, self.habilitar_botao_fechar)
-            
-        except Exception as e:
-            self.master.after(0, self.habilitar_botao_fechar)
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = TelaAlerta(root, "{sala}", "{usuario}")
-    root.mainloop()
-'''
-            
-            with open(script_path, 'w', encoding='utf-8') as f:
-                f.write(codigo_gui)
-            
-            return script_path
-            
-        except Exception as e:
-            self.adicionar_log(f"Erro ao criar script temporário: {e}")
-            return None
-
     def atualizar_ultimo_alerta(self, sala, usuario):
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.ultimo_alerta_label.config(text=f"{sala} - {usuario} ({timestamp})", 
@@ -366,13 +215,13 @@ if __name__ == "__main__":
 
     def adicionar_log(self, mensagem):
         timestamp = datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {mensagem}\\n"
+        log_entry = f"[{timestamp}] {mensagem}\n"
         
         self.log_text.insert(tk.END, log_entry)
         self.log_text.see(tk.END)
         
         # Limitar o log a 100 linhas
-        lines = self.log_text.get("1.0", tk.END).split("\\n")
+        lines = self.log_text.get("1.0", tk.END).split("\n")
         if len(lines) > 100:
             self.log_text.delete("1.0", "2.0")
 
@@ -385,6 +234,7 @@ if __name__ == "__main__":
 
     def fechar_aplicacao(self):
         self.adicionar_log("Fechando aplicação...")
+        self.trabalhador_tela.encerrar()
         self.root.quit()
         self.root.destroy()
 
@@ -392,5 +242,7 @@ if __name__ == "__main__":
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # Necessário para o processo da tela de alerta no executável do PyInstaller
+    multiprocessing.freeze_support()
     app = ReceptorApp()
     app.run() 
\ No newline at end of file
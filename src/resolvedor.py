@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Resolução do contexto de um alerta numa única ida ao banco.
+
+Nome do usuário, nome e setor da sala e, opcionalmente, a lista de
+receptores vêm de um único SELECT com UNION ALL, executado por um cursor
+preparado (prepared statement no servidor MySQL). O cursor fica guardado
+por conexão do pool, de modo que o comando é preparado uma vez por conexão e
+as execuções seguintes mandam só os parâmetros.
+
+O servidor usa o cache do diretório para quase todos os alertas; este
+resolvedor atende os que não estão no cache (cadastro novo desde a última
+atualização, ou cache ainda não carregado).
+"""
+
+import threading
+import weakref
+from dataclasses import dataclass, field
+
+SQL_CONTEXTO = (
+    "SELECT 'usuario', nome_usuario, NULL FROM usuarios WHERE USERNAME = %s "
+    "UNION ALL SELECT 'sala', nome_sala, setor FROM salas WHERE hostname = %s"
+)
+SQL_CONTEXTO_RECEPTORES = SQL_CONTEXTO + " UNION ALL SELECT 'receptor', ip_receptor, setor FROM receptores"
+
+
+@dataclass
+class ContextoAlerta:
+    """Dados do diretório para um alerta; None quando a linha não existe"""
+    nome_usuario: str = None
+    nome_sala: str = None
+    setor_sala: str = None
+    receptores: list = field(default_factory=list)  # [(ip_receptor, setor), ...]
+
+
+class ResolvedorContexto:
+    """Usuário, sala e receptores de um alerta com um único SELECT preparado"""
+
+    def __init__(self, pool, preparado=True):
+        self.pool = pool
+        self.preparado = preparado
+        self._cursores = weakref.WeakKeyDictionary()  # conexão -> {sql: cursor preparado}
+        self._lock = threading.Lock()
+
+    def _cursor(self, conn, sql):
+        if not self.preparado or getattr(conn, "dialeto", "mysql") != "mysql":
+            return conn.cursor(), False
+        with self._lock:
+            cursores = self._cursores.setdefault(conn, {})
+            cursor = cursores.get(sql)
+            if cursor is None:
+                cursor = cursores[sql] = conn.cursor(prepared=True)
+        return cursor, True
+
+    def _descartar(self, conn):
+        with self._lock:
+            self._cursores.pop(conn, None)
+
+    def resolver(self, usuario, hostname, incluir_receptores=False):
+        """
+        Retorna um ContextoAlerta, com None nos campos sem cadastro, ou None
+        se o banco não respondeu.
+        """
+        sql = SQL_CONTEXTO_RECEPTORES if incluir_receptores else SQL_CONTEXTO
+        try:
+            with self.pool.conexao() as conn:
+                if not conn:
+                    return None
+                cursor, reutilizavel = self._cursor(conn, sql)
+                try:
+                    cursor.execute(sql, (usuario, hostname))
+                    linhas = cursor.fetchall()
+                except Exception:
+                    self._descartar(conn)
+                    raise
+                if not reutilizavel:
+                    cursor.close()
+        except Exception as e:
+            print(f"Erro ao resolver contexto do alerta ({usuario}, {hostname}): {e}")
+            return None
+
+        contexto = ContextoAlerta()
+        for tipo, valor, setor in linhas:
+            # O cursor preparado pode devolver bytes para os literais
+            tipo = tipo.decode() if isinstance(tipo, (bytes, bytearray)) else tipo
+            if tipo == "usuario" and contexto.nome_usuario is None:
+                contexto.nome_usuario = valor
+            elif tipo == "sala" and contexto.nome_sala is None:
+                contexto.nome_sala = valor
+                contexto.setor_sala = setor
+            elif tipo == "receptor":
+                contexto.receptores.append((valor, setor))
+        return contexto
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Retenção e arquivamento das tabelas de log (logs_alertas e logs_sitema).
+
+As duas tabelas são particionadas por mês de data_hora (migração 4 de
+src/migracoes.py): a partição pAAAAMM guarda o mês AAAAMM e a pfuturo recebe
+o que ainda não tem partição própria. Este job:
+
+  1. cria as partições dos próximos meses, separando-as da pfuturo;
+  2. troca cada partição inteiramente mais antiga que a retenção por uma
+     tabela intermediária (EXCHANGE PARTITION) e exporta a intermediária
+     para ARQUIVO_LOGS_PASTA/<tabela>_AAAAMM.csv.gz;
+  3. descarta a partição com DROP PARTITION, sem DELETE linha a linha,
+     depois de levar para o arquivo as linhas que chegaram após a troca.
+
+A dashboard lê esses arquivos quando o período pedido os alcança. Para rodar
+uma vez (cron ou Agendador de Tarefas do Windows):
+
+    python src/retencao_logs.py --dias 180
+
+ou deixar rodando, repetindo a cada N horas:
+
+    python src/retencao_logs.py --intervalo 24
+"""
+
+import csv
+import gzip
+import os
+import time
+from datetime import date, datetime, timedelta
+
+TABELAS_LOG = ("logs_alertas", "logs_sitema")
+
+COLUNAS = {
+    "logs_alertas": ["id", "ip_receptor", "hostname_chamador", "nome_usuario", "nome_sala",
+                     "data_hora", "status", "id_evento"],
+    "logs_sitema": ["id", "log", "data_hora"],
+}
+
+PARTICAO_FUTURO = "pfuturo"
+
+# Nome do lock do MySQL que impede dois jobs de arquivar ao mesmo tempo
+NOME_LOCK = "botao_panico_retencao"
+
+PASTA_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "arquivo_logs")
+
+# TO_DAYS() do MySQL conta um ano a mais que date.toordinal()
+_DESLOCAMENTO_TO_DAYS = 365
+
+
+def _inicio_mes(dia):
+    return date(dia.year, dia.month, 1)
+
+
+def _somar_meses(dia, meses):
+    indice = dia.year * 12 + dia.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _nome_particao(mes):
+    return f"p{mes.year:04d}{mes.month:02d}"
+
+
+def _definicao_particao(mes):
+    limite = _somar_meses(mes, 1).isoformat()
+    return f"PARTITION {_nome_particao(mes)} VALUES LESS THAN (TO_DAYS('{limite}'))"
+
+
+def nome_arquivo(tabela, mes):
+    return f"{tabela}_{mes.year:04d}{mes.month:02d}.csv.gz"
+
+
+def particoes(cursor, tabela):
+    """
+    Partições da tabela em ordem, como (nome, mes) onde mes é o primeiro dia
+    do mês que a partição guarda (None para a pfuturo). Lista vazia se a
+    tabela não for particionada.
+    """
+    cursor.execute("SELECT partition_name, partition_description FROM information_schema.partitions "
+                   "WHERE table_schema = DATABASE() AND table_name = %s AND partition_name IS NOT NULL "
+                   "ORDER BY partition_ordinal_position", (tabela,))
+    lista = []
+    for nome, descricao in cursor.fetchall():
+        if str(descricao).upper() == "MAXVALUE":
+            lista.append((nome, None))
+        else:
+            limite = date.fromordinal(int(descricao) - _DESLOCAMENTO_TO_DAYS)
+            lista.append((nome, _somar_meses(limite, -1)))
+    return lista
+
+
+def particionar_tabela(cursor, tabela, meses_futuros=3):
+    """Converte a tabela para partições mensais, do mês mais antigo com dados até meses_futuros à frente"""
+    if particoes(cursor, tabela):
+        return
+    cursor.execute(f"SELECT MIN(data_hora) FROM {tabela}")
+    mais_antigo = cursor.fetchone()[0]
+    mes = _inicio_mes(mais_antigo or date.today())
+    ultimo = _somar_meses(_inicio_mes(date.today()), meses_futuros)
+    definicoes = []
+    while mes <= ultimo:
+        definicoes.append(_definicao_particao(mes))
+        mes = _somar_meses(mes, 1)
+    definicoes.append(f"PARTITION {PARTICAO_FUTURO} VALUES LESS THAN MAXVALUE")
+
+    # A coluna de particionamento precisa fazer parte da chave primária
+    cursor.execute(f"ALTER TABLE {tabela} DROP PRIMARY KEY, ADD PRIMARY KEY (id, data_hora)")
+    cursor.execute(f"ALTER TABLE {tabela} PARTITION BY RANGE (TO_DAYS(data_hora)) ({', '.join(definicoes)})")
+
+
+def garantir_particoes(cursor, tabela, meses_futuros=3):
+    """Cria as partições que faltam até meses_futuros à frente; retorna os nomes criados"""
+    lista = particoes(cursor, tabela)
+    meses = [mes for _, mes in lista if mes is not None]
+    if not meses:
+        return []
+    ultimo = _somar_meses(_inicio_mes(date.today()), meses_futuros)
+    novos = []
+    mes = _somar_meses(max(meses), 1)
+    while mes <= ultimo:
+        novos.append(mes)
+        mes = _somar_meses(mes, 1)
+    if not novos:
+        return []
+    # Só a pfuturo é reorganizada; com ela vazia a operação é instantânea
+    definicoes = [_definicao_particao(mes) for mes in novos]
+    definicoes.append(f"PARTITION {PARTICAO_FUTURO} VALUES LESS THAN MAXVALUE")
+    cursor.execute(f"ALTER TABLE {tabela} REORGANIZE PARTITION {PARTICAO_FUTURO} INTO ({', '.join(definicoes)})")
+    return [_nome_particao(mes) for mes in novos]
+
+
+def _formatar(valor):
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M:%S")
+    return valor
+
+
+def exportar(conn, tabela, selecao, parametros, caminho, lote=5000):
+    """
+    Grava o resultado de selecao num CSV compactado e retorna o número de
+    linhas. O arquivo é escrito ao lado com .tmp e só substitui o final
+    depois de fsync, então um arquivo com o nome final está sempre completo.
+    """
+    colunas = COLUNAS[tabela]
+    temporario = caminho + ".tmp"
+    cursor = conn.cursor()
+    linhas = 0
+    try:
+        cursor.execute(f"SELECT {', '.join(colunas)} FROM {selecao}", parametros)
+        with open(temporario, "wb") as bruto:
+            with gzip.open(bruto, "wt", encoding="utf-8", newline="") as arquivo:
+                escritor = csv.writer(arquivo)
+                escritor.writerow(colunas)
+                while True:
+                    bloco = cursor.fetchmany(lote)
+                    if not bloco:
+                        break
+                    escritor.writerows([_formatar(valor) for valor in linha] for linha in bloco)
+                    linhas += len(bloco)
+            bruto.flush()
+            os.fsync(bruto.fileno())
+    finally:
+        cursor.close()
+    os.replace(temporario, caminho)
+    return linhas
+
+
+def _tabela_existe(cursor, nome):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() "
+                   "AND table_name = %s", (nome,))
+    return cursor.fetchone()[0] > 0
+
+
+def _nome_intermediaria(tabela, mes):
+    return f"{tabela}_arquivo_{mes.year:04d}{mes.month:02d}"
+
+
+def _meses_vencidos_mysql(conn, tabela, limite):
+    cursor = conn.cursor()
+    try:
+        lista = particoes(cursor, tabela)
+        padrao = f"{tabela}_arquivo_".replace("_", "\\_") + "%"
+        cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE() "
+                       "AND table_name LIKE %s", (padrao,))
+        intermediarias = [linha[0] for linha in cursor.fetchall()]
+    finally:
+        cursor.close()
+    vencidos = {mes: nome for nome, mes in lista if mes is not None and _somar_meses(mes, 1) <= limite}
+    # Intermediária deixada por uma rodada interrompida: o mês ainda não foi arquivado
+    for nome in intermediarias:
+        sufixo = nome[-6:]
+        if sufixo.isdigit():
+            vencidos.setdefault(date(int(sufixo[:4]), int(sufixo[4:]), 1), None)
+    return [(vencidos[mes], mes) for mes in sorted(vencidos)]
+
+
+def _meses_vencidos_sqlite(conn, tabela, limite):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT DISTINCT substr(data_hora, 1, 7) FROM {tabela} WHERE data_hora < %s "
+                       f"ORDER BY 1", (limite.isoformat(),))
+        meses = [date(int(texto[:4]), int(texto[5:7]), 1) for (texto,) in cursor.fetchall()]
+    finally:
+        cursor.close()
+    return [(None, mes) for mes in meses if _somar_meses(mes, 1) <= limite]
+
+
+def _arquivar_particao(conn, tabela, particao, mes, caminho):
+    """
+    Troca a partição por uma tabela intermediária vazia (EXCHANGE PARTITION,
+    instantâneo), exporta a intermediária, em que ninguém mais grava, e só
+    então descarta a partição. Linhas atrasadas que caíram na partição
+    depois da troca são contadas e copiadas para a intermediária com a
+    tabela travada, imediatamente antes do DROP PARTITION. Retorna o número
+    de linhas arquivadas.
+    """
+    intermediaria = _nome_intermediaria(tabela, mes)
+    colunas = ", ".join(COLUNAS[tabela])
+    cursor = conn.cursor()
+    try:
+        if not _tabela_existe(cursor, intermediaria):
+            cursor.execute(f"CREATE TABLE {intermediaria} LIKE {tabela}")
+            cursor.execute(f"ALTER TABLE {intermediaria} REMOVE PARTITIONING")
+        cursor.execute(f"SELECT COUNT(*) FROM {intermediaria}")
+        if particao and cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE {tabela} EXCHANGE PARTITION {particao} WITH TABLE {intermediaria}")
+        linhas = exportar(conn, tabela, intermediaria, (), caminho)
+
+        atrasadas = 0
+        if particao:
+            cursor.execute(f"LOCK TABLES {tabela} WRITE, {intermediaria} WRITE")
+            try:
+                cursor.execute(f"SELECT COUNT(*) FROM {tabela} PARTITION ({particao})")
+                atrasadas = cursor.fetchone()[0]
+                if atrasadas:
+                    cursor.execute(f"INSERT INTO {intermediaria} ({colunas}) "
+                                   f"SELECT {colunas} FROM {tabela} PARTITION ({particao})")
+                    conn.commit()
+                cursor.execute(f"ALTER TABLE {tabela} DROP PARTITION {particao}")
+            finally:
+                cursor.execute("UNLOCK TABLES")
+        if atrasadas:
+            print(f"Retenção: {atrasadas} linhas chegaram a {tabela} {mes:%Y-%m} durante a exportação; exportando de novo")
+            linhas = exportar(conn, tabela, intermediaria, (), caminho)
+        cursor.execute(f"DROP TABLE {intermediaria}")
+        return linhas
+    finally:
+        cursor.close()
+
+
+def _arquivar_intervalo(conn, tabela, mes, caminho):
+    """
+    Sem partições (banco SQLite dos testes): exporta o mês e apaga só as
+    linhas exportadas, limitadas pelo maior id lido antes da exportação.
+    """
+    inicio, fim = mes.isoformat(), _somar_meses(mes, 1).isoformat()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT MAX(id) FROM {tabela} WHERE data_hora >= %s AND data_hora < %s", (inicio, fim))
+        maior_id = cursor.fetchone()[0]
+        selecao = f"{tabela} WHERE data_hora >= %s AND data_hora < %s AND id <= %s"
+        parametros = (inicio, fim, maior_id)
+        linhas = exportar(conn, tabela, selecao, parametros, caminho)
+        cursor.execute(f"DELETE FROM {selecao}", parametros)
+        conn.commit()
+        return linhas
+    finally:
+        cursor.close()
+
+
+def arquivar_tabela(conn, tabela, pasta, dias_retencao):
+    """
+    Arquiva e descarta os meses da tabela inteiramente anteriores à retenção.
+    Retorna uma lista de (mes, linhas, caminho).
+    """
+    dialeto = getattr(conn, "dialeto", "mysql")
+    limite = date.today() - timedelta(days=dias_retencao)
+    if dialeto == "mysql":
+        vencidos = _meses_vencidos_mysql(conn, tabela, limite)
+    else:
+        vencidos = _meses_vencidos_sqlite(conn, tabela, limite)
+
+    os.makedirs(pasta, exist_ok=True)
+    arquivados = []
+    for particao, mes in vencidos:
+        caminho = os.path.join(pasta, nome_arquivo(tabela, mes))
+        if dialeto == "mysql":
+            linhas = _arquivar_particao(conn, tabela, particao, mes, caminho)
+        else:
+            linhas = _arquivar_intervalo(conn, tabela, mes, caminho)
+        print(f"Retenção: {tabela} {mes:%Y-%m} arquivado em {caminho} ({linhas} linhas)")
+        arquivados.append((mes, linhas, caminho))
+    return arquivados
+
+
+def executar_retencao(conn, pasta=PASTA_PADRAO, dias_retencao=180, meses_futuros=3, tempo_lock=10):
+    """Uma rodada do job: cria partições futuras e arquiva as vencidas. Retorna {tabela: arquivados}"""
+    dialeto = getattr(conn, "dialeto", "mysql")
+    cursor = conn.cursor()
+    travado = False
+    try:
+        if dialeto == "mysql":
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (NOME_LOCK, tempo_lock))
+            travado = cursor.fetchone()[0] == 1
+            if not travado:
+                print("Retenção: outro processo já está arquivando")
+                return {}
+            for tabela in TABELAS_LOG:
+                criadas = garantir_particoes(cursor, tabela, meses_futuros)
+                if criadas:
+                    print(f"Retenção: partições criadas em {tabela}: {', '.join(criadas)}")
+        return {tabela: arquivar_tabela(conn, tabela, pasta, dias_retencao) for tabela in TABELAS_LOG}
+    finally:
+        if travado:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (NOME_LOCK,))
+            cursor.fetchone()
+        cursor.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import dotenv
+    import mysql.connector
+
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description="Arquiva e descarta os logs mais antigos que a retenção")
+    parser.add_argument("--dias", type=int, default=int(os.getenv("RETENCAO_DIAS", "180")),
+                        help="dias mantidos no banco (padrão: RETENCAO_DIAS ou 180)")
+    parser.add_argument("--pasta", default=os.getenv("ARQUIVO_LOGS_PASTA", PASTA_PADRAO),
+                        help="pasta dos arquivos .csv.gz (padrão: ARQUIVO_LOGS_PASTA)")
+    parser.add_argument("--meses-futuros", type=int, default=3, help="partições criadas à frente")
+    parser.add_argument("--intervalo", type=float, default=0,
+                        help="repete a cada N horas; 0 roda uma vez e sai")
+    args = parser.parse_args()
+
+    while True:
+        conexao = None
+        try:
+            conexao = mysql.connector.connect(host=os.getenv('DATABASE_HOST'), user=os.getenv('DATABASE_USER'),
+                                              password=os.getenv('PASSWORD'), database='botao_panico')
+            executar_retencao(conexao, args.pasta, args.dias, args.meses_futuros)
+        except Exception as e:
+            print(f"Erro na retenção de logs: {e}")
+            if not args.intervalo:
+                raise
+        finally:
+            if conexao:
+                conexao.close()
+        if not args.intervalo:
+            break
+        time.sleep(args.intervalo * 3600)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Roteamento dos alertas por setor.
+
+Salas e receptores têm uma coluna setor (pode listar vários, separados por
+vírgula). O alerta de uma sala vai primeiro para os receptores dos mesmos
+setores e para os receptores globais, que recebem todos os alertas (setor
+listado em SETORES_GLOBAIS ou IP em RECEPTORES_GLOBAIS). Se a sala não tem
+setor, ou nenhum receptor atende aos setores dela, o alerta vai para todos.
+
+O índice é montado junto com o cache do diretório; resolver os destinos de
+uma sala não toca no banco.
+"""
+
+import re
+import threading
+
+
+def separar_setores(texto):
+    """'Bloco A, Portaria' -> {'bloco a', 'portaria'}"""
+    return frozenset(setor.strip().lower() for setor in re.split(r"[,;]", texto or "") if setor.strip())
+
+
+class RoteadorSetores:
+    """Índice setor -> receptores, reconstruído a cada atualização do diretório"""
+
+    def __init__(self, receptores, setores_globais=(), ips_globais=()):
+        # receptores: [(ip_receptor, setor), ...]
+        self.todos = list(dict.fromkeys(ip for ip, _ in receptores))
+        globais_por_setor = frozenset(setor.lower() for setor in setores_globais)
+        self.por_setor = {}
+        globais = [ip for ip in ips_globais if ip in self.todos]
+        for ip, setor in receptores:
+            setores = separar_setores(setor)
+            if setores & globais_por_setor:
+                globais.append(ip)
+            for nome in setores:
+                self.por_setor.setdefault(nome, []).append(ip)
+        self.globais = list(dict.fromkeys(globais))
+        self._resolvidos = {}
+        self._lock = threading.Lock()
+
+    def destinos(self, setor_sala):
+        """
+        Retorna (do_setor, globais, demais). A primeira onda vai para
+        do_setor + globais; demais só recebem se ninguém de do_setor
+        confirmar. Sem roteamento possível, do_setor traz todos os receptores
+        e as outras listas vêm vazias.
+        """
+        setores = separar_setores(setor_sala)
+        with self._lock:
+            resolvido = self._resolvidos.get(setores)
+        if resolvido is not None:
+            return resolvido
+
+        do_setor = list(dict.fromkeys(ip for nome in setores for ip in self.por_setor.get(nome, ())))
+        if not do_setor:
+            resolvido = (self.todos, [], [])
+        else:
+            globais = [ip for ip in self.globais if ip not in do_setor]
+            alvo = set(do_setor) | set(globais)
+            resolvido = (do_setor, globais, [ip for ip in self.todos if ip not in alvo])
+        with self._lock:
+            self._resolvidos[setores] = resolvido
+        return resolvido
+
+    def estado(self):
+        return {
+            "receptores": len(self.todos),
+            "setores": {nome: len(ips) for nome, ips in sorted(self.por_setor.items())},
+            "globais": list(self.globais),
+        }
@@ -1,121 +1,510 @@
 #!/usr/bin/env python3
 from datetime import datetime
-import random
-import string
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import mysql.connector
 import requests
-import threading
 import dotenv
 import os
 import json
+import atexit
+import tempfile
+import time
+import threading
+from pool_conexoes import PoolConexoes
+from despacho import Despachante, tempo_restante
+from gravador_logs import GravadorLogs
+from evento import EventoAlerta, RegistroEventos, gerar_combo
+from coalescencia import JanelaCoalescencia
+from canal_websocket import CanalWebSocket, ENDERECOS_LOCAIS
+from multicast import EmissorMulticast
+from monitor_receptores import MonitorReceptores
+from metricas import RegistroMetricas
+from migracoes import aplicar_migracoes
+from roteamento import RoteadorSetores
+from cluster import CoordenadorCluster
+from spool import SpoolLocal
+from resolvedor import ResolvedorContexto
 
 
 dotenv.load_dotenv()
 database_host = os.getenv('DATABASE_HOST')
 database_user = os.getenv('DATABASE_USER')
 database_password = os.getenv('PASSWORD')
+tamanho_pool = int(os.getenv('POOL_TAMANHO', '10'))
+tempo_vida_conexao = int(os.getenv('POOL_TEMPO_VIDA', '1800'))
+tempo_conexao_banco = int(os.getenv('BANCO_TEMPO_CONEXAO', '5'))
+max_entregas_simultaneas = int(os.getenv('DESPACHO_TRABALHADORES', '100'))
+max_eventos_simultaneos = int(os.getenv('DESPACHO_EVENTOS', '8'))
+prazo_evento = float(os.getenv('DESPACHO_PRAZO', '10'))
+prazo_retentativas = float(os.getenv('RETENTATIVA_PRAZO', '120'))
+retentativa_base = float(os.getenv('RETENTATIVA_BASE', '0.5'))
+retentativa_maximo = float(os.getenv('RETENTATIVA_MAXIMO', '15'))
+ttl_diretorio = float(os.getenv('DIRETORIO_TTL', '300'))
+marcador_diretorio = os.getenv('DIRETORIO_MARCADOR', os.path.join(tempfile.gettempdir(), 'botao_panico_diretorio.marca'))
+tamanho_fila_logs = int(os.getenv('LOGS_TAMANHO_FILA', '10000'))
+porta_receptor = int(os.getenv('RECEPTOR_PORTA', '9090'))
+janela_coalescencia = float(os.getenv('JANELA_COALESCENCIA', '30'))
+max_eventos_coalescencia = int(os.getenv('COALESCENCIA_MAX_ENTRADAS', '10000'))
+websocket_ativo = os.getenv('WEBSOCKET_ATIVO', '1') == '1'
+porta_websocket = int(os.getenv('WEBSOCKET_PORTA', '9601'))
+proxies_websocket = [ip.strip() for ip in os.getenv('WEBSOCKET_PROXIES_CONFIAVEIS', '').split(',') if ip.strip()]
+tempo_limite_ack_websocket = float(os.getenv('WEBSOCKET_TEMPO_ACK', '1'))
+modo_entrega = os.getenv('MODO_ENTREGA', 'unicast')
+chave_multicast = os.getenv('CHAVE_MULTICAST')
+grupo_multicast = os.getenv('MULTICAST_GRUPO', '239.255.56.56')
+porta_multicast = int(os.getenv('MULTICAST_PORTA', '5656'))
+porta_ack_multicast = int(os.getenv('MULTICAST_PORTA_ACK', '0'))
+interface_multicast = os.getenv('MULTICAST_INTERFACE', '0.0.0.0')
+repeticoes_multicast = int(os.getenv('MULTICAST_REPETICOES', '3'))
+tempo_limite_ack_multicast = float(os.getenv('MULTICAST_TEMPO_ACK', '1'))
+monitor_ativo = os.getenv('MONITOR_ATIVO', '1') == '1'
+intervalo_monitor = float(os.getenv('MONITOR_INTERVALO', '10'))
+tempo_limite_monitor = float(os.getenv('MONITOR_TEMPO_LIMITE', '2'))
+falhas_para_queda = int(os.getenv('MONITOR_FALHAS_QUEDA', '2'))
+migracoes_automaticas = os.getenv('MIGRACOES_AUTOMATICAS', '1') == '1'
+roteamento_setores = os.getenv('ROTEAMENTO_SETORES', '1') == '1'
+setores_globais = [setor.strip() for setor in os.getenv('SETORES_GLOBAIS', 'global,todos').split(',') if setor.strip()]
+receptores_globais = [ip.strip() for ip in os.getenv('RECEPTORES_GLOBAIS', '').split(',') if ip.strip()]
+# Acima disso a lista de destinos não vai no datagrama multicast e todos os receptores do grupo exibem
+max_destinos_multicast = int(os.getenv('MULTICAST_MAX_DESTINOS', '256'))
+cluster_ativo = os.getenv('CLUSTER_ATIVO', '0') == '1'
+no_cluster = os.getenv('CLUSTER_NO_ID')
+lease_cluster = float(os.getenv('CLUSTER_LEASE', '15'))
+idade_maxima_cluster = float(os.getenv('CLUSTER_IDADE_MAXIMA', '600'))
+spool_ativo = os.getenv('SPOOL_ATIVO', '1') == '1'
+arquivo_spool = os.getenv('SPOOL_ARQUIVO', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'spool', 'botao_panico.db'))
+lease_spool = float(os.getenv('SPOOL_LEASE', '5'))
+sincrono_spool = os.getenv('SPOOL_SINCRONO', 'NORMAL')
 
 app = Flask(__name__)
 
-def gerar_combo(tamanho=6):
+metricas = RegistroMetricas()
+metrica_alertas_recebidos = metricas.contador(
+    "botao_panico_alertas_recebidos_total", "Acionamentos do botão aceitos pelo servidor")
+metrica_alertas_coalescidos = metricas.contador(
+    "botao_panico_alertas_coalescidos_total", "Acionamentos repetidos anexados a um evento em andamento")
+metrica_entregas = metricas.contador(
+    "botao_panico_entregas_total", "Resultado final da entrega por receptor (linhas de logs_alertas)", ("status",))
+metrica_tentativas = metricas.contador(
+    "botao_panico_tentativas_http_total", "Tentativas de envio HTTP aos receptores por resultado", ("status",))
+metrica_latencia_entrega = metricas.histograma(
+    "botao_panico_latencia_entrega_segundos", "Tempo de entrega do alerta a um receptor", ("canal",))
+metrica_fanout = metricas.histograma(
+    "botao_panico_fanout_segundos", "Tempo da primeira onda de envio de um alerta a todos os receptores",
+    limites=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 6, 8, 10, 15, 30))
+metrica_confirmacao_receptor = metricas.histograma(
+    "botao_panico_confirmacao_receptor_segundos",
+    "Tempo do acionamento até a tela exibida e até o reconhecimento pelo operador, por receptor", ("etapa",),
+    limites=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600))
+metrica_roteamento = metricas.contador(
+    "botao_panico_roteamento_total", "Alertas por resultado do roteamento por setor", ("resultado",))
+metrica_banco = metricas.histograma(
+    "botao_panico_banco_segundos", "Tempo das operações no banco por função", ("funcao",))
+metrica_eventos_em_andamento = metricas.medidor(
+    "botao_panico_eventos_em_andamento", "Eventos sendo enviados aos receptores")
+metricas.medidor("botao_panico_pool_conexoes_em_uso", "Conexões do pool em uso",
+                 lambda: pool_banco.estatisticas()["em_uso"])
+metricas.medidor("botao_panico_pool_conexoes_livres", "Conexões ociosas no pool",
+                 lambda: pool_banco.estatisticas()["livres"])
+metricas.medidor("botao_panico_pool_conexoes_maximo", "Tamanho máximo do pool",
+                 lambda: pool_banco.tamanho_maximo)
+metricas.medidor("botao_panico_retentativas_pendentes", "Retentativas aguardando execução",
+                 lambda: despachante.retentativas.pendentes())
+metricas.medidor("botao_panico_logs_na_fila", "Linhas de log aguardando gravação",
+                 lambda: gravador_logs.estatisticas()["na_fila"])
+metricas.medidor("botao_panico_logs_rejeitados", "Linhas de log recusadas pelo banco e descartadas desde o início do processo",
+                 lambda: gravador_logs.estatisticas()["rejeitadas"])
+metricas.medidor("botao_panico_spool_linhas_pendentes", "Linhas de log no spool local aguardando replicação para o MySQL",
+                 lambda: spool_eventos.estatisticas()["linhas_pendentes"] if spool_eventos else 0)
+metricas.medidor("botao_panico_spool_linhas_recusadas", "Linhas do spool recusadas pelo MySQL e guardadas em linhas_recusadas",
+                 lambda: spool_eventos.estatisticas()["linhas_recusadas"] if spool_eventos else 0)
+metricas.medidor("botao_panico_spool_eventos_retomados", "Eventos retomados do spool local desde o início do processo",
+                 lambda: spool_eventos.eventos_retomados if spool_eventos else 0)
+metricas.medidor("botao_panico_receptores_websocket", "Receptores conectados pelo canal WebSocket",
+                 lambda: len(canal_websocket.conectados()))
+metricas.medidor("botao_panico_receptores_inativos", "Receptores marcados como inativos pelo monitor",
+                 lambda: monitor_receptores.estado()["inativos"])
+metricas.medidor("botao_panico_cluster_eventos_acompanhados", "Eventos com lease mantido por este processo",
+                 lambda: coordenador_cluster.estado()["eventos_acompanhados"])
+metricas.medidor("botao_panico_cluster_eventos_assumidos", "Eventos assumidos de outro nó desde o início do processo",
+                 lambda: coordenador_cluster.estado()["eventos_assumidos"])
+despachante = Despachante(max_entregas=max_entregas_simultaneas,
+                          max_eventos=max_eventos_simultaneos,
+                          prazo_evento=prazo_evento,
+                          retentativa_base=retentativa_base,
+                          retentativa_maximo=retentativa_maximo)
+eventos_recentes = RegistroEventos()
+coalescencia = JanelaCoalescencia(janela=janela_coalescencia, max_entradas=max_eventos_coalescencia)
+canal_websocket = CanalWebSocket(porta=porta_websocket, proxies_confiaveis=proxies_websocket)
+if websocket_ativo:
+    canal_websocket.iniciar()
+emissor_multicast = None
+if modo_entrega == 'multicast':
+    if chave_multicast:
+        emissor_multicast = EmissorMulticast(chave_multicast, grupo=grupo_multicast, porta=porta_multicast,
+                                             porta_ack=porta_ack_multicast, interface=interface_multicast,
+                                             repeticoes=repeticoes_multicast)
+    else:
+        print("MODO_ENTREGA=multicast exige CHAVE_MULTICAST; usando apenas unicast")
 
-  caracteres = string.ascii_letters + string.digits
-  combo = ''.join(random.choices(caracteres, k=tamanho))
+def sondar_receptor(ip_receptor, tempo_limite):
+    # Usa a mesma sessão keep-alive dos alertas, que assim já encontram a conexão aberta
+    response = despachante.sessao(ip_receptor).get(
+        f"http://{ip_receptor}:{porta_receptor}/check-health", timeout=tempo_limite)
+    return response.status_code == 200
 
-  return combo
+def notificar_estado_receptor(ip_receptor, ativo):
+    salvar_logs_sitema(f"Receptor {ip_receptor} {'voltou a responder' if ativo else 'parou de responder'}")
 
+monitor_receptores = MonitorReceptores(
+    lambda: [receptor[0] for receptor in localizar_receptores()], sondar_receptor,
+    intervalo=intervalo_monitor, tempo_limite=tempo_limite_monitor,
+    falhas_para_queda=falhas_para_queda, ao_mudar_estado=notificar_estado_receptor)
 
 @app.route('/alerta5656/enviar', methods=['POST'])
 def receber_acao():
-    global hostname
-    global id_evento
-    global request_ip
-    id_evento = gerar_combo()
     request_ip = request.remote_addr
-    data = request.get_json()
+    data = request.get_json(silent=True)
     
     if data is None:
-        salvar_logs_sitema(f"Nenhum dado JSON foi recebido por {request_ip} - {id_evento}")
+        salvar_logs_sitema(f"Nenhum dado JSON foi recebido por {request_ip} - {gerar_combo()}")
         return jsonify({"error": "Nenhum dado JSON foi recebido"}), 400
     
     print(f"data: {data}")
     
     if 'hostname' not in data or 'usuario' not in data or 'codigo' not in data:
-        salvar_logs_sitema(f"Dados obrigatórios ausentes (hostname, usuario, codigo) por {request_ip} - {id_evento}")
+        salvar_logs_sitema(f"Dados obrigatórios ausentes (hostname, usuario, codigo) por {request_ip} - {gerar_combo()}")
         return jsonify({"error": "Dados obrigatórios ausentes (hostname, usuario, codigo)"}), 400
     
-    hostname = data['hostname']
-    print(f"hostname: {hostname}")
-    usuario = data['usuario']
-    print(f"usuario: {usuario}")
-    codigo = data['codigo']
-    print(f"codigo: {codigo}")
+    evento = EventoAlerta(
+        hostname=data['hostname'],
+        usuario=data['usuario'],
+        codigo=data['codigo'],
+        request_ip=request_ip
+    )
+    evento.marcar("recebido")
+    print(f"evento {evento.id_evento}: hostname={evento.hostname} usuario={evento.usuario} codigo={evento.codigo}")
+    
+    metrica_alertas_recebidos.inc()
+    existente = coalescencia.anexar_ou_registrar(evento.hostname, evento.usuario, evento)
+    if existente is not None:
+        metrica_alertas_coalescidos.inc()
+        existente.marcar("repeticao", request_ip)
+        salvar_logs_sitema(f"Acionamento repetido ({existente.repeticoes}) por {request_ip} anexado ao evento {existente.id_evento}")
+        return jsonify({"message": "Ação recebida com sucesso", "id_evento": existente.id_evento,
+                        "coalescido": True, "repeticoes": existente.repeticoes}), 200
     
-    nome_usuario = localizar_usuario(usuario)
+    nome_usuario, nome_sala, setor_sala = localizar_contexto(evento.usuario, evento.hostname)
     if nome_usuario is None:
-        nome_usuario = usuario
-    nome_sala = localizar_sala(hostname)
+        nome_usuario = evento.usuario
     if nome_sala is None:
         nome_sala = "Sala não encontrada"
-    enviar_alerta(nome_usuario, nome_sala)
-    salvar_logs_sitema(f"Ação recebida com sucesso por {request_ip} para o usuário {nome_usuario} na sala {nome_sala}")
-    return jsonify({"message": "Ação recebida com sucesso"}), 200
+    evento.nome_usuario = nome_usuario
+    evento.nome_sala = nome_sala
+    evento.setor_sala = setor_sala
+    evento.marcar("diretorio")
+    
+    if cluster_ativo:
+        # O mesmo acionamento pode chegar a mais de um servidor; só o primeiro envia
+        chave = data.get('id_acionamento') or f"{evento.hostname}|{evento.usuario}|{int(time.time() // max(janela_coalescencia, 1))}"
+        id_existente = coordenador_cluster.registrar_evento(chave, evento.para_dados(),
+                                                            evento.recebido_em + prazo_retentativas)
+        if id_existente is not None:
+            coalescencia.descartar(evento.hostname, evento.usuario, evento)
+            metrica_alertas_coalescidos.inc()
+            salvar_logs_sitema(f"Acionamento de {request_ip} já registrado por outro servidor no evento {id_existente}")
+            return jsonify({"message": "Ação recebida com sucesso", "id_evento": id_existente,
+                            "coalescido": True}), 200
+    
+    # Grava no disco antes de responder: um reinício retoma o envio a partir do spool
+    registrar_evento_spool(evento)
+    eventos_recentes.adicionar(evento)
+    
+    despachante.agendar_evento(enviar_alerta, evento)
+    salvar_logs_sitema(f"Ação recebida com sucesso por {request_ip} para o usuário {nome_usuario} na sala {nome_sala} - {evento.id_evento}")
+    return jsonify({"message": "Ação recebida com sucesso", "id_evento": evento.id_evento}), 200
+
+ETAPAS_CONFIRMACAO = ("exibido", "reconhecido")
+
+@app.route('/alerta5656/eventos/<id_evento>/confirmacao', methods=['POST'])
+def confirmar_etapa(id_evento, etapa=None):
+    """
+    Confirmação assíncrona do receptor, depois do 200 do envio: "exibido"
+    quando a tela de alerta aparece e "reconhecido" quando o operador
+    pressiona FECHAR.
+    """
+    data = request.get_json(silent=True) or {}
+    etapa = etapa or data.get('etapa')
+    if data.get('codigo') != 'alerta5656' or etapa not in ETAPAS_CONFIRMACAO:
+        return jsonify({"error": "Dados obrigatórios ausentes (codigo, etapa: exibido ou reconhecido)"}), 400
+    
+    ip_receptor = identificar_receptor(data.get('ip_receptor'))
+    evento = eventos_recentes.obter(id_evento)
+    if evento is None and not evento_conhecido(id_evento):
+        return jsonify({"error": "Evento desconhecido"}), 404
+    if evento is not None:
+        evento.marcar(etapa, ip_receptor)
+        metrica_confirmacao_receptor.observar(time.monotonic() - evento.recebido_em, etapa=etapa)
+        gravar_linha_tempo(evento)
+    else:
+        # Evento atendido por outro worker (ou já fora da memória): usa o relógio do sistema
+        etapas = [[etapa, ip_receptor, round(time.time() * 1000, 1), None]]
+        gravar_linha_tempo(None, id_evento, etapas)
+    if etapa == "reconhecido":
+        salvar_logs_sitema(f"Alerta {id_evento} reconhecido pelo operador do receptor {ip_receptor}")
+    return jsonify({"message": "Confirmação registrada", "etapa": etapa}), 200
+
+def identificar_receptor(informado):
+    """
+    Mesma regra do canal WebSocket: o receptor é o endereço de origem da
+    requisição; o ip_receptor enviado só vale atrás do loopback ou de um
+    proxy confiável (WEBSOCKET_PROXIES_CONFIAVEIS).
+    """
+    origem = request.remote_addr or ""
+    if origem.startswith("::ffff:"):
+        origem = origem[len("::ffff:"):]
+    if informado and (origem in ENDERECOS_LOCAIS or origem in proxies_websocket):
+        return informado
+    return origem
+
+
+def evento_conhecido(id_evento):
+    """Evento fora da memória deste worker: aceito por outro worker (spool) ou outro nó (cluster)"""
+    if spool_eventos is not None:
+        try:
+            if spool_eventos.conhece_evento(id_evento):
+                return True
+        except Exception as e:
+            print(f"Erro ao consultar o evento {id_evento} no spool: {e}")
+    if cluster_ativo:
+        # Sem o banco não há como saber; a confirmação não é descartada
+        return coordenador_cluster.conhece_evento(id_evento) is not False
+    return False
+
+@app.route('/alerta5656/exibido', methods=['POST'])
+def confirmar_exibicao():
+    """Rota dos receptores anteriores: confirma a etapa exibido"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('id_evento'):
+        return jsonify({"error": "Dados obrigatórios ausentes (codigo, id_evento)"}), 400
+    return confirmar_etapa(data['id_evento'], "exibido")
+
+@app.route('/metrics', methods=['GET'])
+def exportar_metricas():
+    return Response(metricas.exportar(), mimetype=metricas.TIPO_CONTEUDO)
 
 @app.route('/check-health', methods=['GET'])
 def check_health():
     return jsonify({"status": "ok"}), 200
 
-def enviar_alerta(nome_usuario, nome_sala):
-    salvar_logs_sitema(f"Enviando alerta do usuário {nome_usuario} da sala {nome_sala} - {id_evento}")
+@app.route('/diretorio/invalidar', methods=['POST'])
+def invalidar_diretorio():
+    cache_diretorio.invalidar()
+    despachante.agendar_evento(cache_diretorio.garantir_atualizado)
+    return jsonify({"message": "Diretório invalidado"}), 200
+
+@app.route('/diretorio/estado', methods=['GET'])
+def estado_diretorio():
+    return jsonify(cache_diretorio.estado()), 200
+
+@app.route('/pool/estatisticas', methods=['GET'])
+def estatisticas_pool():
+    return jsonify(pool_banco.estatisticas()), 200
+
+@app.route('/coalescencia/estatisticas', methods=['GET'])
+def estatisticas_coalescencia():
+    return jsonify(coalescencia.estatisticas()), 200
+
+@app.route('/retentativas/estatisticas', methods=['GET'])
+def estatisticas_retentativas():
+    return jsonify({"pendentes": despachante.retentativas.pendentes()}), 200
+
+@app.route('/websocket/estado', methods=['GET'])
+def estado_websocket():
+    return jsonify({"modo": canal_websocket.modo, "conectados": canal_websocket.conectados()}), 200
+
+@app.route('/cluster/estado', methods=['GET'])
+def estado_cluster():
+    return jsonify(dict(coordenador_cluster.estado(), ativo=cluster_ativo)), 200
+
+@app.route('/spool/estado', methods=['GET'])
+def estado_spool():
+    if spool_eventos is None:
+        return jsonify({"ativo": False}), 200
+    return jsonify(dict(spool_eventos.estatisticas(idade_maxima=0), ativo=True)), 200
+
+@app.route('/receptores/estado', methods=['GET'])
+def estado_receptores():
+    return jsonify(monitor_receptores.estado()), 200
+
+@app.route('/logs/estatisticas', methods=['GET'])
+def estatisticas_logs():
+    return jsonify(gravador_logs.estatisticas()), 200
+
+STATUS_RETENTAVEIS = ("Timeout", "Erro_Conexao", "Erro_HTTP")
+
+def enviar_alerta(evento):
+    with metrica_eventos_em_andamento.em_andamento(), metrica_fanout.medir():
+        try:
+            distribuir_alerta(evento)
+        finally:
+            gravar_linha_tempo(evento)
+
+
+def distribuir_alerta(evento):
+    evento.marcar("despacho")
+    salvar_logs_sitema(f"Enviando alerta do usuário {evento.nome_usuario} da sala {evento.nome_sala} - {evento.id_evento}")
+    
+    if roteamento_setores:
+        do_setor, globais, demais = cache_diretorio.destinos_setor(evento.setor_sala)
+    else:
+        do_setor, globais, demais = [receptor[0] for receptor in localizar_receptores()], [], []
     
-    lista_receptores = localizar_receptores()
-    print(f"Lista de receptores: {lista_receptores}")
+    if not demais:
+        metrica_roteamento.inc(resultado="todos")
+        entregar_onda(evento, do_setor + globais)
+        return
     
-    if not lista_receptores:
-        print("Nenhum receptor encontrado")
-        salvar_logs_sitema(f"Nenhum receptor encontrado")
+    # Primeiro os receptores do setor da sala e os globais
+    metrica_roteamento.inc(resultado="setor")
+    salvar_logs_sitema(f"Alerta roteado para {len(do_setor)} receptores do setor {evento.setor_sala} e {len(globais)} globais - {evento.id_evento}")
+    entregar_onda(evento, do_setor + globais, restrito=True)
+    if evento.entregues.intersection(do_setor):
         return
     
-    threads = []
+    # Ninguém do setor recebeu: o alerta não pode se perder, vai para os demais
+    metrica_roteamento.inc(resultado="escalonado")
+    salvar_logs_sitema(f"Nenhum receptor do setor {evento.setor_sala} recebeu o alerta; enviando para os outros {len(demais)} - {evento.id_evento}")
+    entregar_onda(evento, demais, restrito=True)
+
+
+def entregar_onda(evento, ips_receptores, restrito=False):
+    """
+    Entrega o alerta aos receptores indicados pelo WebSocket, pelo multicast
+    e, para os que faltarem, pelo HTTP. Com restrito=False o WebSocket e o
+    multicast alcançam também os receptores conectados sem cadastro.
+    """
+    if evento.entregues:
+        # Evento retomado de outro servidor ou segunda onda: só os que faltam
+        ips_receptores = [ip for ip in ips_receptores if ip not in evento.entregues]
+        restrito = True
+        if not ips_receptores:
+            return
+    
+    # Primeiro pelas conexões WebSocket já abertas; o HTTP fica para os demais
+    inicio = time.monotonic()
+    instantes = {}  # ip_receptor -> instante em que a confirmação chegou
+    status_websocket = canal_websocket.transmitir(evento.payload_receptor(), tempo_limite_ack_websocket,
+                                                  destinos=ips_receptores if restrito else None,
+                                                  instantes=instantes)
+    entregues = registrar_entregas(evento, status_websocket, ips_receptores)
+    for ip_receptor in entregues:
+        chegada = instantes.get(ip_receptor, time.monotonic())
+        metrica_latencia_entrega.observar(chegada - inicio, canal="websocket")
+        evento.marcar("ack_websocket", ip_receptor, "Enviado", monotonico=chegada)
+    if status_websocket:
+        salvar_logs_sitema(f"Alerta entregue pelo canal WebSocket a {len(entregues)} de {len(status_websocket)} receptores - {evento.id_evento}")
     
-    for receptor in lista_receptores:
-        ip_receptor = receptor[0]
-        thread = threading.Thread(
-            target=enviar_para_receptor, 
-            args=(ip_receptor, nome_usuario, nome_sala)
-        )
-        threads.append(thread)
-        thread.start()
-        salvar_logs_sitema(f"Thread iniciada para receptor: {ip_receptor} - {id_evento}")
+    faltando = [ip for ip in ips_receptores if ip not in entregues]
+    if emissor_multicast is not None and faltando:
+        payload = evento.payload_receptor()
+        if restrito and len(faltando) <= max_destinos_multicast:
+            # Receptores fora da lista ignoram o datagrama
+            payload["destinos"] = faltando
+        inicio = time.monotonic()
+        instantes = {}
+        try:
+            confirmados = emissor_multicast.transmitir(payload, tempo_limite_ack_multicast,
+                                                       esperados=faltando, instantes=instantes)
+        except OSError as e:
+            confirmados = set()
+            salvar_logs_sitema(f"Erro ao enviar alerta por multicast: {e} - {evento.id_evento}")
+        novos = registrar_entregas(evento, {ip: "Enviado" for ip in confirmados if ip not in entregues}, ips_receptores)
+        entregues |= novos
+        for ip_receptor in novos:
+            chegada = instantes.get(ip_receptor, time.monotonic())
+            metrica_latencia_entrega.observar(chegada - inicio, canal="multicast")
+            evento.marcar("ack_multicast", ip_receptor, "Enviado", monotonico=chegada)
+        salvar_logs_sitema(f"Alerta multicast confirmado por {len(novos)} receptores - {evento.id_evento}")
+    
+    ips_receptores = [ip for ip in ips_receptores if ip not in entregues]
+    if not ips_receptores:
+        if not entregues:
+            print("Nenhum receptor encontrado")
+            salvar_logs_sitema(f"Nenhum receptor encontrado - {evento.id_evento}")
+        return
+    
+    # Receptores que o monitor já sabe estarem fora do ar vão direto para as
+    # retentativas, sem ocupar a primeira onda até o timeout
+    inativos = []
+    if monitor_ativo:
+        ips_receptores, inativos = monitor_receptores.separar(ips_receptores)
+    for ip_receptor in inativos:
+        if not agendar_retentativa(ip_receptor, evento, 1, "Inativo"):
+            data_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            salvar_log_alertas(ip_receptor, evento.hostname, evento.nome_usuario, evento.nome_sala, data_hora, "Inativo", evento.id_evento)
+    if inativos:
+        salvar_logs_sitema(f"{len(inativos)} receptores inativos enviados para as retentativas - {evento.id_evento}")
+    if not ips_receptores:
+        return
+    
+    salvar_logs_sitema(f"Envio iniciado para {len(ips_receptores)} receptores - {evento.id_evento}")
     
     try:
-        for thread in threads:
-            thread.join(timeout=30)
-        salvar_logs_sitema(f"Envio massivo concluído para {len(lista_receptores)} receptores")
+        nao_atendidos = despachante.entregar(ips_receptores, enviar_para_receptor, evento)
+        for ip_receptor in nao_atendidos:
+            # Não chegaram a ser tentados dentro do prazo da primeira onda
+            if not agendar_retentativa(ip_receptor, evento, 1, "Timeout"):
+                data_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                salvar_log_alertas(ip_receptor, evento.hostname, evento.nome_usuario, evento.nome_sala, data_hora, "Timeout", evento.id_evento)
+        if nao_atendidos:
+            salvar_logs_sitema(f"Prazo da primeira onda esgotado antes de {len(nao_atendidos)} envios - {evento.id_evento}")
+        salvar_logs_sitema(f"Envio massivo concluído para {len(ips_receptores)} receptores - {evento.id_evento}")
     except Exception as e:
-        salvar_logs_sitema(f"Erro ao aguardar threads: {e}")
+        salvar_logs_sitema(f"Erro ao enviar alerta para os receptores: {e}")
     
 
 
-def enviar_para_receptor(ip_receptor, nome_usuario, nome_sala):
-    hostname_chamador = hostname
+def registrar_entregas(evento, status_por_receptor, ips_receptores):
+    """Grava os envios por WebSocket/multicast e retorna os receptores já atendidos"""
+    data_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    entregues = set()
+    for ip_receptor, status in status_por_receptor.items():
+        if status == "Enviado":
+            entregues.add(ip_receptor)
+            evento.entregues.add(ip_receptor)
+            salvar_log_alertas(ip_receptor, evento.hostname, evento.nome_usuario, evento.nome_sala, data_hora, status, evento.id_evento)
+        elif ip_receptor not in ips_receptores:
+            # Sem cadastro em receptores não há como tentar pelo HTTP
+            salvar_log_alertas(ip_receptor, evento.hostname, evento.nome_usuario, evento.nome_sala, data_hora, status, evento.id_evento)
+    registrar_entrega(evento, sorted(entregues))
+    return entregues
+
+
+def enviar_para_receptor(ip_receptor, prazo_final, evento, tentativa=1):
     data_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     status = "Erro"
     
     try:
         print(f"Enviando para receptor: {ip_receptor}")
         
-        response = requests.post(
-            f"http://{ip_receptor}:9090/alerta5656/enviar", 
-            json={"sala": nome_sala, "usuario": nome_usuario, "codigo": "alerta5656"},
-            timeout=4
+        inicio = time.perf_counter()
+        response = despachante.sessao(ip_receptor).post(
+            f"http://{ip_receptor}:{porta_receptor}/alerta5656/enviar", 
+            json=evento.payload_receptor(),
+            timeout=(tempo_restante(prazo_final, 2), tempo_restante(prazo_final, 4))
         )
         
         print(f"Resposta do receptor {ip_receptor}: {response.status_code}")
+        metrica_latencia_entrega.observar(time.perf_counter() - inicio, canal="http")
+        
+        # Qualquer resposta mostra que o receptor está no ar
+        monitor_receptores.registrar(ip_receptor, True)
         
         if response.status_code == 200:
             status = "Enviado"
+            evento.entregues.add(ip_receptor)
+            registrar_entrega(evento, [ip_receptor])
             print(f"✓ Alerta enviado com sucesso para o receptor {ip_receptor}")
             salvar_logs_sitema(f"Alerta enviado com sucesso para o receptor {ip_receptor}")
         else:
@@ -123,22 +512,91 @@ def enviar_para_receptor(ip_receptor, nome_usuario, nome_sala):
             print(f"✗ Erro ao enviar alerta para o receptor {ip_receptor} - Status: {response.status_code}")
             salvar_logs_sitema(f"Erro ao enviar alerta para o receptor {ip_receptor} - Status: {response.status_code}")
             
-    except requests.exceptions.ConnectTimeout:
+    except (requests.exceptions.ConnectTimeout, requests.exceptions.ReadTimeout):
         status = "Timeout"
         print(f"✗ Timeout ao enviar para receptor {ip_receptor}")
         salvar_logs_sitema(f"Timeout ao enviar para receptor {ip_receptor}")
+        despachante.descartar_sessao(ip_receptor)
+        monitor_receptores.registrar(ip_receptor, False, erro=status)
         
     except requests.exceptions.ConnectionError:
         status = "Erro_Conexao"
         print(f"✗ Erro de conexão com receptor {ip_receptor}")
         salvar_logs_sitema(f"Erro de conexão com receptor {ip_receptor}")
+        despachante.descartar_sessao(ip_receptor)
+        monitor_receptores.registrar(ip_receptor, False, erro=status)
         
     except Exception as e:
         status = "Erro_Geral"
         print(f"✗ Erro inesperado ao enviar para receptor {ip_receptor}: {e}")
         salvar_logs_sitema(f"Erro inesperado ao enviar para receptor {ip_receptor}: {e}")
     
-    salvar_log_alertas(ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, status, id_evento)
+    metrica_tentativas.inc(status=status)
+    evento.marcar("resposta", ip_receptor, status)
+    if tentativa > 1 or time.monotonic() >= prazo_final:
+        # Depois da primeira onda a linha do tempo já foi gravada; grava só esta etapa
+        gravar_linha_tempo(evento)
+    if tentativa > 1:
+        salvar_logs_sitema(f"Tentativa {tentativa} para receptor {ip_receptor}: {status} - {evento.id_evento}")
+    
+    if status in STATUS_RETENTAVEIS and agendar_retentativa(ip_receptor, evento, tentativa, status):
+        return status
+    
+    salvar_log_alertas(ip_receptor, evento.hostname, evento.nome_usuario, evento.nome_sala, data_hora, status, evento.id_evento)
+    return status
+
+
+def registrar_entrega(evento, ips_receptores):
+    """Anota os receptores atendidos para que quem retomar o evento (spool ou outro servidor) não reenvie a eles"""
+    if not ips_receptores:
+        return
+    if spool_eventos is not None:
+        try:
+            for ip_receptor in ips_receptores:
+                spool_eventos.registrar_entrega(evento.id_evento, ip_receptor)
+        except Exception as e:
+            print(f"Erro ao registrar entrega no spool: {e}")
+    if cluster_ativo and not coordenador_cluster.registrar_entregas(evento.id_evento, ips_receptores):
+        # Sem o banco agora: a entrega segue pela fila dos logs, que tenta de novo
+        for ip_receptor in ips_receptores:
+            gravador_logs.registrar("INSERT IGNORE INTO entregas_cluster (id_evento, ip_receptor) VALUES (%s, %s)",
+                                    (evento.id_evento, ip_receptor))
+
+
+def registrar_evento_spool(evento):
+    if spool_eventos is None:
+        return
+    try:
+        spool_eventos.registrar_evento(evento.para_dados())
+    except Exception as e:
+        # Sem o spool o alerta ainda é enviado; só não sobrevive a um reinício
+        print(f"Erro ao gravar o evento {evento.id_evento} no spool: {e}")
+
+
+def retomar_evento(dados, entregues):
+    """
+    Chamado quando este processo retoma um evento interrompido: de um nó do
+    cluster que parou de renovar o lease ou do spool local, após um reinício.
+    """
+    evento = EventoAlerta.de_dados(dados)
+    evento.entregues.update(entregues)
+    evento.marcar("retomado")
+    if cluster_ativo:
+        coordenador_cluster.acompanhar(evento.id_evento, evento.recebido_em + prazo_retentativas)
+    registrar_evento_spool(evento)
+    eventos_recentes.adicionar(evento)
+    salvar_logs_sitema(f"Evento {evento.id_evento} retomado; {len(entregues)} receptores já atendidos")
+    despachante.agendar_evento(enviar_alerta, evento)
+
+
+def agendar_retentativa(ip_receptor, evento, tentativa, status):
+    prazo_final = evento.recebido_em + prazo_retentativas
+    if despachante.agendar_retentativa(tentativa, prazo_final, enviar_para_receptor,
+                                       ip_receptor, prazo_final, evento, tentativa + 1):
+        return True
+    if tentativa > 1:
+        salvar_logs_sitema(f"Receptor {ip_receptor} não recebeu o alerta após {tentativa} tentativas: {status} - {evento.id_evento}")
+    return False
 
 
 
@@ -148,65 +606,336 @@ def conectar_banco_de_dados():
             host=database_host,
             user=database_user,
             password=database_password,
-            database='botao_panico'
+            database='botao_panico',
+            connection_timeout=tempo_conexao_banco
         )
         return conn
     except mysql.connector.Error as e:
         print(f"Erro ao conectar ao banco de dados: {e}")
         return None
 
+pool_banco = PoolConexoes(conectar_banco_de_dados, tamanho_maximo=tamanho_pool,
+                          tempo_vida_maximo=tempo_vida_conexao)
+spool_eventos = None
+if spool_ativo:
+    spool_eventos = SpoolLocal(arquivo_spool, pool_banco, retomar_evento, duracao_evento=prazo_retentativas,
+                               lease=lease_spool, idade_maxima=idade_maxima_cluster, sincrono=sincrono_spool,
+                               preparar=lambda: preparar_banco(),
+                               ao_replicar=lambda duracao, linhas, ok: metrica_banco.observar(duracao, funcao="replicar_spool"))
+gravador_logs = GravadorLogs(pool_banco, tamanho_fila=tamanho_fila_logs, spool=spool_eventos,
+                             ao_gravar=lambda duracao, linhas, ok: metrica_banco.observar(duracao, funcao="gravar_logs"))
+coordenador_cluster = CoordenadorCluster(pool_banco, retomar_evento, no_id=no_cluster, lease=lease_cluster,
+                                         idade_maxima=idade_maxima_cluster, preparar=lambda: preparar_banco())
+
+def encerrar_servicos():
+    # Ordem importa: termina os envios, grava os logs pendentes e fecha o pool
+    monitor_receptores.encerrar()
+    canal_websocket.encerrar()
+    if emissor_multicast is not None:
+        emissor_multicast.encerrar()
+    despachante.encerrar()
+    gravador_logs.encerrar()
+    if spool_eventos is not None:
+        # Última replicação e devolução dos eventos em andamento ao próximo processo
+        spool_eventos.encerrar()
+    # Depois de gravar as entregas: quem assumir os eventos pendentes reenvia só aos que faltam
+    coordenador_cluster.encerrar()
+    pool_banco.fechar_todas()
+
+atexit.register(encerrar_servicos)
+
 def salvar_log_alertas(ip_receptor, hostname_chamador, nome_usuario, nome_sala , data_hora, status, id_evento):
-    conn = conectar_banco_de_dados()
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO logs_alertas (ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, status, id_evento) VALUES (%s, %s, %s, %s, %s, %s, %s)", (ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, status, id_evento))
-        conn.commit()
-        cursor.close()
-        conn.close()
-
-
-def localizar_usuario(usuario):
-    conn = conectar_banco_de_dados()
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT nome_usuario FROM usuarios WHERE USERNAME = %s", (usuario,))
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return result[0]
-    else:
-        return None
+    metrica_entregas.inc(status=status)
+    sql = "INSERT INTO logs_alertas (ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, status, id_evento) VALUES (%s, %s, %s, %s, %s, %s, %s)"
+    parametros = (ip_receptor, hostname_chamador, nome_usuario, nome_sala, data_hora, status, id_evento)
+    if spool_eventos is not None:
+        # O resultado da entrega vai direto para o disco, sem esperar o lote do gravador
+        try:
+            spool_eventos.anexar_linhas([(sql, parametros)])
+            return
+        except Exception as e:
+            print(f"Erro ao gravar log de alerta no spool: {e}")
+    gravador_logs.registrar(sql, parametros)
 
-def localizar_sala(hostname):
-    conn = conectar_banco_de_dados()
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT nome_sala FROM salas WHERE hostname = %s", (hostname,))
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return result[0]
-    else:
-        return None
+
+_banco_preparado = False
+_lock_migracoes = threading.Lock()
+
+def preparar_banco():
+    """Aplica as migrações pendentes uma vez por processo, antes do primeiro uso do banco"""
+    global _banco_preparado
+    if _banco_preparado or not migracoes_automaticas:
+        return
+    with _lock_migracoes:
+        if _banco_preparado:
+            return
+        with pool_banco.conexao() as conn:
+            if not conn:
+                return  # tenta de novo no próximo acesso
+            try:
+                novas = aplicar_migracoes(conn, automatico=True)
+            except Exception as e:
+                print(f"Erro ao aplicar migrações do banco: {e}")
+                return
+        if novas:
+            salvar_logs_sitema(f"Migrações do banco aplicadas: {', '.join(map(str, novas))}")
+        _banco_preparado = True
+
+
+def preparar_banco_na_subida():
+    """Thread da subida: aplica as migrações fora do caminho dos alertas, tentando até o banco responder"""
+    espera = 1
+    while migracoes_automaticas and not _banco_preparado:
+        preparar_banco()
+        if _banco_preparado:
+            return
+        time.sleep(espera)
+        espera = min(30, espera * 2)
+
+
+def gravar_linha_tempo(evento, id_evento=None, etapas=None):
+    """Grava as etapas ainda pendentes do evento como uma linha compacta (JSON)"""
+    if evento is not None:
+        id_evento = evento.id_evento
+        etapas = evento.retirar_etapas()
+    if not etapas:
+        return
+    data_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    gravador_logs.registrar("INSERT INTO linha_tempo_eventos (id_evento, data_hora, etapas) VALUES (%s, %s, %s)",
+                            (id_evento, data_hora, json.dumps(etapas, separators=(",", ":"))))
+
+
+class CacheDiretorio:
+    """Cópia em memória de usuarios, salas e receptores com expiração por TTL"""
+
+    def __init__(self, ttl=300, intervalo_nova_tentativa=5, marcador=None):
+        self.ttl = ttl
+        self.intervalo_nova_tentativa = intervalo_nova_tentativa
+        # Arquivo tocado a cada invalidação, para que todos os workers recarreguem
+        self.marcador = marcador
+        self._marca_vista = self._ler_marca()
+        self._proxima_verificacao_marca = 0
+        self._lock = threading.Lock()
+        self._recarregando = threading.Lock()
+        self.usuarios = {}    # USERNAME -> nome_usuario
+        self.salas = {}       # hostname -> nome_sala
+        self.setores_salas = {}  # hostname -> setor
+        self.receptores = []  # [(ip_receptor, setor), ...]
+        self.roteador = RoteadorSetores([])
+        # Buscas que falharam no banco desde a última atualização, para não repetir a cada alerta
+        self.usuarios_ausentes = set()
+        self.salas_ausentes = set()
+        self.carregado = False
+        self.expira_em = 0
+        self.atualizado_em = None
+
+    def carregar(self):
+        """Lê as três tabelas usando uma única conexão do pool"""
+        with metrica_banco.medir(funcao="carregar_diretorio"), pool_banco.conexao() as conn:
+            if not conn:
+                raise ConnectionError("Banco de dados indisponível")
+            cursor = conn.cursor()
+            cursor.execute("SELECT USERNAME, nome_usuario FROM usuarios")
+            usuarios = {username: nome for username, nome in cursor.fetchall()}
+            cursor.execute("SELECT hostname, nome_sala, setor FROM salas")
+            salas = cursor.fetchall()
+            cursor.execute("SELECT ip_receptor, setor FROM receptores")
+            receptores = cursor.fetchall()
+            cursor.close()
+        return usuarios, salas, receptores
+
+    def atualizar(self):
+        try:
+            usuarios, salas, receptores = self.carregar()
+        except Exception as e:
+            # Mantém a cópia atual e tenta de novo em alguns segundos
+            print(f"Erro ao atualizar diretório, usando cópia em memória: {e}")
+            if not self.carregado:
+                self.carregar_do_spool()
+            with self._lock:
+                self.expira_em = time.monotonic() + self.intervalo_nova_tentativa
+            return False
+
+        # O índice de setores é montado fora do lock; a troca é atômica
+        roteador = RoteadorSetores(receptores, setores_globais, receptores_globais)
+        with self._lock:
+            self.usuarios = usuarios
+            self.salas = {hostname: nome for hostname, nome, _ in salas}
+            self.setores_salas = {hostname: setor for hostname, _, setor in salas}
+            self.receptores = receptores
+            self.roteador = roteador
+            self.usuarios_ausentes = set()
+            self.salas_ausentes = set()
+            self.carregado = True
+            self.expira_em = time.monotonic() + self.ttl
+            self.atualizado_em = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if spool_eventos is not None:
+            try:
+                spool_eventos.guardar_diretorio(usuarios, salas, receptores)
+            except Exception as e:
+                print(f"Erro ao guardar cópia do diretório no spool: {e}")
+        return True
+
+    def carregar_do_spool(self):
+        """Processo que sobe com o MySQL fora do ar: usa a última cópia guardada no spool"""
+        if spool_eventos is None:
+            return False
+        try:
+            copia = spool_eventos.ler_diretorio()
+        except Exception as e:
+            print(f"Erro ao ler cópia do diretório no spool: {e}")
+            return False
+        if copia is None:
+            return False
+        usuarios, salas, receptores, guardado_em = copia
+        roteador = RoteadorSetores(receptores, setores_globais, receptores_globais)
+        with self._lock:
+            self.usuarios = usuarios
+            self.salas = {hostname: nome for hostname, nome, _ in salas}
+            self.setores_salas = {hostname: setor for hostname, _, setor in salas}
+            self.receptores = receptores
+            self.roteador = roteador
+            self.carregado = True
+            self.atualizado_em = datetime.fromtimestamp(guardado_em / 1000).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"Diretório carregado da cópia do spool de {self.atualizado_em}")
+        return True
+
+    def _ler_marca(self):
+        try:
+            return os.stat(self.marcador).st_mtime if self.marcador else 0
+        except OSError:
+            return 0
+
+    def _verificar_marcador(self):
+        agora = time.monotonic()
+        if not self.marcador or agora < self._proxima_verificacao_marca:
+            return
+        self._proxima_verificacao_marca = agora + 1
+        marca = self._ler_marca()
+        if marca != self._marca_vista:
+            self._marca_vista = marca
+            self.expira_em = 0
+
+    def garantir_atualizado(self):
+        self._verificar_marcador()
+        if time.monotonic() < self.expira_em:
+            return
+        # Apenas uma thread recarrega; as demais seguem com a cópia atual
+        if self._recarregando.acquire(blocking=not self.carregado):
+            try:
+                if time.monotonic() >= self.expira_em:
+                    self.atualizar()
+            finally:
+                self._recarregando.release()
+
+    def invalidar(self):
+        with self._lock:
+            self.expira_em = 0
+        if self.marcador:
+            try:
+                with open(self.marcador, 'a'):
+                    os.utime(self.marcador)
+                self._marca_vista = self._ler_marca()
+            except OSError as e:
+                print(f"Erro ao atualizar marcador do diretório: {e}")
+
+    def usuario(self, username):
+        self.garantir_atualizado()
+        return self.usuarios.get(username)
+
+    def sala(self, hostname):
+        self.garantir_atualizado()
+        return self.salas.get(hostname)
+
+    def setor_sala(self, hostname):
+        self.garantir_atualizado()
+        return self.setores_salas.get(hostname)
+
+    def contexto(self, username, hostname):
+        """
+        (nome_usuario, nome_sala, setor_sala) de um alerta. O que não está no
+        cache é buscado numa única ida ao banco (resolvedor_contexto) e
+        guardado até a próxima atualização; None para o que não existe.
+        """
+        self.garantir_atualizado()
+        with self._lock:
+            nome_usuario = self.usuarios.get(username)
+            nome_sala = self.salas.get(hostname)
+            setor_sala = self.setores_salas.get(hostname)
+            falta_usuario = nome_usuario is None and username not in self.usuarios_ausentes
+            falta_sala = nome_sala is None and hostname not in self.salas_ausentes
+            carregado = self.carregado
+        if not (falta_usuario or falta_sala):
+            return nome_usuario, nome_sala, setor_sala
+
+        with metrica_banco.medir(funcao="resolver_contexto"):
+            # Sem cache nenhum, a mesma consulta já traz os receptores para o envio
+            contexto = resolvedor_contexto.resolver(username, hostname, incluir_receptores=not carregado)
+        if contexto is None:
+            return nome_usuario, nome_sala, setor_sala
+
+        roteador = None
+        if not carregado and contexto.receptores:
+            roteador = RoteadorSetores(contexto.receptores, setores_globais, receptores_globais)
+        with self._lock:
+            if falta_usuario:
+                if contexto.nome_usuario is None:
+                    self.usuarios_ausentes.add(username)
+                else:
+                    self.usuarios[username] = nome_usuario = contexto.nome_usuario
+            if falta_sala:
+                if contexto.nome_sala is None:
+                    self.salas_ausentes.add(hostname)
+                else:
+                    self.salas[hostname] = nome_sala = contexto.nome_sala
+                    self.setores_salas[hostname] = setor_sala = contexto.setor_sala
+            if roteador is not None and not self.carregado:
+                self.receptores = contexto.receptores
+                self.roteador = roteador
+        return nome_usuario, nome_sala, setor_sala
+
+    def lista_receptores(self):
+        self.garantir_atualizado()
+        return list(self.receptores)
+
+    def destinos_setor(self, setor_sala):
+        """(do_setor, globais, demais) do alerta de uma sala do setor informado"""
+        self.garantir_atualizado()
+        return self.roteador.destinos(setor_sala)
+
+    def estado(self):
+        with self._lock:
+            return {
+                "carregado": self.carregado,
+                "atualizado_em": self.atualizado_em,
+                "usuarios": len(self.usuarios),
+                "salas": len(self.salas),
+                "receptores": len(self.receptores),
+                "roteamento": self.roteador.estado(),
+            }
+
+cache_diretorio = CacheDiretorio(ttl=ttl_diretorio, marcador=marcador_diretorio)
+resolvedor_contexto = ResolvedorContexto(pool_banco)
+
+def localizar_contexto(usuario, hostname):
+    return cache_diretorio.contexto(usuario, hostname)
 
 def localizar_receptores():
-    conn = conectar_banco_de_dados()
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT ip_receptor FROM RECEPTORES")
-        result = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return result
+    return cache_diretorio.lista_receptores()
 
 def salvar_logs_sitema(log):
-    conn = conectar_banco_de_dados()
     data_hora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    if conn:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO logs_sitema (log, data_hora) VALUES (%s, %s)", (log, data_hora))
-        conn.commit()
-        cursor.close()
+    gravador_logs.registrar("INSERT INTO logs_sitema (log, data_hora) VALUES (%s, %s)", (log, data_hora))
+
+threading.Thread(target=preparar_banco_na_subida, name="migracoes", daemon=True).start()
+if monitor_ativo:
+    monitor_receptores.iniciar()
+if cluster_ativo:
+    coordenador_cluster.iniciar()
+if spool_eventos is not None:
+    # Retoma os eventos que um processo anterior deixou em andamento
+    spool_eventos.iniciar()
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=9600)
\ No newline at end of file
+    # Servidor de desenvolvimento; em produção use: python servir.py servidor
+    app.run(host='0.0.0.0', port=9600, threaded=True)
\ No newline at end of file
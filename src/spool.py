@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Spool local e durável do servidor de alertas.
+
+Um arquivo SQLite em modo WAL, no disco do próprio servidor, guarda:
+
+  - eventos: cada alerta aceito, antes da resposta ao botão. O processo que
+    o aceitou renova um lease enquanto o envio e as retentativas estão em
+    andamento; se o processo morrer (ou o servidor reiniciar), outro processo
+    assume o evento quando o lease vence e reenvia aos receptores que ainda
+    não constam em entregas;
+  - entregas: receptores que já confirmaram cada evento;
+  - linhas: as linhas de log (logs_sitema, logs_alertas, ...) na ordem em que
+    foram geradas. Um replicador as grava no MySQL quando ele está acessível
+    e só então as apaga do spool;
+  - linhas_recusadas: linhas que o MySQL recusou pelo conteúdo (dado
+    inválido, chave duplicada), guardadas para análise em vez de travar a
+    replicação das seguintes.
+
+Também guarda a última cópia do diretório (usuários, salas e receptores),
+usada quando o servidor reinicia com o MySQL fora do ar.
+
+Assim uma queda do MySQL não atrasa nem perde alertas, e um reinício do
+servidor retoma os eventos que estavam em andamento. Todos os workers do
+servidor usam o mesmo arquivo; apenas um deles replica de cada vez.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from gravador_logs import gravar_linhas
+
+ESQUEMA = """
+create table if not exists eventos (
+    id_evento text primary key,
+    dados text not null,
+    dono text not null,
+    lease_expira integer not null,
+    prazo integer not null,
+    estado text not null,
+    criado_em integer not null
+);
+create index if not exists idx_eventos_lease on eventos (estado, lease_expira);
+create table if not exists entregas (
+    id_evento text not null,
+    ip_receptor text not null,
+    primary key (id_evento, ip_receptor)
+);
+create table if not exists linhas (
+    id integer primary key autoincrement,
+    sql text not null,
+    parametros text not null
+);
+create table if not exists linhas_recusadas (
+    id integer primary key autoincrement,
+    sql text not null,
+    parametros text not null,
+    erro text not null,
+    recusada_em integer not null
+);
+create table if not exists diretorio (
+    id integer primary key check (id = 1),
+    dados text not null,
+    atualizado_em integer not null
+);
+create table if not exists replicador (
+    id integer primary key check (id = 1),
+    dono text not null,
+    lease_expira integer not null
+);
+"""
+
+
+def agora_ms():
+    return int(time.time() * 1000)
+
+
+class SpoolLocal:
+    """Eventos, entregas e linhas de log num SQLite local, replicados para o MySQL"""
+
+    def __init__(self, caminho, pool, ao_retomar, duracao_evento=120, lease=5, idade_maxima=600,
+                 tamanho_lote=500, sincrono="NORMAL", preparar=None, ao_replicar=None):
+        self.caminho = caminho
+        self.pool = pool  # pool do MySQL, destino da replicação
+        self.ao_retomar = ao_retomar  # função(dados, entregues)
+        self.duracao_evento = duracao_evento  # segundos de envio + retentativas de um evento
+        self.lease = lease
+        self.intervalo = max(0.2, lease / 3)
+        self.idade_maxima = idade_maxima
+        self.tamanho_lote = tamanho_lote
+        # NORMAL sobrevive a quedas do processo; FULL também a quedas de energia, com um fsync por gravação
+        self.sincrono = sincrono
+        self.preparar = preparar
+        self.ao_replicar = ao_replicar  # função(duracao, linhas, ok), para métricas
+
+        self._lock = threading.Lock()
+        self._lock_dono = threading.Lock()
+        self._dono = None
+        self._pid_dono = None
+        self._conexao = None
+        self._pid = None
+        self._lock_leitura = threading.Lock()
+        self._leitura = None
+        self._pid_leitura = None
+        self._contagens = None
+        self._contagens_em = 0
+        self._thread = None
+        self._thread_replicacao = None
+        self._parar = threading.Event()
+        self._replicando = False
+        self._espera_replicacao = 0
+        self._proxima_limpeza = 0
+
+        self.eventos_registrados = 0
+        self.eventos_retomados = 0
+        self.linhas_replicadas = 0
+        self.linhas_recusadas = 0
+        self.falhas_replicacao = 0
+
+    @property
+    def dono(self):
+        # Um id novo por processo (e após fork): o pid se repete entre
+        # reinícios, e o processo novo herdaria os leases do que morreu
+        with self._lock_dono:
+            if self._pid_dono != os.getpid():
+                self._dono = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+                self._pid_dono = os.getpid()
+            return self._dono
+
+    def _abrir(self):
+        # Chamado com self._lock; uma conexão por processo, reaberta após fork
+        if self._conexao is not None and self._pid == os.getpid():
+            return self._conexao
+        pasta = os.path.dirname(os.path.abspath(self.caminho))
+        os.makedirs(pasta, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False, isolation_level=None)
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute(f"PRAGMA synchronous={self.sincrono}")
+        conexao.executescript(ESQUEMA)
+        self._conexao = conexao
+        self._pid = os.getpid()
+        return conexao
+
+    def _executar_sql(self, sql, parametros=()):
+        with self._lock:
+            return self._abrir().execute(sql, parametros).fetchall()
+
+    # Gravação (caminho do alerta) -------------------------------------------
+
+    def registrar_evento(self, dados):
+        """Grava o evento aceito como deste processo; ignora se ele já está no spool"""
+        self.iniciar()
+        agora = agora_ms()
+        self._executar_sql(
+            "INSERT OR IGNORE INTO eventos (id_evento, dados, dono, lease_expira, prazo, estado, criado_em) "
+            "VALUES (?, ?, ?, ?, ?, 'em_andamento', ?)",
+            (dados["id_evento"], json.dumps(dados), self.dono, agora + int(self.lease * 1000),
+             agora + int(self.duracao_evento * 1000), agora))
+        with self._lock:
+            self.eventos_registrados += 1
+
+    def registrar_entrega(self, id_evento, ip_receptor):
+        self._executar_sql("INSERT OR IGNORE INTO entregas (id_evento, ip_receptor) VALUES (?, ?)",
+                           (id_evento, ip_receptor))
+
+    def conhece_evento(self, id_evento):
+        """O evento foi aceito por algum worker desta máquina nas últimas 24 h?"""
+        return bool(self._executar_sql("SELECT 1 FROM eventos WHERE id_evento = ?", (id_evento,)))
+
+    def anexar_linhas(self, linhas):
+        """Anexa [(sql, parametros), ...] numa única transação"""
+        self.iniciar()
+        registros = [(sql, json.dumps(list(parametros), default=str)) for sql, parametros in linhas]
+        with self._lock:
+            conexao = self._abrir()
+            conexao.execute("BEGIN")
+            try:
+                conexao.executemany("INSERT INTO linhas (sql, parametros) VALUES (?, ?)", registros)
+                conexao.execute("COMMIT")
+            except Exception:
+                conexao.execute("ROLLBACK")
+                raise
+
+    def guardar_diretorio(self, usuarios, salas, receptores):
+        dados = json.dumps({"usuarios": usuarios, "salas": [list(sala) for sala in salas],
+                            "receptores": [list(receptor) for receptor in receptores]})
+        self._executar_sql("INSERT OR REPLACE INTO diretorio (id, dados, atualizado_em) VALUES (1, ?, ?)",
+                           (dados, agora_ms()))
+
+    def ler_diretorio(self):
+        """(usuarios, salas, receptores, atualizado_em) da última cópia guardada, ou None"""
+        linhas = self._executar_sql("SELECT dados, atualizado_em FROM diretorio WHERE id = 1")
+        if not linhas:
+            return None
+        linha = linhas[0]
+        dados = json.loads(linha[0])
+        return (dados["usuarios"], [tuple(sala) for sala in dados["salas"]],
+                [tuple(receptor) for receptor in dados["receptores"]], linha[1])
+
+    # Manutenção em segundo plano --------------------------------------------
+
+    def iniciar(self):
+        # Reinicia as threads quando o processo foi criado por fork (workers)
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._abrir()
+            self._parar = threading.Event()
+            self._thread = threading.Thread(target=self._executar, name="spool", daemon=True)
+            self._thread.start()
+            # A replicação tem thread própria: um MySQL lento ou uma fila longa
+            # não pode atrasar a renovação dos leases dos eventos
+            self._thread_replicacao = threading.Thread(target=self._executar_replicacao,
+                                                       name="spool-replicacao", daemon=True)
+            self._thread_replicacao.start()
+
+    def _executar(self):
+        parar = self._parar
+        while not parar.is_set():
+            try:
+                self.manter_eventos()
+                if self._replicando:
+                    # Mantém o lease de replicador durante um lote demorado
+                    self._assumir_replicacao()
+                self._limpar()
+            except Exception as e:
+                print(f"Erro na manutenção do spool de eventos: {e}")
+            parar.wait(self.intervalo)
+
+    def _executar_replicacao(self):
+        parar = self._parar
+        while not parar.is_set():
+            if time.monotonic() >= self._espera_replicacao:
+                self._replicar_tudo(parar)
+            parar.wait(self.intervalo)
+
+    def manter_eventos(self):
+        """Renova os leases deste processo, conclui os eventos no fim do prazo e retoma os órfãos"""
+        agora = agora_ms()
+        dono = self.dono
+        with self._lock:
+            conexao = self._abrir()
+            conexao.execute("UPDATE eventos SET estado = 'concluido' "
+                            "WHERE dono = ? AND estado = 'em_andamento' AND prazo <= ?", (dono, agora))
+            conexao.execute("UPDATE eventos SET lease_expira = ? WHERE dono = ? AND estado = 'em_andamento'",
+                            (agora + int(self.lease * 1000), dono))
+            orfaos = conexao.execute(
+                "SELECT id_evento, dados, criado_em FROM eventos "
+                "WHERE estado = 'em_andamento' AND lease_expira < ? ORDER BY criado_em LIMIT 20",
+                (agora,)).fetchall()
+
+            retomados = []
+            for id_evento, dados, criado_em in orfaos:
+                if agora - criado_em > self.idade_maxima * 1000:
+                    conexao.execute("UPDATE eventos SET estado = 'abandonado' WHERE id_evento = ?", (id_evento,))
+                    print(f"Spool: evento {id_evento} abandonado, sem dono há mais de {self.idade_maxima}s")
+                    continue
+                # Só um processo consegue trocar o dono enquanto o lease está vencido
+                cursor = conexao.execute(
+                    "UPDATE eventos SET dono = ?, lease_expira = ?, prazo = ? "
+                    "WHERE id_evento = ? AND estado = 'em_andamento' AND lease_expira < ?",
+                    (dono, agora + int(self.lease * 1000), agora + int(self.duracao_evento * 1000),
+                     id_evento, agora))
+                if cursor.rowcount != 1:
+                    continue
+                entregues = {linha[0] for linha in conexao.execute(
+                    "SELECT ip_receptor FROM entregas WHERE id_evento = ?", (id_evento,))}
+                retomados.append((json.loads(dados), entregues))
+                self.eventos_retomados += 1
+
+        for dados, entregues in retomados:
+            print(f"Spool: retomando o evento {dados['id_evento']} ({len(entregues)} receptores já atendidos)")
+            try:
+                self.ao_retomar(dados, entregues)
+            except Exception as e:
+                print(f"Erro ao retomar o evento {dados['id_evento']} do spool: {e}")
+        return len(retomados)
+
+    def _limpar(self):
+        agora = time.monotonic()
+        if agora < self._proxima_limpeza:
+            return
+        self._proxima_limpeza = agora + 600
+        limite = agora_ms() - 86400 * 1000
+        with self._lock:
+            conexao = self._abrir()
+            conexao.execute("DELETE FROM entregas WHERE id_evento IN "
+                            "(SELECT id_evento FROM eventos WHERE estado <> 'em_andamento' AND criado_em < ?)",
+                            (limite,))
+            conexao.execute("DELETE FROM eventos WHERE estado <> 'em_andamento' AND criado_em < ?", (limite,))
+            conexao.execute("DELETE FROM linhas_recusadas WHERE recusada_em < ?", (agora_ms() - 30 * 86400 * 1000,))
+
+    def _assumir_replicacao(self):
+        """Lease de replicador na própria base do spool: só um processo grava no MySQL por vez"""
+        agora = agora_ms()
+        expira = agora + int(max(self.lease, 5) * 1000)
+        with self._lock:
+            conexao = self._abrir()
+            conexao.execute("INSERT OR IGNORE INTO replicador (id, dono, lease_expira) VALUES (1, ?, 0)",
+                            (self.dono,))
+            cursor = conexao.execute("UPDATE replicador SET dono = ?, lease_expira = ? "
+                                     "WHERE id = 1 AND (dono = ? OR lease_expira < ?)",
+                                     (self.dono, expira, self.dono, agora))
+            return cursor.rowcount == 1
+
+    def replicar(self):
+        """
+        Grava um lote de linhas no MySQL e o apaga do spool; retorna o número
+        de linhas. As que o MySQL recusar pelo conteúdo vão para
+        linhas_recusadas, para não bloquear o resto da fila.
+        """
+        with self._lock:
+            lote = self._abrir().execute("SELECT id, sql, parametros FROM linhas ORDER BY id LIMIT ?",
+                                         (self.tamanho_lote,)).fetchall()
+        if not lote:
+            return 0
+
+        inicio = time.perf_counter()
+        try:
+            recusadas = gravar_linhas(self.pool, [(sql, tuple(json.loads(parametros))) for _, sql, parametros in lote])
+        except Exception:
+            self._notificar(time.perf_counter() - inicio, len(lote), False)
+            raise
+        self._notificar(time.perf_counter() - inicio, len(lote), True)
+
+        agora = agora_ms()
+        with self._lock:
+            conexao = self._abrir()
+            conexao.execute("BEGIN")
+            try:
+                conexao.executemany(
+                    "INSERT INTO linhas_recusadas (sql, parametros, erro, recusada_em) VALUES (?, ?, ?, ?)",
+                    [(sql, json.dumps(list(parametros), default=str), str(erro), agora)
+                     for sql, parametros, erro in recusadas])
+                conexao.execute("DELETE FROM linhas WHERE id <= ?", (lote[-1][0],))
+                conexao.execute("COMMIT")
+            except Exception:
+                conexao.execute("ROLLBACK")
+                raise
+            self.linhas_replicadas += len(lote) - len(recusadas)
+            self.linhas_recusadas += len(recusadas)
+        for sql, parametros, erro in recusadas:
+            print(f"Spool: linha recusada pelo MySQL, guardada em linhas_recusadas: {erro} - {sql} {parametros}")
+        return len(lote)
+
+    def _replicar_tudo(self, parar):
+        try:
+            if not self._assumir_replicacao():
+                return
+            self._replicando = True
+            if self.preparar is not None:
+                self.preparar()
+            while not parar.is_set() and self.replicar() >= self.tamanho_lote:
+                self._assumir_replicacao()
+            self._espera_replicacao = 0
+        except Exception as e:
+            with self._lock:
+                self.falhas_replicacao += 1
+                falhas = self.falhas_replicacao
+            # Espera crescente enquanto o MySQL estiver fora, até 30 s
+            self._espera_replicacao = time.monotonic() + min(30, 2 ** min(falhas, 5))
+            print(f"Spool: MySQL indisponível, linhas mantidas no disco: {e}")
+        finally:
+            self._replicando = False
+
+    def _notificar(self, duracao, linhas, ok):
+        if self.ao_replicar is not None:
+            try:
+                self.ao_replicar(duracao, linhas, ok)
+            except Exception as e:
+                print(f"Erro ao registrar replicação do spool: {e}")
+
+    def encerrar(self, tempo_limite=5):
+        """
+        Para as threads, tenta uma última replicação e devolve os leases dos
+        eventos em andamento para que o próximo processo os retome sem esperar.
+        """
+        self._parar.set()
+        with self._lock:
+            threads = [self._thread, self._thread_replicacao] if self._pid == os.getpid() else []
+        for thread in threads:
+            if thread is not None:
+                thread.join(tempo_limite)
+        try:
+            if self._assumir_replicacao():
+                fim = time.monotonic() + tempo_limite
+                while time.monotonic() < fim and self.replicar() >= self.tamanho_lote:
+                    pass
+                self._executar_sql("UPDATE replicador SET lease_expira = 0 WHERE id = 1 AND dono = ?", (self.dono,))
+        except Exception as e:
+            print(f"Spool: linhas pendentes ficam para o próximo início: {e}")
+        try:
+            self._executar_sql("UPDATE eventos SET lease_expira = 0 WHERE dono = ? AND estado = 'em_andamento'",
+                               (self.dono,))
+        except Exception as e:
+            print(f"Erro ao liberar os eventos do spool: {e}")
+
+    def _contar(self, idade_maxima):
+        """
+        (linhas pendentes, eventos em andamento, linhas recusadas), reaproveitando
+        a contagem com até idade_maxima segundos. Usa uma conexão só de leitura, fora do
+        self._lock: no modo WAL a leitura não espera as gravações do alerta.
+        As filas só perdem linhas do início (ids crescentes), então o
+        tamanho sai de MIN/MAX pelo índice da chave, sem varrer a tabela.
+        """
+        with self._lock_leitura:
+            if self._contagens is not None and time.monotonic() - self._contagens_em < idade_maxima:
+                return self._contagens
+            if self._leitura is None or self._pid_leitura != os.getpid():
+                with self._lock:
+                    self._abrir()  # cria o esquema, se preciso
+                self._leitura = sqlite3.connect(self.caminho, timeout=30, check_same_thread=False,
+                                                isolation_level=None)
+                self._pid_leitura = os.getpid()
+            conexao = self._leitura
+            linhas = conexao.execute("SELECT COALESCE(MAX(id) - MIN(id) + 1, 0) FROM linhas").fetchone()[0]
+            eventos = conexao.execute("SELECT COUNT(*) FROM eventos WHERE estado = 'em_andamento'").fetchone()[0]
+            recusadas = conexao.execute(
+                "SELECT COALESCE(MAX(id) - MIN(id) + 1, 0) FROM linhas_recusadas").fetchone()[0]
+            self._contagens = (linhas, eventos, recusadas)
+            self._contagens_em = time.monotonic()
+            return self._contagens
+
+    def estatisticas(self, idade_maxima=1):
+        # As métricas leem vários campos por coleta; /spool/estado pede idade_maxima=0
+        linhas, eventos, recusadas = self._contar(idade_maxima)
+        with self._lock:
+            return {
+                "arquivo": self.caminho,
+                "linhas_pendentes": linhas,
+                "eventos_em_andamento": eventos,
+                "eventos_registrados": self.eventos_registrados,
+                "eventos_retomados": self.eventos_retomados,
+                "linhas_replicadas": self.linhas_replicadas,
+                "linhas_recusadas": recusadas,
+                "falhas_replicacao": self.falhas_replicacao,
+            }
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Tela de alerta do receptor_app num processo de exibição já aquecido.
+
+O processo é criado junto com o aplicativo: importa tkinter, inicia o
+mixer com o som do alerta já carregado (audio_alerta), cria uma raiz Tk
+escondida e fica esperando alertas por um Pipe. Cada alerta abre uma janela
+TelaAlerta em tela cheia sem o custo de subir um interpretador novo. A
+janela avisa o servidor quando aparece ("exibido") e quando o operador
+pressiona FECHAR ("reconhecido"). Se o processo cair, TrabalhadorTela o
+recria e reenvia os alertas que ainda não tinham sido exibidos.
+
+Também pode ser executado sozinho para mostrar um único alerta:
+
+    python src/tela_alerta.py "SALA 1" "Usuario" [id_evento]
+"""
+
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import tkinter as tk
+import tkinter.font as tkfont
+
+from audio_alerta import motor_audio
+
+INTERVALO_VERIFICACAO_MS = 15  # espera máxima entre a chegada do alerta no Pipe e a abertura da janela
+
+
+class TelaAlerta:
+    def __init__(self, master, sala, usuario, ao_reconhecer=None):
+        self.master = master
+        self.ao_reconhecer = ao_reconhecer
+        self.som_tocando = True
+
+        self.master.title("ALERTA - BOTÃO DE PÂNICO")
+        self.master.attributes('-fullscreen', True)
+        self.master.protocol("WM_DELETE_WINDOW", self.nao_fechar)
+        self.master.attributes('-topmost', True)
+        self.master.focus_force()
+        self.master.bind("<FocusOut>", self.manter_foco)
+        self.master.configure(bg="#B22222")
+
+        # Configurar fontes
+        try:
+            botao_fonte = tkfont.Font(family="Arial", size=28, weight="bold")
+            icone_fonte = tkfont.Font(family="Arial", size=120, weight="bold")
+            texto_fonte = tkfont.Font(family="Arial", size=48, weight="bold")
+            local_fonte = tkfont.Font(family="Helvetica", size=45, weight="bold")
+        except:
+            botao_fonte = ("Arial", 28, "bold")
+            icone_fonte = ("Arial", 120, "bold")
+            texto_fonte = ("Arial", 48, "bold")
+            local_fonte = ("Helvetica", 45, "bold")
+
+        self.frame = tk.Frame(self.master, bg="#B22222")
+        self.frame.pack(expand=True, fill="both")
+
+        self.icone_alerta = tk.Label(self.frame, text="⚠", font=icone_fonte, fg="#FFD700", bg="#B22222")
+        self.icone_alerta.pack(pady=(50, 20))
+
+        self.texto_aviso = tk.Label(self.frame, text="ATENÇÃO!\n\nCÓDIGO VIOLETA!\n\n",
+                                    font=texto_fonte, fg="white", bg="#B22222", justify="center")
+        self.texto_aviso.pack(pady=(0, 10))
+
+        self.texto_sala = tk.Label(self.frame, text=f"LOCAL: {sala.upper()}",
+                                   font=local_fonte, fg="#000000", bg="#B22222")
+        self.texto_sala.pack(pady=(0, 30))
+
+        self.nome_usuario_label = tk.Label(self.frame, text=f"USUÁRIO: {usuario.upper()}",
+                                           font=local_fonte, fg="white", bg="#B22222")
+        self.nome_usuario_label.pack(pady=(0, 5))
+
+        botao_frame = tk.Frame(self.frame, bg="#B22222")
+        botao_frame.pack(side="bottom", pady=(0, 50))
+
+        self.botao = tk.Button(botao_frame, text="AGUARDE...", font=botao_fonte,
+                               bg="#666666", fg="white", activebackground="#666666",
+                               activeforeground="white", relief=tk.FLAT,
+                               command=self.tentar_fechar, padx=30, pady=15,
+                               state="disabled")
+        self.botao.pack()
+
+        self.label = tk.Label(self.frame, text="",
+                             font=("Arial", 18), bg="#B22222", fg="white")
+        self.label.pack(pady=30)
+
+        self.piscar_contador = 0
+        self.piscar()
+
+        # Som já carregado em memória: começa junto com a janela. Sem som
+        # (pygame ausente, mixer ou arquivo com erro) o FECHAR espera 10 s
+        _, duracao = motor_audio.tocar()
+        self.master.after(int(duracao * 1000) if duracao > 0 else 10000, self.habilitar_botao_fechar)
+
+    def piscar(self):
+        if self.piscar_contador < 8:
+            cor_atual = self.frame.cget("background")
+            nova_cor = "#CD5C5C" if cor_atual == "#B22222" else "#B22222"
+            self.frame.configure(background=nova_cor)
+            self.icone_alerta.configure(bg=nova_cor)
+            self.texto_aviso.configure(bg=nova_cor)
+            self.texto_sala.configure(bg=nova_cor)
+            self.nome_usuario_label.configure(bg=nova_cor)
+            self.label.configure(bg=nova_cor)
+            self.piscar_contador += 1
+            self.master.after(500, self.piscar)
+
+    def habilitar_botao_fechar(self):
+        self.som_tocando = False
+        self.botao.config(text="FECHAR", bg="#c2c2c2", state="normal")
+        self.label.config(text="")
+
+    def tentar_fechar(self):
+        if not self.som_tocando:
+            self.fechar_aplicacao()
+
+    def fechar_aplicacao(self):
+        self.label.config(text="Fechando...")
+        if self.ao_reconhecer is not None:
+            self.ao_reconhecer()
+            self.ao_reconhecer = None
+        self.master.after(100, self.master.destroy)
+
+    def nao_fechar(self):
+        if not self.som_tocando:
+            self.fechar_aplicacao()
+
+    def manter_foco(self, event):
+        self.master.focus_force()
+
+
+def confirmar_etapa(url_servidor, id_evento, etapa):
+    # Avisa o servidor que a tela apareceu ou foi reconhecida (linha do tempo do evento)
+    if not url_servidor or not id_evento:
+        return
+    def enviar():
+        try:
+            url = f"{url_servidor}/alerta5656/eventos/{urllib.parse.quote(id_evento)}/confirmacao"
+            corpo = json.dumps({"codigo": "alerta5656", "etapa": etapa}).encode()
+            requisicao = urllib.request.Request(url, data=corpo, headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(requisicao, timeout=3).close()
+        except Exception:
+            pass
+    threading.Thread(target=enviar, daemon=True).start()
+
+
+def abrir_janela(root, sala, usuario, id_evento=None, url_servidor=None, ao_exibir=None):
+    janela = tk.Toplevel(root)
+    TelaAlerta(janela, sala, usuario, ao_reconhecer=lambda: confirmar_etapa(url_servidor, id_evento, "reconhecido"))
+    # Roda assim que a janela for desenhada
+    janela.after_idle(confirmar_etapa, url_servidor, id_evento, "exibido")
+    if ao_exibir is not None:
+        janela.after_idle(ao_exibir)
+    return janela
+
+
+def executar_trabalhador(conexao, url_servidor):
+    """Processo de exibição: raiz Tk escondida esperando alertas pelo Pipe"""
+    motor_audio.iniciar()
+    root = tk.Tk()
+    root.withdraw()
+    conexao.send(("pronto", os.getpid()))
+
+    def exibido(chave):
+        try:
+            conexao.send(("exibido", chave))
+        except OSError:
+            pass
+
+    def verificar():
+        try:
+            while conexao.poll():
+                alerta = conexao.recv()
+                if alerta is None:
+                    root.destroy()
+                    return
+                try:
+                    abrir_janela(root, alerta["sala"], alerta["usuario"], alerta.get("id_evento"), url_servidor,
+                                 ao_exibir=lambda chave=alerta.get("chave"): exibido(chave))
+                except Exception as e:
+                    print(f"Erro ao abrir tela de alerta: {e}")
+        except (EOFError, OSError):
+            # O aplicativo fechou o Pipe: encerra junto
+            root.destroy()
+            return
+        root.after(INTERVALO_VERIFICACAO_MS, verificar)
+
+    root.after(0, verificar)
+    root.mainloop()
+
+
+class TrabalhadorTela:
+    """Mantém o processo de exibição vivo e entrega os alertas a ele"""
+
+    def __init__(self, url_servidor=None, ao_registrar=print, espera_reinicio=1, max_reenvios=2):
+        self.url_servidor = url_servidor
+        self.ao_registrar = ao_registrar  # função(mensagem), log do aplicativo
+        self.espera_reinicio = espera_reinicio
+        self.max_reenvios = max_reenvios  # um alerta que derruba o processo não pode travar os seguintes
+        self._contexto = multiprocessing.get_context("spawn")  # Tk não sobrevive a fork
+        self._lock = threading.Lock()
+        self._processo = None
+        self._conexao = None
+        self._pendentes = {}  # chave -> alerta enviado e ainda não exibido
+        self._reenvios = {}  # chave -> vezes que o alerta foi reenviado após uma queda
+        self._sequencia = 0
+        self._encerrando = False
+        self._ultimo_inicio = 0
+        self.pronto = threading.Event()
+        self.reinicios = 0
+
+    def iniciar(self):
+        with self._lock:
+            self._subir()
+
+    def _subir(self):
+        # Chamado com self._lock
+        self.pronto.clear()
+        self._ultimo_inicio = time.monotonic()
+        conexao, conexao_filho = self._contexto.Pipe()
+        processo = self._contexto.Process(target=executar_trabalhador, args=(conexao_filho, self.url_servidor),
+                                          name="tela-alerta", daemon=True)
+        processo.start()
+        conexao_filho.close()
+        self._processo = processo
+        self._conexao = conexao
+        threading.Thread(target=self._acompanhar, args=(processo, conexao), daemon=True).start()
+        # Alertas que o processo anterior não chegou a mostrar. O mais antigo é
+        # o suspeito da queda: depois de max_reenvios ele é descartado
+        if self._pendentes:
+            chave = next(iter(self._pendentes))
+            self._reenvios[chave] = self._reenvios.get(chave, 0) + 1
+            if self._reenvios[chave] > self.max_reenvios:
+                alerta = self._pendentes.pop(chave)
+                del self._reenvios[chave]
+                self.ao_registrar(f"Alerta de {alerta['sala']} descartado após {self.max_reenvios} reenvios")
+        for alerta in self._pendentes.values():
+            conexao.send(alerta)
+
+    def _acompanhar(self, processo, conexao):
+        """Lê as respostas do processo; o fim do Pipe indica que ele caiu"""
+        while True:
+            try:
+                tipo, valor = conexao.recv()
+            except (EOFError, OSError):
+                break
+            if tipo == "pronto":
+                self.pronto.set()
+            elif tipo == "exibido":
+                with self._lock:
+                    self._pendentes.pop(valor, None)
+                    self._reenvios.pop(valor, None)
+        processo.join(1)
+        with self._lock:
+            if self._encerrando or processo is not self._processo:
+                return
+            self.reinicios += 1
+            espera = self.espera_reinicio - (time.monotonic() - self._ultimo_inicio)
+        self.ao_registrar(f"Processo da tela de alerta encerrou (código {processo.exitcode}); reiniciando")
+        if espera > 0:
+            # Evita reiniciar sem parar se o processo cai logo ao subir
+            time.sleep(espera)
+        with self._lock:
+            if not self._encerrando and processo is self._processo:
+                self._subir()
+
+    def exibir(self, sala, usuario, id_evento=None):
+        with self._lock:
+            self._sequencia += 1
+            alerta = {"chave": self._sequencia, "sala": sala, "usuario": usuario, "id_evento": id_evento}
+            self._pendentes[self._sequencia] = alerta
+            try:
+                self._conexao.send(alerta)
+            except (OSError, AttributeError):
+                # Processo caiu e ainda não foi recriado: _acompanhar reenvia os pendentes
+                pass
+
+    def encerrar(self, tempo_limite=2):
+        with self._lock:
+            self._encerrando = True
+            processo, conexao = self._processo, self._conexao
+        if processo is None:
+            return
+        try:
+            conexao.send(None)
+        except OSError:
+            pass
+        processo.join(tempo_limite)
+        if processo.is_alive():
+            processo.terminate()
+
+
+if __name__ == "__main__":
+    motor_audio.iniciar()
+    root = tk.Tk()
+    root.withdraw()
+    janela = abrir_janela(root, sys.argv[1] if len(sys.argv) > 1 else "SALA TESTE",
+                          sys.argv[2] if len(sys.argv) > 2 else "USUÁRIO TESTE",
+                          sys.argv[3] if len(sys.argv) > 3 else None,
+                          os.getenv('SERVIDOR_URL', 'http://172.19.200.1:9600'))
+    janela.bind("<Destroy>", lambda evento: root.destroy() if evento.widget is janela else None)
+    root.mainloop()